@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+⏱️ NEET COLLEGE FINDER BENCHMARKS ⏱️
+In-process latency, throughput and memory for both backends
+
+Loads the real CSVs (``data/raw`` or ``NEET_DATA_DIR``) into
+``UltimateNEETCollegeFinder`` (ultimate_backend) and ``NEETCollegeFinder``
+(neet_college_finder_backend), then runs a fixed mix of search, option and
+export scenarios against them: UG/PG, All India/State, low and high ranks,
+broad and narrow filters. Each scenario reports the cold first call, then
+p50/p95/p99 and single-threaded throughput over ``--iterations`` warm calls,
+and its peak traced allocation in one extra call.
+
+Results can be saved as a named baseline and later runs compared against it;
+a p50 or p95 more than ``--threshold`` times the baseline is a regression.
+With several ``--data-dir`` values (e.g. synthetic 1x/10x/100x datasets from
+generate_synthetic_data.py) each one runs in its own process and a scaling
+table of rows, load time, memory and per-scenario p50 is printed.
+
+Usage:
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --backend ultimate --scenario ug_ --iterations 50
+    python benchmarks/bench_search.py --save-baseline main
+    python benchmarks/bench_search.py --compare main --fail-on-regression
+    python benchmarks/bench_search.py --data-dir data/raw --data-dir /tmp/neet_10x --data-dir /tmp/neet_100x
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+BACKEND_FILES = {
+    'ultimate': REPO_ROOT / "ultimate_backend" / "main.py",
+    'basic': REPO_ROOT / "neet_college_finder_backend" / "main.py",
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    backend: str  # 'ultimate' or 'basic'
+    kind: str  # 'search', 'options' or 'export'
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+UG_AI = dict(exam_type='NEET-UG', preference='All India', course='MBBS')
+UG_STATE = dict(exam_type='NEET-UG', preference='State Wise', course='MBBS')
+PG_AI = dict(exam_type='NEET-PG', preference='All India')
+PG_STATE = dict(exam_type='NEET-PG', preference='State Wise')
+
+SEARCHES = {
+    'ug_ai_open_top_rank': dict(UG_AI, category='Open', rank_min=500, rank_max=500),
+    'ug_ai_open_mid_rank': dict(UG_AI, category='Open', rank_min=20000, rank_max=20000),
+    'ug_ai_obc_high_rank': dict(UG_AI, category='OBC', rank_min=150000, rank_max=150000),
+    'ug_ai_open_rank_range': dict(UG_AI, category='Open', rank_min=10000, rank_max=40000),
+    'ug_state_karnataka_narrow': dict(UG_STATE, state='Karnataka', quota='KAR Govt Quota', category='GM',
+                                      rank_min=30000, rank_max=30000),
+    'pg_ai_gen_medicine_low_rank': dict(PG_AI, category='GEN', course='GENERAL MEDICINE', rank_min=3000, rank_max=3000),
+    'pg_ai_gen_anaesthesia_high_rank': dict(PG_AI, category='GEN', course='ANAESTHESIOLOGY', rank_min=60000, rank_max=60000),
+    'pg_state_maha_open': dict(PG_STATE, quota='MAHA Govt Quota', category='OPEN', course='GENERAL MEDICINE',
+                               rank_min=8000, rank_max=8000),
+}
+
+# Filters only the ultimate backend understands
+ULTIMATE_SEARCHES = {
+    'ug_ai_open_filtered': dict(UG_AI, category='Open', rank_min=20000, rank_max=20000,
+                                preferred_states=['Karnataka', 'Maharashtra', 'Tamil Nadu'], max_fee_per_year=200000,
+                                home_location={'lat': 12.97, 'lng': 77.59}, max_distance_km=1500, min_beds=300),
+}
+
+SCENARIOS: List[Scenario] = [
+    *[Scenario(name, 'ultimate', 'search', params) for name, params in {**SEARCHES, **ULTIMATE_SEARCHES}.items()],
+    *[Scenario(name, 'basic', 'search', params) for name, params in SEARCHES.items()],
+    Scenario('options_states_ug', 'ultimate', 'options', dict(option='states', exam_type='NEET-UG')),
+    Scenario('options_categories_pg_ai', 'ultimate', 'options', dict(option='categories', exam_type='NEET-PG', preference='All India')),
+    Scenario('options_courses_pg_state', 'ultimate', 'options', dict(option='courses', exam_type='NEET-PG', preference='State Wise')),
+    Scenario('options_states_ug', 'basic', 'options', dict(option='states', exam_type='NEET-UG')),
+    Scenario('options_categories_pg_ai', 'basic', 'options', dict(option='categories', exam_type='NEET-PG', preference='All India')),
+    Scenario('options_courses_pg_state', 'basic', 'options', dict(option='courses', exam_type='NEET-PG', preference='State Wise')),
+    Scenario('export_csv_ug_all_categories', 'ultimate', 'export', dict(UG_AI, category='Open', rank_min=20000, rank_max=20000,
+                                                                        all_categories=True)),
+    Scenario('export_pdf_ug_mid_rank', 'basic', 'export', dict(UG_AI, category='Open', rank_min=20000, rank_max=20000)),
+]
+
+
+# ===============================
+# Backend loading
+# ===============================
+
+def rss_mb() -> float:
+    """Current resident set size (peak on platforms without /proc)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return float('nan')
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def load_backend(name: str, verbose: bool) -> Tuple[Any, Dict[str, float]]:
+    """Import a backend's main.py under its own module name; (module, load stats)"""
+    path = BACKEND_FILES[name]
+    sys.path.insert(0, str(path.parent))
+    before = rss_mb()
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location(f"{name}_backend_main", path)
+    module = importlib.util.module_from_spec(spec)
+    os.environ['CACHE_WARM_SOURCES'] = ''  # Cold caches: first-call numbers must measure misses
+    if not verbose:
+        logging.disable(logging.INFO)
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with sink:
+        spec.loader.exec_module(module)
+        module.startup_pipeline.run()  # The server does this in its startup hook
+    load_seconds = time.perf_counter() - start
+    frames = module.ultimate_finder.neet_data if name == 'ultimate' else module.neet_data
+    return module, {
+        'load_seconds': round(load_seconds, 3),
+        'rss_growth_mb': round(rss_mb() - before, 1),
+        'rows': int(sum(len(df) for df in frames.values() if df is not None)),
+    }
+
+
+def make_call(module: Any, backend: str, scenario: Scenario, loop: asyncio.AbstractEventLoop) -> Callable[[], Any]:
+    """Zero-argument callable running one iteration of a scenario"""
+    params = dict(scenario.params)
+    if backend == 'ultimate':
+        finder = module.ultimate_finder
+        if scenario.kind == 'search':
+            request = module.UltimateSearchRequest(**params)
+            return lambda: loop.run_until_complete(finder.ultimate_search(request))
+        if scenario.kind == 'options':
+            option = params.pop('option')
+            route = {
+                'states': module.get_states_compatible,
+                'categories': module.get_categories_compatible,
+                'courses': module.get_courses_compatible,
+            }[option]
+            kwargs = {'exam_type': module.ExamType(params['exam_type'])}
+            if 'preference' in params:
+                kwargs['preference'] = module.QuotaPreference(params['preference'])
+            return lambda: next(iter(loop.run_until_complete(route(**kwargs)).values()))
+        request = module.ExportRequest(**params)
+        categories = finder.export_categories(request)
+        return lambda: sum(len(rows) for rows in finder.iter_export_rows(request, categories))
+
+    finder = module.college_finder
+    if scenario.kind == 'search':
+        request = module.SearchRequest(**params)
+        return lambda: finder.search_colleges(request)
+    if scenario.kind == 'options':
+        option = params.pop('option')
+        exam_type = module.ExamType(params['exam_type'])
+        if option == 'states':
+            return lambda: finder.get_state_options(exam_type)
+        preference = module.QuotaPreference(params['preference'])
+        if option == 'categories':
+            return lambda: finder.get_category_options(exam_type, preference)
+        return lambda: finder.get_course_options(exam_type, preference)
+    request = module.SearchRequest(**params)
+    user_rank = request.rank_min
+
+    def export_pdf():
+        recommendations = finder.search_colleges(request)
+        return finder.generate_pdf_report(recommendations, request.dict(), user_rank)
+    return export_pdf
+
+
+# ===============================
+# Measurement
+# ===============================
+
+def run_scenario(call: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result = call()
+    first_ms = (time.perf_counter() - start) * 1000
+    size = len(result) if hasattr(result, '__len__') else result
+
+    for _ in range(warmup):
+        call()
+    timings = np.empty(iterations)
+    total_start = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        call()
+        timings[i] = (time.perf_counter() - start) * 1000
+    total = time.perf_counter() - total_start
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'first_call_ms': round(first_ms, 3),
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'p99_ms': round(float(np.percentile(timings, 99)), 3),
+        'mean_ms': round(float(timings.mean()), 3),
+        'throughput_per_s': round(iterations / total, 2),
+        'peak_alloc_mb': round(peak / 1024 ** 2, 2),
+        'result_size': size,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Scenario keys whose p50 or p95 regressed beyond threshold x baseline"""
+    regressions = []
+    previous = baseline.get('scenarios', {})
+    print(f"\n📉 Compared with baseline '{baseline.get('name')}' ({baseline.get('created_at')})")
+    print(f"  {'scenario':<45} {'p50 now/base':>18} {'p95 now/base':>18}")
+    for key, result in results.items():
+        if key not in previous:
+            continue
+        base = previous[key]
+        ratios = [result[m] / base[m] if base[m] else 1.0 for m in ('p50_ms', 'p95_ms')]
+        flag = '  ❌ regression' if max(ratios) > threshold else ''
+        if flag:
+            regressions.append(key)
+        print(f"  {key:<45} {result['p50_ms']:8.1f}/{base['p50_ms']:<8.1f} {result['p95_ms']:8.1f}/{base['p95_ms']:<8.1f}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="In-process benchmarks for both NEET backends")
+    parser.add_argument('--backend', choices=['ultimate', 'basic', 'all'], default='all')
+    parser.add_argument('--scenario', help="Only scenarios whose name matches this regex")
+    parser.add_argument('--iterations', type=int, default=30, help="Timed calls per scenario")
+    parser.add_argument('--warmup', type=int, default=3, help="Untimed calls after the first one")
+    parser.add_argument('--save-baseline', metavar='NAME', help="Store results as benchmarks/baselines/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="Compare with a stored baseline")
+    parser.add_argument('--threshold', type=float, default=1.2, help="Regression ratio for --compare")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit 1 if --compare finds a regression")
+    parser.add_argument('--output', help="Also write results JSON here")
+    parser.add_argument('--verbose', action='store_true', help="Keep backend logging and prints")
+    parser.add_argument('--data-dir', action='append', default=[],
+                        help="Dataset directory (sets NEET_DATA_DIR); repeat to compare scales")
+    return parser.parse_args(argv)
+
+
+def scaling_sweep(args, argv: List[str]) -> int:
+    """Run the suite once per data directory in a fresh process; print how it scales"""
+    passthrough, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '--data-dir':
+            skip = True
+        elif not arg.startswith('--data-dir=') and not arg.startswith('--output'):
+            passthrough.append(arg)
+    reports = []
+    for data_dir in args.data_dir:
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'report.json'
+            print(f"\n{'=' * 80}\n📂 {data_dir}\n{'=' * 80}")
+            command = [sys.executable, __file__, *passthrough, '--data-dir', data_dir, '--output', str(output)]
+            if subprocess.run(command).returncode != 0 or not output.exists():
+                print(f"❌ Run for {data_dir} failed")
+                return 1
+            reports.append(json.loads(output.read_text()))
+
+    print(f"\n📈 Scaling summary")
+    names = [Path(r['data_dir']).name or r['data_dir'] for r in reports]
+    print(f"  {'':<50}" + ''.join(f"{name[-14:]:>15}" for name in names))
+    for backend in ('ultimate', 'basic'):
+        if not all(backend in r['loads'] for r in reports):
+            continue
+        for metric, label, fmt in (('rows', 'rows', '{:,}'), ('load_seconds', 'load s', '{:.2f}'), ('rss_growth_mb', 'RSS MB', '{:.0f}')):
+            print(f"  {backend + ' ' + label:<50}" + ''.join(f"{fmt.format(r['loads'][backend][metric]):>15}" for r in reports))
+    for key in reports[0]['scenarios']:
+        if all(key in r['scenarios'] for r in reports):
+            print(f"  {key + ' p50 ms':<50}" + ''.join(f"{r['scenarios'][key]['p50_ms']:>15.1f}" for r in reports))
+    print(f"  {'process RSS MB':<50}" + ''.join(f"{r['peak_rss_mb']:>15.0f}" for r in reports))
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=2))
+        print(f"✅ Results written to {args.output}")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if len(args.data_dir) > 1:
+        if args.save_baseline or args.compare:
+            print("❌ Baselines need a single data directory")
+            return 1
+        return scaling_sweep(args, argv)
+    if args.data_dir:
+        os.environ['NEET_DATA_DIR'] = str(Path(args.data_dir[0]).resolve())
+    backends = ['ultimate', 'basic'] if args.backend == 'all' else [args.backend]
+    scenarios = [s for s in SCENARIOS if s.backend in backends and (not args.scenario or re.search(args.scenario, s.name))]
+    if not scenarios:
+        print("❌ No scenarios selected")
+        return 1
+
+    print(f"📂 Data: {os.getenv('NEET_DATA_DIR', REPO_ROOT / 'data' / 'raw')}")
+    loop = asyncio.new_event_loop()
+    loads, results = {}, {}
+    for backend in backends:
+        if not any(s.backend == backend for s in scenarios):
+            continue
+        print(f"🔄 Loading {backend} backend...")
+        module, loads[backend] = load_backend(backend, args.verbose)
+        print(f"   {loads[backend]['rows']:,} rows in {loads[backend]['load_seconds']:.2f}s, "
+              f"+{loads[backend]['rss_growth_mb']:.0f} MB RSS")
+
+        print(f"\n  {'scenario':<36} {'first':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'peak MB':>8} {'size':>6}")
+        for scenario in (s for s in scenarios if s.backend == backend):
+            key = f"{backend}/{scenario.kind}/{scenario.name}"
+            result = run_scenario(make_call(module, backend, scenario, loop), args.iterations, args.warmup)
+            results[key] = result
+            print(f"  {scenario.name:<36} {result['first_call_ms']:8.1f} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} "
+                  f"{result['p99_ms']:8.1f} {result['throughput_per_s']:8.1f} {result['peak_alloc_mb']:8.1f} {result['result_size']:>6}")
+        print()
+    loop.close()
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'data_dir': str(os.getenv('NEET_DATA_DIR', REPO_ROOT / 'data' / 'raw')),
+        'iterations': args.iterations,
+        'peak_rss_mb': round(rss_mb(), 1),
+        'loads': loads,
+        'scenarios': results,
+    }
+    print(f"💾 Process RSS: {report['peak_rss_mb']:.0f} MB")
+
+    regressions = []
+    if args.compare:
+        baseline_path = BASELINE_DIR / f"{args.compare}.json"
+        if not baseline_path.exists():
+            print(f"❌ Baseline {baseline_path} not found")
+            return 1
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.threshold)
+        print(f"\n{'❌' if regressions else '✅'} {len(regressions)} regression(s) beyond {args.threshold}x")
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps({'name': args.save_baseline, **report}, indent=2))
+        print(f"✅ Baseline saved to {path}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"✅ Results written to {args.output}")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+🧪 SYNTHETIC NEET DATASET GENERATOR 🧪
+Scaled copies of data/raw for load, memory and latency testing
+
+Each source CSV is treated as a template. Copy 0 is the original rows; every
+further copy (``--scale`` copies in total) re-issues each institute as a new
+synthetic institute. The new institute gets a generated name, a resampled
+state in All India files, its own cutoff level (log-normal factor around the
+original closing ranks) and its own fee level. PG copies also move a share of
+(institute, course) pairs onto specialities that are not in the source data.
+``--extra-years`` prepends earlier counseling years and ``--extra-rounds``
+appends later rounds to every year, as more "CR <year> <round>" columns.
+
+The output keeps the source files' quirks so the backends' parsing paths are
+exercised as in production:
+- UTF-8 BOM
+- "₹ 1,58,600" and "₹1,58,600" Indian-grouped amounts
+- "-" and blank ranks
+- "Info Not Available" cells
+- stray trailing columns
+- the column order of each file
+
+Copies are written one at a time, so memory stays at the size of one source file
+whatever the scale.
+
+Usage:
+    python benchmarks/generate_synthetic_data.py --scale 10 --output-dir /tmp/neet_10x
+    python benchmarks/generate_synthetic_data.py --scale 100 --extra-years 2 --extra-rounds 2 --output-dir /tmp/neet_100x
+    NEET_DATA_DIR=/tmp/neet_10x python benchmarks/bench_search.py
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATASET_FILES = ['NEET_UG_all_india.csv', 'NEET_UG_statewise.csv', 'NEET_PG_all_india.csv', 'NEET_PG_statewise.csv']
+
+CR_COLUMN = re.compile(r'^CR (\d{4}) (\d+)$')
+MONEY = re.compile(r'^₹(\s?)([\d,]+)$')
+
+CITIES = [
+    'Agra', 'Ajmer', 'Akola', 'Aligarh', 'Alappuzha', 'Ambala', 'Amravati', 'Anantapur', 'Arrah', 'Asansol',
+    'Bagalkot', 'Bahraich', 'Ballia', 'Banda', 'Bareilly', 'Barmer', 'Belagavi', 'Bhagalpur', 'Bharuch', 'Bhilwara',
+    'Bidar', 'Bikaner', 'Bilaspur', 'Bokaro', 'Chandrapur', 'Chhindwara', 'Chittoor', 'Cuttack', 'Darjeeling', 'Datia',
+    'Dewas', 'Dhanbad', 'Dharwad', 'Dindigul', 'Durg', 'Eluru', 'Erode', 'Etawah', 'Firozabad', 'Gadag',
+    'Gaya', 'Godhra', 'Gonda', 'Gulbarga', 'Guntur', 'Hassan', 'Hazaribagh', 'Hisar', 'Hoshiarpur', 'Jalgaon',
+    'Jalna', 'Jhansi', 'Jorhat', 'Kadapa', 'Kakinada', 'Kannur', 'Karimnagar', 'Karwar', 'Kolar', 'Kollam',
+    'Kota', 'Kurnool', 'Latur', 'Madurai', 'Malda', 'Mandya', 'Mathura', 'Mirzapur', 'Moradabad', 'Muzaffarpur',
+    'Nanded', 'Nellore', 'Nizamabad', 'Ongole', 'Palakkad', 'Pali', 'Parbhani', 'Purnia', 'Raichur', 'Rajkot',
+    'Rewa', 'Rohtak', 'Sagar', 'Salem', 'Sambalpur', 'Satara', 'Shimoga', 'Sikar', 'Siliguri', 'Solapur',
+    'Srikakulam', 'Thanjavur', 'Thrissur', 'Tirunelveli', 'Tumkur', 'Udaipur', 'Ujjain', 'Vellore', 'Warangal', 'Yavatmal',
+]
+INSTITUTE_TEMPLATES = [
+    'Govt Med Coll, {city}', '{city} Med Coll', '{city} IMS, {city}', 'ESIC Med Coll, {city}',
+    'Dist Hospital, {city}', '{city} Inst of Med Sciences', 'Sri {city} Med Coll & Hosp', 'Government Med Coll, {city}',
+    'AIIMS, {city}', '{city} Dental Coll, {city}',
+]
+EXTRA_PG_COURSES = [
+    'EMERGENCY MEDICINE', 'GERIATRIC MEDICINE', 'INFECTIOUS DISEASES', 'SPORTS MEDICINE', 'PALLIATIVE MEDICINE',
+    'NUCLEAR MEDICINE', 'HOSPITAL ADMINISTRATION', 'AVIATION MEDICINE', 'MARINE MEDICINE', 'TRANSFUSION MEDICINE',
+    'FAMILY MEDICINE', 'TROPICAL MEDICINE', 'LABORATORY MEDICINE', 'MATERNAL AND CHILD HEALTH', 'SLEEP MEDICINE',
+    'PAIN MEDICINE', 'CRITICAL CARE MEDICINE', 'CLINICAL PHARMACOLOGY', 'MEDICAL GENETICS', 'REPRODUCTIVE MEDICINE',
+]
+
+
+def column(columns: List[str], *names: str) -> Optional[str]:
+    return next((name for name in names if name in columns), None)
+
+
+def indian_grouping(value: int) -> str:
+    """1586000 -> '15,86,000'"""
+    digits = str(value)
+    if len(digits) <= 3:
+        return digits
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ','.join(groups + [tail])
+
+
+def parse_money(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """(amounts, NaN where not an amount; whether '₹' is followed by a space)"""
+    parts = values.str.extract(MONEY)
+    amounts = pd.to_numeric(parts[1].str.replace(',', '', regex=False), errors='coerce').to_numpy()
+    return amounts, (parts[0] == ' ').to_numpy()
+
+
+def format_money(amounts: np.ndarray, spaced: np.ndarray, original: np.ndarray) -> np.ndarray:
+    out = original.copy()
+    for i in np.flatnonzero(~np.isnan(amounts)):
+        out[i] = ('₹ ' if spaced[i] else '₹') + indian_grouping(int(amounts[i]))
+    return out
+
+
+def format_ranks(ranks: np.ndarray, original: np.ndarray) -> np.ndarray:
+    """Numeric ranks as digits; '-' / blank cells stay as they were"""
+    out = original.copy()
+    present = ~np.isnan(ranks)
+    out[present] = np.maximum(np.round(ranks[present]), 1).astype(np.int64).astype(str)
+    return out
+
+
+class TemplateFile:
+    """One source CSV prepared for copying"""
+
+    def __init__(self, path: Path, extra_years: int, extra_rounds: int, rng: np.random.Generator):
+        with open(path, encoding='utf-8-sig', newline='') as handle:
+            self.header = next(csv.reader(handle))
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig', header=None, skiprows=1)
+        frame.columns = range(frame.shape[1])
+        self.frame = frame
+        self.size = len(frame)
+        self.is_pg = '_PG_' in path.name
+        names = [name.strip() for name in self.header]
+        self.institute_col = names.index(column(names, 'INSTITUTE', 'Institute'))
+        state = column(names, 'STATE', 'State')
+        self.state_col = names.index(state) if state else None
+        self.course_col = names.index(column(names, 'COURSE', 'Course'))
+        self.all_india = 'all_india' in path.name
+
+        # Rank columns, present and synthesized, in (year, round) order
+        self.cr_cols = {}
+        for i, name in enumerate(names):
+            match = CR_COLUMN.match(name)
+            if match:
+                self.cr_cols[(int(match.group(1)), int(match.group(2)))] = i
+        self.ranks = {key: pd.to_numeric(frame[i], errors='coerce').to_numpy() for key, i in self.cr_cols.items()}
+        self.synthetic = self._synthesize_columns(extra_years, extra_rounds, rng)
+
+        # Money and bed columns get per-institute scaling
+        self.money_cols = [
+            i for i in range(frame.shape[1])
+            if i not in self.cr_cols.values() and frame[i].str.match(MONEY).mean() > 0.3
+        ]
+        self.money = {i: parse_money(frame[i]) for i in self.money_cols}
+        beds = column(names, 'BEDS', 'Beds')
+        self.beds_col = names.index(beds) if beds else None
+        self.beds = pd.to_numeric(frame[self.beds_col], errors='coerce').to_numpy() if beds else None
+
+        self.institute_codes, self.institutes = pd.factorize(frame[self.institute_col])
+        self.pair_codes, _ = pd.factorize(frame[self.institute_col] + '\x00' + frame[self.course_col])
+        self.states = frame[self.state_col].to_numpy() if self.state_col is not None else None
+
+    def _synthesize_columns(self, extra_years: int, extra_rounds: int,
+                            rng: np.random.Generator) -> Dict[Tuple[int, int], np.ndarray]:
+        """Base ranks for added year / round columns (NaN = '-')"""
+        synthetic = {}
+        years = sorted({year for year, _ in self.ranks})
+        rounds_by_year = {year: sorted(r for y, r in self.ranks if y == year) for year in years}
+        first = years[0]
+        for offset in range(extra_years, 0, -1):
+            # Earlier years: first year's ranks with a few percent drift per year
+            drift = rng.lognormal(0, 0.04 * offset, self.size) * (1 + 0.03 * offset)
+            for round_no in rounds_by_year[first]:
+                synthetic[(first - offset, round_no)] = self.ranks[(first, round_no)] * drift
+        for year in years:
+            last = rounds_by_year[year][-1]
+            for extra in range(1, extra_rounds + 1):
+                # Later rounds: sparser, a little deeper than the last real round
+                ranks = self.ranks[(year, last)] * (1 + 0.05 * extra) * rng.lognormal(0, 0.05, self.size)
+                ranks[rng.random(self.size) < 0.5 + 0.15 * extra] = np.nan
+                synthetic[(year, last + extra)] = ranks
+        return synthetic
+
+    def output_header(self) -> List[str]:
+        """Source header with the CR block extended; other columns keep their place"""
+        keys = sorted({**self.ranks, **self.synthetic})
+        cr_positions = sorted(self.cr_cols.values())
+        head = self.header[:cr_positions[0]]
+        tail = [name for i, name in enumerate(self.header[cr_positions[0]:], cr_positions[0]) if i not in cr_positions]
+        return head + [f"CR {year} {round_no}" for year, round_no in keys] + tail
+
+    def copy(self, k: int, rng: np.random.Generator, used_names: set, states: np.ndarray,
+             extra_course_share: float) -> pd.DataFrame:
+        """Copy k of the template (k = 0 is the source rows)"""
+        n_institutes = len(self.institutes)
+        if k == 0:
+            rank_factor = np.ones(self.size)
+            fee_factor = np.ones(self.size)
+            beds_factor = np.ones(self.size)
+            institute_names = self.frame[self.institute_col].to_numpy()
+        else:
+            rank_factor = rng.lognormal(0, 0.25, n_institutes)[self.institute_codes] * rng.lognormal(0, 0.05, self.size)
+            fee_factor = rng.lognormal(0, 0.3, n_institutes)[self.institute_codes]
+            beds_factor = rng.lognormal(0, 0.2, n_institutes)[self.institute_codes]
+            institute_names = np.array([self._new_name(rng, used_names) for _ in range(n_institutes)], dtype=object)[self.institute_codes]
+
+        out = {}
+        for i in range(len(self.header)):
+            if i not in self.cr_cols.values():
+                out[i] = self.frame[i].to_numpy(copy=True)
+        out[self.institute_col] = institute_names
+        if k and self.all_india and self.state_col is not None:
+            out[self.state_col] = rng.choice(states, n_institutes)[self.institute_codes]
+        if k and self.is_pg and extra_course_share > 0:
+            moved = (rng.random(self.pair_codes.max() + 1) < extra_course_share)[self.pair_codes]
+            courses = rng.choice(EXTRA_PG_COURSES, self.pair_codes.max() + 1)[self.pair_codes]
+            out[self.course_col] = np.where(moved, courses, out[self.course_col])
+        for i in self.money_cols:
+            amounts, spaced = self.money[i]
+            out[i] = format_money(np.round(amounts * fee_factor / 100) * 100 if k else amounts, spaced, out[i])
+        if self.beds is not None and k:
+            present = ~np.isnan(self.beds)
+            out[self.beds_col][present] = np.round(self.beds[present] * beds_factor[present]).astype(np.int64).astype(str)
+
+        cr_values = {}
+        for key in sorted({**self.ranks, **self.synthetic}):
+            if key in self.ranks:
+                original = self.frame[self.cr_cols[key]].to_numpy()
+                cr_values[key] = format_ranks(self.ranks[key] * rank_factor, original)
+            else:
+                base = self.synthetic[key] * rank_factor
+                cr_values[key] = np.where(np.isnan(base), '-', np.maximum(np.round(np.nan_to_num(base)), 1).astype(np.int64).astype(str))
+
+        cr_positions = sorted(self.cr_cols.values())
+        columns = [out[i] for i in range(cr_positions[0])]
+        columns += list(cr_values.values())
+        columns += [out[i] for i in range(cr_positions[0], len(self.header)) if i not in cr_positions]
+        return pd.DataFrame(dict(enumerate(columns)))
+
+    @staticmethod
+    def _new_name(rng: np.random.Generator, used_names: set) -> str:
+        template = INSTITUTE_TEMPLATES[rng.integers(len(INSTITUTE_TEMPLATES))]
+        name = template.format(city=CITIES[rng.integers(len(CITIES))])
+        candidate, unit = name, 2
+        while candidate in used_names:
+            candidate = f"{name} Unit-{unit}"
+            unit += 1
+        used_names.add(candidate)
+        return candidate
+
+
+def generate(source_dir: Path, output_dir: Path, scale: int, extra_years: int, extra_rounds: int,
+             extra_course_share: float, seed: int) -> Dict[str, Dict]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for filename in DATASET_FILES:
+        started = time.time()
+        rng = np.random.default_rng([seed, DATASET_FILES.index(filename)])
+        template = TemplateFile(source_dir / filename, extra_years, extra_rounds, rng)
+        states = np.unique(template.states) if template.states is not None else np.array([])
+        used_names = set(template.institutes)
+        target = output_dir / filename
+        header = template.output_header()
+        with open(target, 'w', encoding='utf-8-sig', newline='') as handle:
+            csv.writer(handle).writerow(header)
+            for k in range(scale):
+                template.copy(k, rng, used_names, states, extra_course_share).to_csv(handle, header=False, index=False)
+        rows = template.size * scale
+        manifest[filename] = {
+            'rows': rows,
+            'columns': len(header),
+            'rank_columns': sum(1 for name in header if CR_COLUMN.match(name.strip())),
+            'institutes': len(used_names),
+            'bytes': target.stat().st_size,
+            'source_sha256': hashlib.sha256((source_dir / filename).read_bytes()).hexdigest()[:12],
+        }
+        print(f"✅ {filename}: {rows:,} rows, {manifest[filename]['rank_columns']} rank columns, "
+              f"{len(used_names):,} institutes, {manifest[filename]['bytes'] / 1024 ** 2:.1f} MB ({time.time() - started:.1f}s)")
+    return manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate scaled synthetic NEET datasets")
+    parser.add_argument('--scale', type=int, default=10, help="Copies of each source file (1 = source only)")
+    parser.add_argument('--output-dir', required=True, help="Directory for the generated CSVs")
+    parser.add_argument('--source-dir', default=os.getenv('NEET_DATA_DIR', str(REPO_ROOT / 'data' / 'raw')))
+    parser.add_argument('--extra-years', type=int, default=0, help="Earlier counseling years to add")
+    parser.add_argument('--extra-rounds', type=int, default=0, help="Later rounds to add to every year")
+    parser.add_argument('--extra-course-share', type=float, default=0.15,
+                        help="Share of synthetic PG (institute, course) pairs moved to new specialities")
+    parser.add_argument('--seed', type=int, default=2024)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.scale < 1:
+        print("❌ --scale must be at least 1")
+        return 1
+    source_dir, output_dir = Path(args.source_dir), Path(args.output_dir)
+    if output_dir.resolve() == source_dir.resolve():
+        print("❌ Output directory must differ from the source directory")
+        return 1
+    print(f"🧪 Generating {args.scale}x data from {source_dir} into {output_dir}")
+    manifest = generate(source_dir, output_dir, args.scale, args.extra_years, args.extra_rounds,
+                        args.extra_course_share, args.seed)
+    (output_dir / 'manifest.json').write_text(json.dumps({
+        'scale': args.scale, 'extra_years': args.extra_years, 'extra_rounds': args.extra_rounds,
+        'extra_course_share': args.extra_course_share, 'seed': args.seed, 'files': manifest,
+    }, indent=2))
+    total = sum(entry['rows'] for entry in manifest.values())
+    print(f"🎯 {total:,} rows written; point NEET_DATA_DIR (or bench_search.py --data-dir) at {output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+🚦 NEET COLLEGE FINDER LOAD TEST 🚦
+HTTP concurrency sweep against a local Ultimate Backend
+
+Starts ``uvicorn main:app`` from ultimate_backend on a free port (or targets
+``--url``). It waits until the server answers, then drives a weighted mix of
+``/ultimate-search``, ``/search`` and the option endpoints with N concurrent
+keep-alive clients, for each N in ``--concurrency``. Each level reports
+throughput, p50/p95/p99/max latency, error rate and the server process's CPU
+use. The saturation report gives the highest level that still meets the
+``--slo-ms`` p95 target, and the level where added clients stop adding
+throughput.
+
+Unlike bench_search.py this includes HTTP parsing, validation, serialization
+and event-loop blocking: with one worker, a CPU-bound search delays every other
+request on that worker.
+
+Usage:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 1 4 16 64 --duration 20 --workers 4
+    python benchmarks/load_test.py --url http://localhost:8002 --mix ultimate=1 --output load.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_search import SEARCHES, ULTIMATE_SEARCHES  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = REPO_ROOT / "ultimate_backend"
+
+OPTION_QUERIES = [
+    '/states?exam_type=NEET-UG',
+    '/quotas?exam_type=NEET-UG&preference=All%20India',
+    '/categories?exam_type=NEET-UG&preference=All%20India',
+    '/categories?exam_type=NEET-PG&preference=State%20Wise',
+    '/courses?exam_type=NEET-PG&preference=All%20India',
+]
+
+
+@dataclass
+class Target:
+    kind: str  # Mix key: 'ultimate', 'search' or 'options'
+    method: str
+    path: str
+    body: Optional[bytes] = None
+
+
+def build_targets() -> Dict[str, List[Target]]:
+    ultimate = [Target('ultimate', 'POST', '/ultimate-search', json.dumps(params).encode())
+                for params in {**SEARCHES, **ULTIMATE_SEARCHES}.values()]
+    search = [Target('search', 'POST', '/search', json.dumps(params).encode()) for params in SEARCHES.values()]
+    options = [Target('options', 'GET', path) for path in OPTION_QUERIES]
+    return {'ultimate': ultimate, 'search': search, 'options': options}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ===============================
+# Server management
+# ===============================
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, startup_timeout: float, result_cache: bool = True) -> subprocess.Popen:
+    command = [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+               '--workers', str(workers), '--log-level', 'warning']
+    log = open(Path(os.getenv('TMPDIR', '/tmp')) / f"neet_load_test_{port}.log", 'w')
+    env = dict(os.environ) if result_cache else {**os.environ, 'SEARCH_RESULT_CACHE_SIZE': '0'}
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup (see {log.name})")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            # The port opens while datasets are still loading; /readyz turns 200 once they are in
+            connection.request('GET', '/readyz')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Server not ready after {startup_timeout:.0f}s (see {log.name})")
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """utime + stime of a process and its children (Linux /proc only)"""
+    try:
+        pids = [pid] + [int(p) for p in Path(f'/proc/{pid}/task/{pid}/children').read_text().split()]
+        total = 0.0
+        for p in pids:
+            fields = Path(f'/proc/{p}/stat').read_text().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        return total
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# ===============================
+# Load generation
+# ===============================
+
+@dataclass
+class LevelResult:
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    error_samples: List[str] = field(default_factory=list)
+
+
+def client_loop(host: str, port: int, targets: List[Target], weights: np.ndarray, stop_at: float,
+                seed: int, result: LevelResult, lock: threading.Lock, timeout: float):
+    """One keep-alive client issuing requests back to back until stop_at"""
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    samples = []
+    while time.perf_counter() < stop_at:
+        target = rng.choices(targets, weights=weights)[0]
+        headers = {'Content-Type': 'application/json'} if target.body else {}
+        start = time.perf_counter()
+        try:
+            connection.request(target.method, target.path, body=target.body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            ok = 200 <= response.status < 300
+            detail = f"{target.path} -> HTTP {response.status}"
+        except (OSError, http.client.HTTPException) as e:
+            ok, detail = False, f"{target.path} -> {type(e).__name__}: {e}"
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if ok:
+            latencies.setdefault(target.kind, []).append(elapsed_ms)
+        else:
+            errors[target.kind] = errors.get(target.kind, 0) + 1
+            if len(samples) < 3:
+                samples.append(detail)
+    connection.close()
+    with lock:
+        for kind, values in latencies.items():
+            result.latencies.setdefault(kind, []).extend(values)
+        for kind, count in errors.items():
+            result.errors[kind] = result.errors.get(kind, 0) + count
+        result.error_samples = (result.error_samples + samples)[:3]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {'count': 0}
+    array = np.asarray(values)
+    return {
+        'count': int(array.size),
+        'p50_ms': round(float(np.percentile(array, 50)), 2),
+        'p95_ms': round(float(np.percentile(array, 95)), 2),
+        'p99_ms': round(float(np.percentile(array, 99)), 2),
+        'max_ms': round(float(array.max()), 2),
+    }
+
+
+def run_level(host: str, port: int, concurrency: int, duration: float, targets: List[Target],
+              weights: np.ndarray, server_pid: Optional[int], timeout: float) -> Dict[str, Any]:
+    result, lock = LevelResult(), threading.Lock()
+    cpu_before = process_cpu_seconds(server_pid) if server_pid else None
+    started = time.perf_counter()
+    stop_at = started + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(host, port, targets, weights, stop_at, i, result, lock, timeout))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cpu_after = process_cpu_seconds(server_pid) if server_pid else None
+
+    all_latencies = [v for values in result.latencies.values() for v in values]
+    errors = sum(result.errors.values())
+    total = len(all_latencies) + errors
+    return {
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(len(all_latencies) / elapsed, 2),
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'server_cpu_cores': round((cpu_after - cpu_before) / elapsed, 2) if cpu_before is not None and cpu_after is not None else None,
+        'latency': summarize(all_latencies),
+        'by_endpoint': {kind: {**summarize(values), 'errors': result.errors.get(kind, 0)}
+                        for kind, values in sorted(result.latencies.items())},
+        'error_samples': result.error_samples,
+    }
+
+
+def saturation_report(levels: List[Dict[str, Any]], slo_ms: float, knee_gain: float) -> Dict[str, Any]:
+    """Best level within the p95 SLO, and the level after which throughput stops growing"""
+    within_slo = [level for level in levels
+                  if level['latency'].get('p95_ms', float('inf')) <= slo_ms and level['error_rate'] < 0.01]
+    best = max(within_slo, key=lambda level: level['concurrency']) if within_slo else None
+    knee = None
+    for previous, current in zip(levels, levels[1:]):
+        if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 + knee_gain):
+            knee = previous
+            break
+    return {
+        'slo_p95_ms': slo_ms,
+        'max_concurrency_within_slo': best['concurrency'] if best else None,
+        'max_throughput_within_slo_rps': best['throughput_rps'] if best else None,
+        'saturation_concurrency': knee['concurrency'] if knee else None,
+        'saturation_throughput_rps': knee['throughput_rps'] if knee else None,
+        'peak_throughput_rps': max(level['throughput_rps'] for level in levels),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test with a concurrency sweep")
+    parser.add_argument('--url', help="Existing server to target (default: start one on a free port)")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per concurrency level")
+    parser.add_argument('--warmup', type=float, default=3, help="Seconds of single-client warm-up")
+    parser.add_argument('--mix', default='ultimate=6,search=2,options=2', help="Endpoint weights")
+    parser.add_argument('--slo-ms', type=float, default=2000, help="p95 latency target")
+    parser.add_argument('--knee-gain', type=float, default=0.1,
+                        help="Throughput gain below which another level counts as saturated")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument('--startup-timeout', type=float, default=180)
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help="Disable the /ultimate-search result cache, so every search is computed")
+    parser.add_argument('--output', help="Write the full report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mix = parse_mix(args.mix)
+    available = build_targets()
+    unknown = set(mix) - set(available)
+    if unknown:
+        print(f"❌ Unknown mix entries: {', '.join(sorted(unknown))} (use {', '.join(available)})")
+        return 1
+    targets, weights = [], []
+    for kind, weight in mix.items():
+        targets += available[kind]
+        weights += [weight / len(available[kind])] * len(available[kind])
+    weights = np.asarray(weights)
+
+    process = None
+    if args.url:
+        parsed = urllib.parse.urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        host, port = '127.0.0.1', free_port()
+        print(f"🚀 Starting ultimate backend on port {port} ({args.workers} worker(s))...")
+        started = time.time()
+        process = start_server(port, args.workers, args.startup_timeout, result_cache=not args.no_result_cache)
+        print(f"✅ Ready in {time.time() - started:.1f}s")
+
+    try:
+        if args.warmup:
+            run_level(host, port, 1, args.warmup, targets, weights, None, args.timeout)
+        levels = []
+        print(f"\n  {'conc':>5} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'errors':>8} {'cpu':>6}")
+        for concurrency in args.concurrency:
+            level = run_level(host, port, concurrency, args.duration, targets, weights,
+                              process.pid if process else None, args.timeout)
+            levels.append(level)
+            latency = level['latency']
+            cpu = f"{level['server_cpu_cores']:.2f}" if level['server_cpu_cores'] is not None else '-'
+            print(f"  {concurrency:>5} {level['throughput_rps']:>9.1f} {latency.get('p50_ms', 0):>8.0f}ms "
+                  f"{latency.get('p95_ms', 0):>7.0f}ms {latency.get('p99_ms', 0):>7.0f}ms {latency.get('max_ms', 0):>7.0f}ms "
+                  f"{level['error_rate']:>7.1%} {cpu:>6}")
+            for sample in level['error_samples']:
+                print(f"        ⚠️ {sample}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print(f"\n📊 p95 by endpoint (ms)")
+    kinds = sorted({kind for level in levels for kind in level['by_endpoint']})
+    print(f"  {'conc':>5}" + ''.join(f"{kind:>12}" for kind in kinds))
+    for level in levels:
+        print(f"  {level['concurrency']:>5}" + ''.join(
+            f"{level['by_endpoint'].get(kind, {}).get('p95_ms', 0):>12.0f}" for kind in kinds))
+
+    report = saturation_report(levels, args.slo_ms, args.knee_gain)
+    print(f"\n🚦 Saturation report")
+    if report['max_concurrency_within_slo'] is not None:
+        print(f"  ✅ Within p95 <= {args.slo_ms:.0f}ms: up to {report['max_concurrency_within_slo']} concurrent clients, "
+              f"{report['max_throughput_within_slo_rps']:.1f} req/s")
+    else:
+        print(f"  ❌ No level met p95 <= {args.slo_ms:.0f}ms with < 1% errors")
+    if report['saturation_concurrency'] is not None:
+        print(f"  📈 Throughput flattens after {report['saturation_concurrency']} clients "
+              f"({report['saturation_throughput_rps']:.1f} req/s); more clients only add queueing")
+    else:
+        print(f"  📈 Throughput still rising at {args.concurrency[-1]} clients; extend --concurrency")
+    print(f"  🔝 Peak throughput {report['peak_throughput_rps']:.1f} req/s")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            'target': args.url or f"local:{port}", 'workers': args.workers, 'mix': mix,
+            'levels': levels, 'saturation': report,
+        }, indent=2))
+        print(f"✅ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
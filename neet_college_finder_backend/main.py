@@ -1,8 +1,13 @@
+import time
+_IMPORT_STARTED = time.perf_counter()  # Module import is the first timed startup phase
+
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware import Middleware
+from starlette.routing import Match
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Union, Tuple
 import pandas as pd
 import os
 import re
@@ -10,14 +15,15 @@ from pathlib import Path
 import uvicorn
 from enum import Enum
 import io
+import json
+import uuid
+import asyncio
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-import tempfile
 
 app = FastAPI(
     title="Advanced NEET College Finder",
@@ -88,41 +94,45 @@ neet_data = {
     "pg_state_wise": None
 }
 
+# Data file behind each dataset key, and a content hash of the file loaded
+DATASET_FILES = {
+    "ug_all_india": "NEET_UG_all_india.csv",
+    "ug_state_wise": "NEET_UG_statewise.csv",
+    "pg_all_india": "NEET_PG_all_india.csv",
+    "pg_state_wise": "NEET_PG_statewise.csv",
+}
+dataset_versions: Dict[str, str] = {}
+
 class NEETCollegeFinder:
     def __init__(self):
-        self.data_path = Path("D:/DESKTOP-L/College Finder/data/raw")
-        self.load_data()
+        # Repo data directory unless NEET_DATA_DIR points elsewhere
+        self.data_path = Path(os.getenv("NEET_DATA_DIR", Path(__file__).parent.parent / "data" / "raw"))
+        self.searches_in_flight = 0
+        self.started_at = time.time()
+        self._activity_lock = threading.Lock()
+        # Data is loaded by the startup pipeline once the server is accepting connections
     
-    def load_data(self):
-        """Load all NEET data files"""
+    def load_data(self, phases: Optional[Dict[str, float]] = None):
+        """Load all NEET data files (seconds per phase are added to ``phases``)"""
+        phases = phases if phases is not None else {}
         try:
-            # Load NEET UG data - use comma separator and handle encoding
-            neet_data["ug_all_india"] = pd.read_csv(
-                self.data_path / "NEET_UG_all_india.csv", 
-                encoding='utf-8-sig'
-            )
-            neet_data["ug_state_wise"] = pd.read_csv(
-                self.data_path / "NEET_UG_statewise.csv", 
-                encoding='utf-8-sig'
-            )
-            
-            # Load NEET PG data
-            neet_data["pg_all_india"] = pd.read_csv(
-                self.data_path / "NEET_PG_all_india.csv", 
-                encoding='utf-8-sig'
-            )
-            neet_data["pg_state_wise"] = pd.read_csv(
-                self.data_path / "NEET_PG_statewise.csv", 
-                encoding='utf-8-sig'
-            )
+            # Load NEET UG and PG data - use comma separator and handle encoding
+            start = time.perf_counter()
+            for key, filename in DATASET_FILES.items():
+                raw = (self.data_path / filename).read_bytes()
+                dataset_versions[key] = hashlib.sha256(raw).hexdigest()[:12]
+                neet_data[key] = pd.read_csv(io.BytesIO(raw), encoding='utf-8-sig')
+            phases['read_csv'] = time.perf_counter() - start
             
             # Clean column names to remove any BOM or extra spaces
+            start = time.perf_counter()
             for key, df in neet_data.items():
                 if df is not None:
                     # Strip BOM and whitespace from column names
                     df.columns = df.columns.str.replace('\ufeff', '').str.strip()
                     # Replace any None/NaN values in important columns
                     df.fillna('-', inplace=True)
+            phases['clean'] = time.perf_counter() - start
             
             print("All NEET data loaded successfully!")
             self.print_data_summary()
@@ -495,15 +505,21 @@ class NEETCollegeFinder:
             return beds_str  # Return original string if can't convert
     
     def generate_pdf_report(self, recommendations: List[CollegeRecommendation], 
-                          search_criteria: dict, user_rank: int) -> str:
+                          search_criteria: dict, user_rank: int) -> bytes:
         """Generate beautiful PDF report of college recommendations"""
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', prefix='NEET_Colleges_')
-        temp_filename = temp_file.name
-        temp_file.close()
+        # reportlab is only imported by the first export, not by search-only workers
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.lib.enums import TA_CENTER
+        
+        # Render into memory - nothing is written to disk
+        buffer = io.BytesIO()
         
         # Create PDF document
-        doc = SimpleDocTemplate(temp_filename, pagesize=A4, 
+        doc = SimpleDocTemplate(buffer, pagesize=A4, 
                               rightMargin=72, leftMargin=72, 
                               topMargin=72, bottomMargin=18)
         
@@ -612,7 +628,7 @@ class NEETCollegeFinder:
         # Build PDF
         doc.build(story)
         
-        return temp_filename
+        return buffer.getvalue()
     
     def calculate_summary_stats(self, recommendations: List[CollegeRecommendation]) -> dict:
         """Calculate summary statistics for recommendations"""
@@ -626,6 +642,8 @@ class NEETCollegeFinder:
     
     def search_colleges(self, request: SearchRequest) -> List[CollegeRecommendation]:
         """Search for colleges based on user criteria"""
+        with self._activity_lock:
+            self.searches_in_flight += 1
         try:
             # Select appropriate dataset
             if request.exam_type == ExamType.NEET_UG:
@@ -740,6 +758,9 @@ class NEETCollegeFinder:
         except Exception as e:
             print(f"Error searching colleges: {e}")
             raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+        finally:
+            with self._activity_lock:
+                self.searches_in_flight -= 1
     
     def get_recommendation_text(self, safety_level: str, score: float) -> str:
         """Generate recommendation text based on safety level for AIR rank predictions"""
@@ -758,8 +779,367 @@ class NEETCollegeFinder:
         else:
             return "Insufficient historical data available for reliable prediction with your AIR rank."
 
-# Initialize the college finder
+# PDF export settings
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_MB", "64")) * 1024 * 1024
+EXPORT_JOB_TTL_SECONDS = int(os.getenv("EXPORT_JOB_TTL_SECONDS", "3600"))
+
+class ReportExporter:
+    """Renders PDF reports in a worker pool and keeps recent ones in memory
+    
+    Search + render run in worker threads so the event loop stays free.
+    Finished reports are cached by a hash of the search request (LRU, bounded
+    by total bytes), and identical requests already rendering share the same
+    work. Jobs give large exports a submit / status / download flow.
+    """
+    
+    def __init__(self, finder: 'NEETCollegeFinder', max_workers: int = EXPORT_WORKERS,
+                 cache_max_bytes: int = EXPORT_CACHE_MAX_BYTES, job_ttl_seconds: int = EXPORT_JOB_TTL_SECONDS):
+        self.finder = finder
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-export")
+        self.cache_max_bytes = cache_max_bytes
+        self.job_ttl_seconds = job_ttl_seconds
+        self.cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self.cache_bytes = 0
+        self.in_flight: Dict[str, Future] = {}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def request_key(request: SearchRequest) -> str:
+        payload = json.dumps(request.dict(), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    @staticmethod
+    def filename(request: SearchRequest) -> str:
+        user_rank = request.rank_min if request.rank_min == request.rank_max else int((request.rank_min + request.rank_max) / 2)
+        return f"NEET_Colleges_Rank_{user_rank}_{request.exam_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    
+    def cached(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            pdf = self.cache.get(key)
+            if pdf is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return pdf
+    
+    def _store(self, key: str, pdf: bytes):
+        with self.lock:
+            if key not in self.cache:
+                self.cache_bytes += len(pdf)
+            self.cache[key] = pdf
+            self.cache.move_to_end(key)
+            while self.cache_bytes > self.cache_max_bytes and len(self.cache) > 1:
+                _, evicted = self.cache.popitem(last=False)
+                self.cache_bytes -= len(evicted)
+    
+    def _render(self, key: str, request: SearchRequest) -> bytes:
+        """Worker thread: search, render, cache"""
+        try:
+            recommendations = self.finder.search_colleges(request)
+            if not recommendations:
+                raise LookupError("No colleges found matching your criteria")
+            user_rank = request.rank_min if request.rank_min == request.rank_max else int((request.rank_min + request.rank_max) / 2)
+            pdf = self.finder.generate_pdf_report(recommendations, request.dict(), user_rank)
+            self._store(key, pdf)
+            return pdf
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+    
+    def submit(self, request: SearchRequest) -> Future:
+        """Future for the rendered PDF; reuses the cache and identical in-flight renders"""
+        key = self.request_key(request)
+        pdf = self.cached(key)
+        if pdf is not None:
+            future = Future()
+            future.set_result(pdf)
+            return future
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is None:
+                future = self.executor.submit(self._render, key, request)
+                self.in_flight[key] = future
+            return future
+    
+    async def render(self, request: SearchRequest) -> bytes:
+        return await asyncio.wrap_future(self.submit(request))
+    
+    def create_job(self, request: SearchRequest) -> Dict[str, Any]:
+        self._prune_jobs()
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "filename": self.filename(request),
+            "created_at": time.time(),
+            "future": self.submit(request),
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+        return self.job_status(job)
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._prune_jobs()
+        with self.lock:
+            return self.jobs.get(job_id)
+    
+    @staticmethod
+    def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+        future = job["future"]
+        if future.done():
+            error = future.exception()
+            status = "failed" if error else "done"
+        else:
+            error = None
+            status = "running" if future.running() else "queued"
+        result = {
+            "job_id": job["job_id"],
+            "status": status,
+            "created_at": datetime.fromtimestamp(job["created_at"]).isoformat(),
+            "status_url": f"/export-pdf/jobs/{job['job_id']}",
+            "download_url": f"/export-pdf/jobs/{job['job_id']}/download",
+        }
+        if status == "done":
+            result["size_bytes"] = len(future.result())
+        if error:
+            result["error"] = str(error)
+        return result
+    
+    def _prune_jobs(self):
+        cutoff = time.time() - self.job_ttl_seconds
+        with self.lock:
+            for job_id in [j for j, job in self.jobs.items() if job["created_at"] < cutoff and job["future"].done()]:
+                del self.jobs[job_id]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "cached_reports": len(self.cache),
+                "cache_bytes": self.cache_bytes,
+                "rendering": len(self.in_flight),
+                "queued": self.executor._work_queue.qsize(),
+                "jobs": len(self.jobs),
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+            }
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in seconds"""
+    
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+class RequestMetrics:
+    """Per-route request counters and latency histograms, labelled by path template"""
+    
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.latency: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+    
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        with self.lock:
+            self.requests[(method, route, status)] += 1
+            self.latency[(method, route)].observe(seconds)
+
+class MetricsMiddleware:
+    """ASGI middleware feeding RequestMetrics"""
+    
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        start = time.perf_counter()
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.in_flight -= 1
+            route = scope.get("route")
+            self.metrics.observe(scope["method"], getattr(route, "path", "unmatched"), status,
+                                 time.perf_counter() - start)
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task"""
+    
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+    
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+# Readiness gate: seconds a gated request is told to wait, and paths served while warming
+READINESS_RETRY_AFTER = int(os.getenv("READINESS_RETRY_AFTER", "5"))
+READINESS_EXEMPT_PATHS = {"/", "/livez", "/readyz", "/health", "/metrics", "/docs", "/docs/oauth2-redirect",
+                          "/redoc", "/openapi.json"}
+
+class StartupPipeline:
+    """Loads the datasets after the server binds: starting -> warming -> ready (or failed)
+    
+    The startup hook runs ``run`` in a worker thread so the port opens within
+    the import time; scripts that import the module call ``run()`` directly.
+    """
+    
+    def __init__(self, finder: 'NEETCollegeFinder'):
+        self.finder = finder
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.phases: Dict[str, float] = {}  # Phase -> seconds
+        self.time_to_ready: Optional[float] = None  # Seconds from module import to ready
+        self.task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+    
+    def run(self):
+        with self._lock:
+            if self.status != "starting":
+                return
+            self.status = "warming"
+        start = time.perf_counter()
+        try:
+            self.finder.load_data(self.phases)
+        except Exception as e:
+            self.status, self.error = "failed", str(getattr(e, 'detail', e))
+            print(f"Startup failed: {self.error}")
+            raise
+        self.phases['data_load'] = time.perf_counter() - start
+        self.time_to_ready = time.perf_counter() - _IMPORT_STARTED
+        self.status = "ready"
+        print(f"Ready {self.time_to_ready:.2f}s after import started")
+    
+    async def run_in_background(self):
+        try:
+            await asyncio.to_thread(self.run)
+        except Exception:
+            pass  # Status and error are recorded for /health and /readyz
+    
+    def checks(self) -> Dict[str, bool]:
+        return {"datasets_loaded": all(neet_data.get(key) is not None for key in DATASET_FILES)}
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "phases_ms": {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()},
+            "time_to_ready_seconds": round(self.time_to_ready, 3) if self.time_to_ready is not None else None,
+        }
+
+class ReadinessGateMiddleware:
+    """Answers 503 + Retry-After until the startup pipeline is ready (route is still resolved for /metrics)"""
+    
+    def __init__(self, app, pipeline: StartupPipeline, routes: list):
+        self.app = app
+        self.pipeline = pipeline
+        self.routes = routes
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or self.pipeline.is_ready or scope['path'] in READINESS_EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+        for route in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                scope['route'] = route
+                break
+        failed = self.pipeline.status == "failed"
+        response = JSONResponse(
+            status_code=503,
+            content={
+                "detail": "Startup failed; this worker cannot serve requests" if failed
+                          else "Service is warming up; retry shortly",
+                "startup_status": self.pipeline.status,
+            },
+            headers={} if failed else {"Retry-After": str(READINESS_RETRY_AFTER)},
+        )
+        await response(scope, receive, send)
+
+class PrometheusWriter:
+    """Builds the Prometheus text exposition format"""
+    
+    def __init__(self):
+        self.lines: List[str] = []
+        self.declared = set()
+    
+    @staticmethod
+    def labels(labels: Dict[str, Any]) -> str:
+        if not labels:
+            return ""
+        escaped = {name: str(value).replace("\\", "\\\\").replace('"', '\\"') for name, value in labels.items()}
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped.items()) + "}"
+    
+    def declare(self, name: str, kind: str, help_text: str):
+        if name not in self.declared:
+            self.declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+    
+    def sample(self, name: str, kind: str, help_text: str, value: float, **labels):
+        self.declare(name, kind, help_text)
+        self.lines.append(f"{name}{self.labels(labels)} {float(value):.6g}")
+    
+    def histogram(self, name: str, help_text: str, histogram: LatencyHistogram, **labels):
+        self.declare(name, "histogram", help_text)
+        cumulative = 0
+        for bound, bucket_count in zip((*histogram.BUCKETS, None), histogram.counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound is None else f"{bound:g}"
+            self.lines.append(f"{name}_bucket{self.labels({**labels, 'le': le})} {cumulative}")
+        self.lines.append(f"{name}_sum{self.labels(labels)} {histogram.sum:.6g}")
+        self.lines.append(f"{name}_count{self.labels(labels)} {histogram.count}")
+    
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+# Initialize the college finder (datasets load in the startup pipeline)
 college_finder = NEETCollegeFinder()
+startup_pipeline = StartupPipeline(college_finder)
+report_exporter = ReportExporter(college_finder)
+
+# Request metrics for /metrics
+request_metrics = RequestMetrics()
+loop_lag_monitor = EventLoopLagMonitor()
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
+# Gate data routes until ready; innermost, so 503s still carry CORS headers and are counted in /metrics
+app.user_middleware.append(Middleware(ReadinessGateMiddleware, pipeline=startup_pipeline, routes=app.router.routes))
+
+@app.on_event("startup")
+async def start_background_tasks():
+    startup_pipeline.task = asyncio.create_task(startup_pipeline.run_in_background())
+    asyncio.create_task(loop_lag_monitor.run())
 
 # API Endpoints
 @app.get("/")
@@ -776,7 +1156,11 @@ async def root():
             "/courses": "Get available courses",
             "/search": "Search for colleges (JSON response)",
             "/export-pdf": "Export college recommendations as beautiful PDF report",
-            "/health": "API health check"
+            "/export-pdf/jobs": "Queue a PDF export job (status + download URLs)",
+            "/health": "API health check",
+            "/livez": "Liveness probe",
+            "/readyz": "Readiness probe (503 + Retry-After until data is loaded)",
+            "/metrics": "Prometheus metrics"
         },
         "features": [
             "Only shows colleges where admission is ACTUALLY possible",
@@ -860,47 +1244,73 @@ async def search_colleges(request: SearchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def validate_export_request(request: SearchRequest):
+    """Same rank checks as /search"""
+    if request.rank_min > request.rank_max:
+        raise HTTPException(status_code=400, detail="Minimum rank cannot be greater than maximum rank")
+    
+    max_rank_limit = 1250000 if request.exam_type == ExamType.NEET_UG else 200000
+    if request.rank_max > max_rank_limit:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Rank range exceeds limit for {request.exam_type.value} (max: {max_rank_limit})"
+        )
+
+def pdf_response(pdf: bytes, filename: str) -> Response:
+    return Response(
+        content=pdf,
+        media_type='application/pdf',
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @app.post("/export-pdf")
 async def export_colleges_pdf(request: SearchRequest):
     """Export college recommendations as a beautiful PDF report"""
     try:
-        # Validate rank range
-        if request.rank_min > request.rank_max:
-            raise HTTPException(status_code=400, detail="Minimum rank cannot be greater than maximum rank")
-        
-        # Validate rank limits based on exam type
-        max_rank_limit = 1250000 if request.exam_type == ExamType.NEET_UG else 200000
-        if request.rank_max > max_rank_limit:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Rank range exceeds limit for {request.exam_type.value} (max: {max_rank_limit})"
-            )
-        
-        # Get college recommendations
-        recommendations = college_finder.search_colleges(request)
-        
-        if not recommendations:
-            raise HTTPException(status_code=404, detail="No colleges found matching your criteria")
-        
-        # Generate PDF report
-        user_rank = request.rank_min if request.rank_min == request.rank_max else int((request.rank_min + request.rank_max) / 2)
-        search_criteria = request.dict()
-        
-        pdf_file_path = college_finder.generate_pdf_report(recommendations, search_criteria, user_rank)
+        validate_export_request(request)
         
-        # Generate filename with student details
-        filename = f"NEET_Colleges_Rank_{user_rank}_{request.exam_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        
-        return FileResponse(
-            path=pdf_file_path,
-            filename=filename,
-            media_type='application/pdf',
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        # Rendered in the export worker pool (or served from the report cache)
+        pdf = await report_exporter.render(request)
+        return pdf_response(pdf, report_exporter.filename(request))
     
+    except HTTPException:
+        raise
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
 
+@app.post("/export-pdf/jobs", status_code=202)
+async def submit_pdf_export_job(request: SearchRequest):
+    """Queue a PDF export; poll the status URL, then fetch the download URL"""
+    validate_export_request(request)
+    return report_exporter.create_job(request)
+
+@app.get("/export-pdf/jobs/{job_id}")
+async def get_pdf_export_job(job_id: str):
+    """Status of a queued PDF export"""
+    job = report_exporter.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found or expired")
+    return report_exporter.job_status(job)
+
+@app.get("/export-pdf/jobs/{job_id}/download")
+async def download_pdf_export_job(job_id: str):
+    """Download a finished PDF export"""
+    job = report_exporter.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found or expired")
+    
+    future = job["future"]
+    if not future.done():
+        raise HTTPException(status_code=409, detail="Export is still rendering")
+    error = future.exception()
+    if isinstance(error, LookupError):
+        raise HTTPException(status_code=404, detail=str(error))
+    if error:
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(error)}")
+    return pdf_response(future.result(), job["filename"])
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -912,10 +1322,75 @@ async def health_check():
         }
     
     return {
-        "status": "healthy",
-        "data_status": data_status
+        "status": {"ready": "healthy", "failed": "startup failed"}.get(startup_pipeline.status, "warming up"),
+        "ready": startup_pipeline.is_ready,
+        "startup": startup_pipeline.as_dict(),
+        "data_status": data_status,
+        "pdf_exports": report_exporter.stats()
     }
 
+@app.get("/livez")
+async def liveness_probe():
+    """Liveness: the process serves requests (503 only if startup failed)"""
+    if startup_pipeline.status == "failed":
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup_pipeline.error})
+    return {"status": "alive", "uptime_seconds": round(time.time() - college_finder.started_at, 1)}
+
+@app.get("/readyz")
+async def readiness_probe():
+    """Readiness: datasets loaded"""
+    body = {"ready": startup_pipeline.is_ready, "checks": startup_pipeline.checks(), "startup": startup_pipeline.as_dict()}
+    if startup_pipeline.is_ready:
+        return body
+    headers = {} if startup_pipeline.status == "failed" else {"Retry-After": str(READINESS_RETRY_AFTER)}
+    return JSONResponse(status_code=503, content=body, headers=headers)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    writer = PrometheusWriter()
+    with request_metrics.lock:
+        requests = sorted(request_metrics.requests.items())
+        latency = sorted(request_metrics.latency.items())
+        for (method, route, status), count in requests:
+            writer.sample("http_requests_total", "counter", "HTTP requests by route and status",
+                          count, method=method, route=route, status=status)
+        for (method, route), histogram in latency:
+            writer.histogram("http_request_duration_seconds", "HTTP request latency by route",
+                             histogram, method=method, route=route)
+    writer.sample("http_requests_in_flight", "gauge", "HTTP requests being handled", request_metrics.in_flight)
+    writer.sample("searches_in_flight", "gauge", "College searches in progress (API and PDF workers)",
+                  college_finder.searches_in_flight)
+    
+    exports = report_exporter.stats()
+    lookups = exports["cache_hits"] + exports["cache_misses"]
+    writer.sample("cache_hits_total", "counter", "Cache hits", exports["cache_hits"], cache="pdf_reports")
+    writer.sample("cache_misses_total", "counter", "Cache misses", exports["cache_misses"], cache="pdf_reports")
+    writer.sample("cache_hit_ratio", "gauge", "Cache hits / lookups",
+                  exports["cache_hits"] / lookups if lookups else 0, cache="pdf_reports")
+    writer.sample("cache_bytes", "gauge", "Bytes held by the cache", exports["cache_bytes"], cache="pdf_reports")
+    writer.sample("executor_busy_workers", "gauge", "Renders running in the executor",
+                  exports["rendering"], executor="pdf_export")
+    writer.sample("executor_queue_depth", "gauge", "Renders waiting for a worker",
+                  exports["queued"], executor="pdf_export")
+    writer.sample("event_loop_lag_seconds", "gauge", "Latest event loop wake-up delay", loop_lag_monitor.last_lag)
+    writer.sample("event_loop_lag_max_seconds", "gauge", "Largest event loop wake-up delay seen", loop_lag_monitor.max_lag)
+    
+    for key, df in neet_data.items():
+        writer.sample("dataset_rows", "gauge", "Rows loaded per dataset", len(df) if df is not None else 0, dataset=key)
+    for key, version in dataset_versions.items():
+        writer.sample("dataset_info", "gauge", "Loaded dataset version (content hash)", 1, dataset=key, version=version)
+    writer.sample("process_uptime_seconds", "gauge", "Seconds since the finder was created",
+                  time.time() - college_finder.started_at)
+    writer.sample("startup_ready", "gauge", "1 once the datasets are loaded", int(startup_pipeline.is_ready))
+    for phase, seconds in startup_pipeline.phases.items():
+        writer.sample("startup_phase_seconds", "gauge", "Time spent in each startup phase", seconds, phase=phase)
+    
+    return Response(content=writer.render(), media_type="text/plain; version=0.0.4")
+
+# Everything above ran at import; the remaining phases run in startup_pipeline
+startup_pipeline.phases['import'] = time.perf_counter() - _IMPORT_STARTED
+
 if __name__ == "__main__":
     print("Starting Advanced NEET College Finder API...")
     uvicorn.run(app, host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
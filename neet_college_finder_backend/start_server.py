@@ -6,6 +6,7 @@ Startup script for NEET College Finder API Server
 import sys
 import os
 import subprocess
+import importlib.util
 from pathlib import Path
 
 def check_python_version():
@@ -17,7 +18,7 @@ def check_python_version():
 
 def check_data_files():
     """Check if required data files exist"""
-    data_path = Path("../data/raw")
+    data_path = Path(os.getenv("NEET_DATA_DIR", Path(__file__).parent.parent / "data" / "raw"))
     required_files = [
         "NEET_UG_all_india.csv",
         "NEET_UG_statewise.csv", 
@@ -52,10 +53,9 @@ def check_requirements():
     
     missing_packages = []
     
+    # find_spec locates a package without importing it
     for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+        if importlib.util.find_spec(package) is None:
             missing_packages.append(package)
     
     if missing_packages:
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+🎲 NEET COUNSELING ALLOCATION SIMULATOR 🎲
+Offline round-by-round seat allocation for a whole cohort of students
+
+Every seat group (institute x course x quota x category row of a dataset) gets
+a seat count, every student a merit rank, a category and a preference list of
+seat groups. Each round runs student-proposing deferred acceptance with merit
+rank as the common priority, some allotted students then withdraw, and the
+next round re-allocates the freed seats. The simulated closing rank of a seat
+group in a round is the worst rank allotted to it, which is compared against
+the dataset's "CR <year> <round>" columns.
+
+Preferences and proposals are processed as arrays (one sort per proposal
+step), so a cohort of a million students runs in minutes on one machine.
+Quota domicile rules are not modelled: any student may list any quota.
+
+Usage:
+    python allocation_simulator.py --dataset ug_all_india --students 1000000
+    python allocation_simulator.py --cohort cohort.csv --seat-matrix seats.csv
+    python allocation_simulator.py --export-seat-groups seat_groups.csv
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Seat categories open to every student
+OPEN_CATEGORIES = {'OPEN', 'GEN', 'GN', 'UR', 'GENERAL', 'OPEN-GEN'}
+
+SEAT_GROUP_COLUMNS = {
+    'INSTITUTE': ('INSTITUTE', 'Institute'),
+    'COURSE': ('COURSE', 'Course'),
+    'QUOTA': ('QUOTA', 'Quota'),
+    'CATEGORY': ('CATEGORY', 'Category'),
+    'STATE': ('STATE', 'State'),
+}
+
+
+@dataclass
+class SeatGroups:
+    """Seat groups of one dataset with everything the allocation needs as arrays"""
+    frame: pd.DataFrame            # INSTITUTE, COURSE, QUOTA, CATEGORY, STATE, SEATS
+    seats: np.ndarray              # seat count per group
+    category_codes: np.ndarray     # factorized seat category per group
+    categories: List[str]          # category label per code
+    is_open: np.ndarray            # group open to every category
+    historic_cutoff: np.ndarray    # latest complete final closing rank (NaN if none)
+    popularity: np.ndarray         # preference weight: better cutoff -> more popular
+
+    def __len__(self):
+        return len(self.seats)
+
+
+@dataclass
+class Cohort:
+    """Students sorted by merit rank"""
+    ranks: np.ndarray              # merit rank per student (ascending)
+    category_codes: np.ndarray     # student category, coded like SeatGroups.category_codes
+    preferences: Optional[np.ndarray] = None  # (students x choices) seat group ids, -1 padded
+
+    def __len__(self):
+        return len(self.ranks)
+
+
+# ===============================
+# 🏥 SEAT GROUPS
+# ===============================
+
+def load_seat_groups(df: pd.DataFrame, latest_final: np.ndarray, default_seats: int = 2,
+                     seat_matrix: Optional[Path] = None, popularity_weight: float = 1.0) -> SeatGroups:
+    """Build seat groups from a loaded dataset and optional uploaded seat matrix
+
+    The seat matrix CSV needs INSTITUTE, COURSE, QUOTA, CATEGORY and SEATS
+    columns; groups missing from it get ``default_seats``.
+    """
+    frame = pd.DataFrame({
+        name: (df[next(c for c in candidates if c in df.columns)].astype(str).str.strip().to_numpy()
+               if any(c in df.columns for c in candidates) else '-')
+        for name, candidates in SEAT_GROUP_COLUMNS.items()
+    })
+    frame['SEATS'] = default_seats
+
+    if seat_matrix is not None:
+        uploaded = pd.read_csv(seat_matrix, encoding='utf-8-sig')
+        uploaded.columns = uploaded.columns.str.strip().str.upper()
+        keys = ['INSTITUTE', 'COURSE', 'QUOTA', 'CATEGORY']
+        for key in keys:
+            uploaded[key] = uploaded[key].astype(str).str.strip()
+        uploaded = uploaded.groupby(keys, as_index=False)['SEATS'].sum()
+        merged = frame[keys].merge(uploaded, on=keys, how='left')
+        matched = merged['SEATS'].notna().to_numpy()
+        frame.loc[matched, 'SEATS'] = merged.loc[matched, 'SEATS'].astype(int).to_numpy()
+        print(f"📋 Seat matrix matched {matched.sum():,} of {len(frame):,} seat groups")
+
+    category_codes, categories = pd.factorize(frame['CATEGORY'])
+    is_open = frame['CATEGORY'].str.upper().isin(OPEN_CATEGORIES).to_numpy()
+
+    # Popular groups close early: log of the historic cutoff drives preference,
+    # groups without history get the median
+    log_cutoff = np.log(latest_final)
+    log_cutoff = np.where(np.isnan(log_cutoff), np.nanmedian(log_cutoff), log_cutoff)
+    popularity = (-popularity_weight * (log_cutoff - log_cutoff.mean())).astype(np.float32)
+
+    return SeatGroups(
+        frame=frame,
+        seats=frame['SEATS'].to_numpy(dtype=np.int64),
+        category_codes=category_codes.astype(np.int32),
+        categories=list(categories),
+        is_open=is_open,
+        historic_cutoff=latest_final,
+        popularity=popularity,
+    )
+
+
+# ===============================
+# 👥 COHORT
+# ===============================
+
+def synthetic_cohort(groups: SeatGroups, n_students: int, rng: np.random.Generator) -> Cohort:
+    """Ranks 1..n with categories drawn in proportion to each category's seats"""
+    seats_per_category = np.bincount(groups.category_codes, weights=groups.seats, minlength=len(groups.categories))
+    shares = seats_per_category / seats_per_category.sum()
+    return Cohort(
+        ranks=np.arange(1, n_students + 1, dtype=np.int64),
+        category_codes=rng.choice(len(shares), size=n_students, p=shares).astype(np.int32),
+    )
+
+
+def load_cohort(path: Path, groups: SeatGroups) -> Cohort:
+    """Read RANK, CATEGORY and optional PREFERENCES (";"-separated seat group ids)"""
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    df.columns = df.columns.str.strip().str.upper()
+    df = df.sort_values('RANK', kind='stable').reset_index(drop=True)
+
+    lookup = {category: code for code, category in enumerate(groups.categories)}
+    categories = df['CATEGORY'].astype(str).str.strip()
+    unknown = sorted(set(categories) - set(lookup))
+    if unknown:
+        print(f"⚠️  Unknown categories treated as open-only: {', '.join(unknown[:10])}")
+    open_code = next((lookup[c] for c in groups.categories if c.upper() in OPEN_CATEGORIES), -1)
+
+    preferences = None
+    if 'PREFERENCES' in df.columns:
+        lists = df['PREFERENCES'].fillna('').astype(str).str.split(';')
+        n_choices = max(1, int(lists.str.len().max()))
+        preferences = np.full((len(df), n_choices), -1, dtype=np.int32)
+        for i, choices in enumerate(lists):
+            ids = [int(c) for c in choices if c.strip().lstrip('-').isdigit()]
+            ids = [c for c in ids if 0 <= c < len(groups)]
+            preferences[i, :len(ids)] = ids
+
+    category_codes = categories.map(lookup).fillna(open_code).to_numpy(dtype=np.int32)
+    if preferences is not None:
+        # Drop choices outside the student's category (and open seats), keeping list order
+        listed = preferences >= 0
+        choice = np.where(listed, preferences, 0)
+        eligible = listed & (groups.is_open[choice] | (groups.category_codes[choice] == category_codes[:, None]))
+        order = np.argsort(~eligible, axis=1, kind='stable')
+        preferences = np.where(np.take_along_axis(eligible, order, axis=1),
+                               np.take_along_axis(preferences, order, axis=1), -1)
+
+    return Cohort(
+        ranks=df['RANK'].to_numpy(dtype=np.int64),
+        category_codes=category_codes,
+        preferences=preferences,
+    )
+
+
+def generate_preferences(cohort: Cohort, groups: SeatGroups, n_choices: int, rng: np.random.Generator,
+                         reach_factor: float = 0.5, chunk_cells: int = 8_000_000) -> np.ndarray:
+    """Gumbel top-k preference lists over each student's eligible seat groups
+
+    Utility is group popularity plus Gumbel noise, so the top ``n_choices``
+    are a sample without replacement proportional to exp(popularity). Students
+    do not list groups whose historic cutoff is better than ``reach_factor``
+    times their rank.
+    """
+    preferences = np.full((len(cohort), n_choices), -1, dtype=np.int32)
+    cutoff = np.where(np.isnan(groups.historic_cutoff), np.inf, groups.historic_cutoff)
+
+    for code in range(len(groups.categories)):
+        students = np.flatnonzero(cohort.category_codes == code)
+        eligible = np.flatnonzero(groups.is_open | (groups.category_codes == code))
+        if students.size == 0 or eligible.size == 0:
+            continue
+        k = min(n_choices, eligible.size)
+        popularity = groups.popularity[eligible]
+        reach = cutoff[eligible]
+        chunk_size = max(1000, chunk_cells // eligible.size)
+
+        for start in range(0, students.size, chunk_size):
+            chunk = students[start:start + chunk_size]
+            uniform = rng.random((chunk.size, eligible.size), dtype=np.float32)
+            utility = popularity[None, :] - np.log(-np.log(np.maximum(uniform, 1e-12)))
+            utility[reach[None, :] < reach_factor * cohort.ranks[chunk][:, None]] = -np.inf
+
+            top = np.argpartition(-utility, k - 1, axis=1)[:, :k]
+            top_utility = np.take_along_axis(utility, top, axis=1)
+            order = np.argsort(-top_utility, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            choices = eligible[top]
+            choices[np.isneginf(np.take_along_axis(top_utility, order, axis=1))] = -1
+            preferences[chunk, :k] = choices
+
+    return preferences
+
+
+# ===============================
+# 🔄 ALLOCATION
+# ===============================
+
+def deferred_acceptance(preferences: np.ndarray, ranks: np.ndarray, seats: np.ndarray,
+                        active: np.ndarray) -> np.ndarray:
+    """Student-proposing deferred acceptance with merit rank as common priority
+
+    All free students propose to their next choice at once; each group keeps
+    its best-ranked proposers and holders up to capacity (one lexsort per
+    step) and the rest move down their lists. Returns the allotted seat group
+    per student, -1 if none.
+    """
+    n_students, n_choices = preferences.shape
+    pointer = np.zeros(n_students, dtype=np.int32)
+    held = np.full(n_students, -1, dtype=np.int32)
+    proposers = np.flatnonzero(active & (preferences[:, 0] >= 0))
+
+    while proposers.size:
+        holders = np.flatnonzero(held >= 0)
+        students = np.concatenate([holders, proposers])
+        targets = np.concatenate([held[holders], preferences[proposers, pointer[proposers]]])
+
+        order = np.lexsort((ranks[students], targets))
+        students, targets = students[order], targets[order]
+        group_start = np.searchsorted(targets, targets, side='left')
+        accepted = (np.arange(targets.size) - group_start) < seats[targets]
+
+        held[students[accepted]] = targets[accepted]
+        rejected = students[~accepted]
+        held[rejected] = -1
+        pointer[rejected] += 1
+
+        rejected = rejected[pointer[rejected] < n_choices]
+        proposers = rejected[preferences[rejected, pointer[rejected]] >= 0]
+
+    return held
+
+
+def simulate_rounds(cohort: Cohort, groups: SeatGroups, n_rounds: int, withdrawal_rate: float,
+                    rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Round-by-round allocation; allotted students withdraw between rounds
+
+    With merit as the common priority, re-running the allocation on the
+    remaining students never leaves anyone worse off than their previous
+    allotment, which is the upgrade behaviour of later counseling rounds.
+    """
+    active = np.ones(len(cohort), dtype=bool)
+    closing = np.full((len(groups), n_rounds), np.nan)
+    filled = np.zeros((len(groups), n_rounds), dtype=np.int64)
+    allotted_per_round = []
+
+    for r in range(n_rounds):
+        started = time.time()
+        held = deferred_acceptance(cohort.preferences, cohort.ranks, groups.seats, active)
+        allotted = np.flatnonzero(held >= 0)
+
+        worst = np.zeros(len(groups), dtype=np.int64)
+        np.maximum.at(worst, held[allotted], cohort.ranks[allotted])
+        closing[:, r] = np.where(worst > 0, worst, np.nan)
+        filled[:, r] = np.bincount(held[allotted], minlength=len(groups))
+        allotted_per_round.append(int(allotted.size))
+        print(f"   Round {r + 1}: {allotted.size:,} allotted in {time.time() - started:.1f}s")
+
+        if r < n_rounds - 1 and withdrawal_rate > 0:
+            leaving = allotted[rng.random(allotted.size) < withdrawal_rate]
+            active[leaving] = False
+
+    return {'closing': closing, 'filled': filled, 'allotted': np.array(allotted_per_round)}
+
+
+# ===============================
+# 📊 COMPARISON
+# ===============================
+
+def compare_with_history(closing: np.ndarray, matrix: np.ndarray, col_years: np.ndarray,
+                         col_rounds: np.ndarray, year: int) -> Tuple[np.ndarray, List[Dict]]:
+    """Per-round agreement between simulated closing ranks and CR <year> <round>"""
+    actual = np.full_like(closing, np.nan)
+    summary = []
+    for r in range(closing.shape[1]):
+        cols = np.flatnonzero((col_years == year) & (col_rounds == r + 1))
+        if cols.size == 0:
+            continue
+        actual[:, r] = matrix[:, cols[0]]
+        both = ~np.isnan(actual[:, r]) & ~np.isnan(closing[:, r])
+        if both.sum() < 2:
+            continue
+        simulated, observed = closing[both, r], actual[both, r]
+        log_ratio = np.abs(np.log(simulated / observed))
+        spearman = np.corrcoef(pd.Series(simulated).rank(), pd.Series(observed).rank())[0, 1]
+        summary.append({
+            'round': r + 1,
+            'seat_groups_compared': int(both.sum()),
+            'spearman': round(float(spearman), 3),
+            'median_abs_log_ratio': round(float(np.median(log_ratio)), 3),
+            'within_25_percent': round(float((log_ratio <= np.log(1.25)).mean() * 100), 1),
+        })
+    return actual, summary
+
+
+# ===============================
+# 🚀 CLI
+# ===============================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate NEET counseling seat allocation for a cohort")
+    parser.add_argument('--dataset', default='ug_all_india',
+                        choices=['ug_all_india', 'ug_state_wise', 'pg_all_india', 'pg_state_wise'])
+    parser.add_argument('--students', type=int, default=200000, help="Synthetic cohort size")
+    parser.add_argument('--cohort', type=Path, help="CSV with RANK, CATEGORY and optional PREFERENCES")
+    parser.add_argument('--seat-matrix', type=Path, help="CSV with INSTITUTE, COURSE, QUOTA, CATEGORY, SEATS")
+    parser.add_argument('--default-seats', type=int, default=2, help="Seats for groups not in the seat matrix")
+    parser.add_argument('--choices', type=int, default=25, help="Preference list length for generated lists")
+    parser.add_argument('--reach-factor', type=float, default=0.5)
+    parser.add_argument('--popularity-weight', type=float, default=1.0)
+    parser.add_argument('--rounds', type=int, default=4)
+    parser.add_argument('--withdrawal-rate', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--output', type=Path, help="Per-seat-group CSV of simulated vs actual closing ranks")
+    parser.add_argument('--export-seat-groups', type=Path, help="Write seat group ids (for PREFERENCES) and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+    started = time.time()
+
+    print("🔄 Loading datasets...")
+    os.environ.setdefault('CACHE_WARM_SOURCES', '')  # Only the datasets are needed, not warm search caches
+    from main import startup_pipeline, ultimate_finder
+    startup_pipeline.run()  # Importing main no longer loads data; the server does this at startup
+    df = ultimate_finder.neet_data.get(args.dataset)
+    data = ultimate_finder.trend_engine.datasets.get(args.dataset)
+    if df is None or data is None:
+        print(f"❌ Dataset {args.dataset} is not loaded")
+        return 1
+
+    groups = load_seat_groups(df, data['latest_final'], args.default_seats, args.seat_matrix, args.popularity_weight)
+    print(f"🏥 {len(groups):,} seat groups, {groups.seats.sum():,} seats")
+
+    if args.export_seat_groups:
+        groups.frame.rename_axis('SEAT_GROUP_ID').to_csv(args.export_seat_groups)
+        print(f"✅ Seat groups written to {args.export_seat_groups}")
+        return 0
+
+    phase = time.time()
+    cohort = load_cohort(args.cohort, groups) if args.cohort else synthetic_cohort(groups, args.students, rng)
+    if cohort.preferences is None:
+        cohort.preferences = generate_preferences(cohort, groups, args.choices, rng, args.reach_factor)
+    print(f"👥 {len(cohort):,} students with up to {cohort.preferences.shape[1]} choices "
+          f"({time.time() - phase:.1f}s)")
+
+    phase = time.time()
+    print("🔄 Allocating...")
+    result = simulate_rounds(cohort, groups, args.rounds, args.withdrawal_rate, rng)
+    print(f"✅ Allocation done in {time.time() - phase:.1f}s")
+
+    complete_years = data['years'][data['complete_years']]
+    year = int(complete_years[-1]) if len(complete_years) else None
+    actual = np.full_like(result['closing'], np.nan)
+    if year is not None:
+        actual, summary = compare_with_history(
+            result['closing'], data['matrix'], data['col_years'], data['col_rounds'], year
+        )
+        print(f"\n📊 Simulated vs CR {year} closing ranks")
+        print(json.dumps(summary, indent=2))
+
+    if args.output:
+        report = groups.frame.copy()
+        for r in range(args.rounds):
+            report[f'SIM ROUND {r + 1}'] = result['closing'][:, r]
+            report[f'SIM FILLED {r + 1}'] = result['filled'][:, r]
+            if year is not None:
+                report[f'CR {year} {r + 1}'] = actual[:, r]
+        report.to_csv(args.output, index_label='SEAT_GROUP_ID')
+        print(f"✅ Per-seat-group report written to {args.output}")
+
+    print(f"⏱️  Total {time.time() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
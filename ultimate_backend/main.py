@@ -14,11 +14,17 @@ Port: 8002 (Ultimate Backend)
 Compatible with existing frontend
 """
 
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks, WebSocket, WebSocketDisconnect
+import time
+_IMPORT_STARTED = time.perf_counter()  # Module import is the first timed startup phase
+
+from fastapi import FastAPI, HTTPException, Query, Header, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from starlette.middleware import Middleware
+from starlette.routing import Match
+from pydantic import BaseModel, Field, conint
 from typing import List, Optional, Dict, Any, Union, Tuple
 from enum import Enum
 from datetime import datetime, timedelta
@@ -26,12 +32,22 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import io
+import sys
+import hmac
+import csv
+import glob
 import asyncio
 import json
+import tempfile
+import bisect
+import hashlib
+import threading
 from pathlib import Path
 import uvicorn
 import logging
-from collections import defaultdict
+import logging.handlers
+from collections import defaultdict, OrderedDict
 import pickle
 from dataclasses import dataclass
 import warnings
@@ -165,7 +181,7 @@ class UltimateCollegeRecommendation(BaseModel):
     success_rate_similar_profiles: float = 0
     
     # Advanced Analytics
-    waitlist_probability: float = Field(ge=0, le=100)
+    waitlist_probability: float = Field(ge=0, le=100)  # % chance of a seat only after missing round 1
     seat_matrix_intelligence: Dict[str, Any]
     historical_trends: Dict[str, Any]
     alternative_suggestions: List[str]
@@ -212,11 +228,43 @@ class UltimateSearchRequest(BaseModel):
     similar_profile_analysis: bool = True
     ml_prediction_weight: float = Field(default=0.7, ge=0, le=1)
 
+MAX_SWEEP_RANKS = 500
+
+class RankSweepRequest(UltimateSearchRequest):
+    # Filters come from UltimateSearchRequest; its own rank fields are unused here
+    rank_min: int = Field(default=1, ge=1, le=1250000)
+    rank_max: int = Field(default=1, ge=1, le=1250000)
+    
+    ranks: List[conint(ge=1, le=1250000)] = Field(default=[], max_length=MAX_SWEEP_RANKS)  # e.g. [10000, 15000, 20000]
+    rank_start: Optional[int] = Field(default=None, ge=1, le=1250000)
+    rank_end: Optional[int] = Field(default=None, ge=1, le=1250000)
+    rank_step: Optional[int] = Field(default=None, ge=1)
+
+class CounselingStrategyRequest(UltimateSearchRequest):
+    n_choices: int = Field(default=15, ge=1, le=100)  # Length of the choice list to build
+    min_safe_choices: int = Field(default=3, ge=0, le=100)
+    safe_probability: float = Field(default=0.8, gt=0, le=1)  # Admission probability that counts as safe
+    fee_budget: Optional[float] = Field(default=None, gt=0)  # Max total course cost in ₹
+
+class ExportRequest(UltimateSearchRequest):
+    categories: List[str] = []  # Categories to export besides `category`
+    all_categories: bool = False  # Every category in the dataset
+    include_not_possible: bool = False  # Also export seat groups the rank cannot reach
+
+class CollegeComparisonRequest(BaseModel):
+    college_ids: List[conint(ge=0)] = Field(..., min_length=1, max_length=10)  # Distinct ids from /institutes/suggest
+    rank: int = Field(..., ge=1, le=1250000)
+    category: str
+    exam_type: ExamType = ExamType.NEET_UG
+    preference: QuotaPreference = QuotaPreference.ALL_INDIA
+    quota: Optional[str] = None  # Defaults to the open All India quota; required for State Wise
+    course: Optional[str] = None  # Defaults to MBBS for NEET-UG
+
 class WhatIfScenario(BaseModel):
     rank_change: int  # +/- change in rank
-    cutoff_trend: float = Field(default=0, ge=-0.5, le=0.5)  # Expected cutoff change percentage
-    new_colleges_added: int = 0
-    seat_matrix_change: float = 0  # Percentage change in seats
+    cutoff_trend: float = Field(default=0, ge=-0.5, le=0.5)  # Fractional closing-rank shift (+0.1 = ranks close 10% later)
+    new_colleges_added: int = 0  # Informational only - no seat data to model new colleges
+    seat_matrix_change: float = Field(default=0, ge=-90)  # Percentage change in seats, scales closing ranks
 
 class CounselingStrategy(BaseModel):
     round_1_colleges: List[str]
@@ -224,16 +272,23 @@ class CounselingStrategy(BaseModel):
     round_3_colleges: List[str]
     mop_up_colleges: List[str]
     strategy_explanation: str
+    choice_list: List[Dict[str, Any]] = []  # Optimized list in filling order
+    expected_utility: float = 0
+    admission_probability: float = 0  # Chance of a seat from any listed choice (%)
 
 class PeerComparison(BaseModel):
     user_rank: int
     category: str
-    state: str
-    similar_students_count: int
-    rank_percentile: float
+    state: Optional[str] = None
+    course: Optional[str] = None
+    similar_students_count: int  # Seat groups closing within ±10% of the rank
+    rank_percentile: float  # Share of seat groups the rank clears
+    seat_groups_cleared: int = 0
+    total_seat_groups: int = 0
     success_stories: List[Dict[str, Any]]
-    average_colleges_applied: int
+    average_colleges_applied: Optional[int] = None
     most_common_choices: List[str]
+    most_common_choice_counts: List[Dict[str, Any]] = []  # [{"institute", "seat_groups"}], same order
 
 # ===============================
 # 🧠 MACHINE LEARNING ENGINE
@@ -250,6 +305,7 @@ class MLPredictionEngine:
             'fee_factor', 'round_number'
         ]
         self.is_trained = False
+        self.model_version = "statistical-fallback"
         
     async def train_models(self, historical_data: pd.DataFrame):
         """Train ML models on historical admission data"""
@@ -287,6 +343,8 @@ class MLPredictionEngine:
             
             logger.info(f"✅ ML Models Trained - RF MAE: {rf_mae:.2f}, GBM MAE: {gbm_mae:.2f}")
             
+            import sklearn
+            self.model_version = f"rf-gbm/sklearn-{sklearn.__version__}/{len(X)}-samples"
             self.is_trained = True
             return True
             
@@ -377,53 +435,2024 @@ class MLPredictionEngine:
         else:
             return 0.1
 
+# ===============================
+# 🗺️ GEOSPATIAL INDEX
+# ===============================
+
+# Approximate centroids for every state / UT name used across the datasets
+STATE_COORDINATES = {
+    'Andaman and Nicobar Islands': (11.7401, 92.6586), 'Andaman Nicobar': (11.7401, 92.6586),
+    'Andhra Pradesh': (15.9129, 79.7400), 'Arunachal Pradesh': (28.2180, 94.7278),
+    'Assam': (26.2006, 92.9376), 'Bihar': (25.0961, 85.3131),
+    'Chandigarh': (30.7333, 76.7794), 'Chhattisgarh': (21.2787, 81.8661),
+    'Dadra and Nagar Haveli': (20.1809, 73.0169), 'Dadra Nagar': (20.1809, 73.0169),
+    'Delhi': (28.6139, 77.2090), 'Goa': (15.2993, 74.1240),
+    'Gujarat': (22.2587, 71.1924), 'Haryana': (29.0588, 76.0856),
+    'Himachal Pradesh': (31.1048, 77.1734), 'Jammu and Kashmir': (33.7782, 76.5762),
+    'Jharkhand': (23.6102, 85.2799), 'Karnataka': (15.3173, 75.7139),
+    'Kerala': (10.8505, 76.2711), 'Ladakh': (34.1526, 77.5771),
+    'Madhya Pradesh': (22.9734, 78.6569), 'Maharashtra': (19.7515, 75.7139),
+    'Manipur': (24.6637, 93.9063), 'Meghalaya': (25.4670, 91.3662),
+    'Mizoram': (23.1645, 92.9376), 'Nagaland': (26.1584, 94.5624),
+    'Odisha': (20.9517, 85.0985), 'Pondicherry': (11.9416, 79.8083),
+    'Puducherry': (11.9416, 79.8083), 'Punjab': (31.1471, 75.3412),
+    'Rajasthan': (27.0238, 74.2179), 'Sikkim': (27.5330, 88.5122),
+    'Tamil Nadu': (11.1271, 78.6569), 'Telangana': (18.1124, 79.0193),
+    'Tripura': (23.9408, 91.9882), 'Uttar Pradesh': (26.8467, 80.9462),
+    'Uttarakhand': (30.0668, 79.0193), 'West Bengal': (22.9868, 87.8550),
+}
+
+# City table: one row per (lower-cased city spelling used in institute names, state)
+CITY_COORDINATES_FILE = Path(os.getenv(
+    "CITY_COORDINATES_FILE", Path(__file__).parent.parent / "data" / "city_coordinates.csv"
+))
+
+
+class CityCoordinateTable:
+    """Locates institutes from the city in their name, checked against their state
+
+    A city only matches in the state it is listed under, so "Delhi Hospital,
+    Jhajjar" (Haryana) is not placed in Delhi and the two Bilaspurs stay
+    apart. Rows without a state (NEET-PG state-wise data) match a city only
+    when every state lists it at the same coordinates.
+    """
+
+    def __init__(self):
+        self.by_city_state: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self.by_city: Dict[str, Optional[Tuple[float, float]]] = {}  # None when ambiguous
+
+    def load(self, path: Path):
+        """Read a city,state,latitude,longitude CSV"""
+        table = pd.read_csv(path)
+        self.by_city_state, self.by_city = {}, {}
+        for city, state, lat, lng in table[['city', 'state', 'latitude', 'longitude']].itertuples(index=False):
+            city = str(city).strip().lower()
+            point = (float(lat), float(lng))
+            self.by_city_state[(city, str(state).strip())] = point
+            self.by_city[city] = point if self.by_city.get(city, point) == point else None
+
+    def locate(self, institute_name: str, state: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Coordinates of the city named in the institute, or None when it cannot be placed"""
+        has_state = bool(state) and state != '-'
+
+        def find(phrase: str) -> Optional[Tuple[float, float]]:
+            return self.by_city_state.get((phrase, state)) if has_state else self.by_city.get(phrase)
+
+        # City usually follows the last comma ("VMMC, Delhi", "Govt Med Coll, Kozhikode")
+        segments = [segment.strip().lower() for segment in str(institute_name).split(',')]
+        for segment in reversed(segments):
+            if find(segment):
+                return find(segment)
+
+        # Otherwise look for a city anywhere in the name ("Bankura Sammilani Med Coll")
+        words = re.findall(r'[a-z]+', str(institute_name).lower())
+        for size in (2, 1):
+            for i in range(len(words) - size + 1):
+                phrase = ' '.join(words[i:i + size])
+                if find(phrase):
+                    return find(phrase)
+        return None
+
+
+
+class GeoSpatialIndex:
+    """Grid-bucketed haversine index over per-institute coordinates"""
+    
+    EARTH_RADIUS_KM = 6371.0
+    KM_PER_DEGREE = 111.195
+    
+    def __init__(self, cell_degrees: float = 1.0):
+        self.cell_degrees = cell_degrees
+        self.names = np.array([], dtype=object)
+        self.lat = np.array([], dtype=float)
+        self.lng = np.array([], dtype=float)
+        self._grid: Dict[Tuple[int, int], np.ndarray] = {}
+    
+    def build(self, coordinates: Dict[str, Tuple[float, float]]):
+        """Index a {name: (lat, lng)} table"""
+        self.names = np.array(list(coordinates.keys()), dtype=object)
+        coords = np.array(list(coordinates.values()), dtype=float).reshape(-1, 2)
+        self.lat, self.lng = coords[:, 0], coords[:, 1]
+        
+        cells = defaultdict(list)
+        for idx, key in enumerate(zip(*self._cell_of(self.lat, self.lng))):
+            cells[key].append(idx)
+        self._grid = {key: np.array(indices) for key, indices in cells.items()}
+    
+    def _cell_of(self, lat, lng) -> Tuple[np.ndarray, np.ndarray]:
+        return (np.floor(np.asarray(lat) / self.cell_degrees).astype(int),
+                np.floor(np.asarray(lng) / self.cell_degrees).astype(int))
+    
+    @classmethod
+    def haversine_km(cls, lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Great-circle distance from one point to many, in km"""
+        lat1, lng1 = np.radians(lat), np.radians(lng)
+        lat2, lng2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lngs, dtype=float))
+        a = (np.sin((lat2 - lat1) / 2) ** 2
+             + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+        return 2 * cls.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Names of all indexed points within ``radius_km`` of (lat, lng)"""
+        if not self._grid:
+            return np.array([], dtype=object)
+        
+        lat_span = radius_km / self.KM_PER_DEGREE
+        # Widen the longitude window by the worst-case latitude in the box
+        max_abs_lat = min(89.0, abs(lat) + lat_span)
+        lng_span = radius_km / (self.KM_PER_DEGREE * np.cos(np.radians(max_abs_lat)))
+        
+        (lat_lo, lat_hi), (lng_lo, lng_hi) = self._cell_of(
+            [lat - lat_span, lat + lat_span], [lng - lng_span, lng + lng_span]
+        )
+        buckets = [
+            self._grid[(i, j)]
+            for i in range(lat_lo, lat_hi + 1)
+            for j in range(lng_lo, lng_hi + 1)
+            if (i, j) in self._grid
+        ]
+        if not buckets:
+            return np.array([], dtype=object)
+        
+        candidates = np.concatenate(buckets)
+        distances = self.haversine_km(lat, lng, self.lat[candidates], self.lng[candidates])
+        return self.names[candidates[distances <= radius_km]]
+
+# ===============================
+# 📈 CUTOFF TREND ENGINE
+# ===============================
+
+CR_COLUMN_PATTERN = re.compile(r'^CR\s+(\d{4})\s+(\d+)$')
+
+# Grouping dimensions -> candidate column names (naming differs per dataset)
+TREND_GROUP_COLUMNS = {
+    'institute': ('INSTITUTE', 'Institute'),
+    'course': ('COURSE', 'Course'),
+    'state': ('STATE', 'State'),
+    'category': ('CATEGORY', 'Category'),
+    'quota': ('QUOTA', 'Quota'),
+}
+
+
+def build_rank_matrix(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Parse "CR <year> <round>" columns into a float matrix (NaN where no rank)
+    
+    Returns the matrix plus per-column year and round arrays, with columns
+    ordered by (year, round).
+    """
+    parsed = []
+    for col in df.columns:
+        match = CR_COLUMN_PATTERN.match(str(col))
+        if match:
+            parsed.append((int(match.group(1)), int(match.group(2)), col))
+    parsed.sort()
+    
+    columns = [col for _, _, col in parsed]
+    years = np.array([year for year, _, _ in parsed], dtype=int)
+    rounds = np.array([rnd for _, rnd, _ in parsed], dtype=int)
+    
+    if not columns:
+        return np.empty((len(df), 0)), years, rounds, columns
+    
+    matrix = np.column_stack([
+        pd.to_numeric(df[col].astype(str).str.replace(',', '').str.strip(), errors='coerce').to_numpy(dtype=float)
+        for col in columns
+    ])
+    matrix[(matrix < 1) | (matrix > 1500000)] = np.nan
+    return matrix, years, rounds, columns
+
+
+class CutoffTrendEngine:
+    """Per-seat-group cutoff statistics precomputed from the CR year/round matrix
+    
+    A seat group is one dataset row (institute x course x quota x category).
+    Everything per-row is computed once at load; queries only index into the
+    precomputed arrays and aggregate the selected rows.
+    """
+    
+    def __init__(self):
+        self.datasets: Dict[str, Dict[str, Any]] = {}
+    
+    def build(self, key: str, df: pd.DataFrame):
+        """Precompute trend statistics for one dataset"""
+        matrix, col_years, col_rounds, columns = build_rank_matrix(df)
+        years = np.unique(col_years)
+        n_rows = len(df)
+        
+        # Final (last reported round) and opening-round cutoff per year
+        final_by_year = np.full((n_rows, len(years)), np.nan)
+        first_by_year = np.full((n_rows, len(years)), np.nan)
+        for j, year in enumerate(years):
+            sub = matrix[:, col_years == year]
+            valid = ~np.isnan(sub)
+            has_any = valid.any(axis=1)
+            last_idx = sub.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+            first_idx = np.argmax(valid, axis=1)
+            rows = np.arange(n_rows)
+            final_by_year[has_any, j] = sub[rows, last_idx][has_any]
+            first_by_year[has_any, j] = sub[rows, first_idx][has_any]
+        
+        # Round-to-round drift: mean change between consecutive rounds of the same year
+        if matrix.shape[1] > 1:
+            same_year = col_years[1:] == col_years[:-1]
+            steps = np.diff(matrix, axis=1)[:, same_year]
+            round_drift = self._nanmean(steps)
+        else:
+            round_drift = np.full(n_rows, np.nan)
+        
+        # A latest year with under half the previous year's round columns is still
+        # in progress; its "final" is an early-round cutoff, so keep it out of trends
+        rounds_per_year = np.array([(col_years == year).sum() for year in years])
+        complete = np.ones(len(years), dtype=bool)
+        if len(years) > 1 and rounds_per_year[-1] * 2 < rounds_per_year[-2]:
+            complete[-1] = False
+        
+        # Year-over-year least-squares slope of the final cutoff, per row
+        valid = ~np.isnan(final_by_year) & complete
+        n_years = valid.sum(axis=1)
+        x = np.broadcast_to(years.astype(float), final_by_year.shape)
+        x_mean = self._nanmean(np.where(valid, x, np.nan))
+        y_mean = self._nanmean(np.where(valid, final_by_year, np.nan))
+        dx = np.where(valid, x - x_mean[:, None], 0.0)
+        dy = np.where(valid, final_by_year - y_mean[:, None], 0.0)
+        denom = (dx ** 2).sum(axis=1)
+        yoy_slope = np.where((n_years >= 2) & (denom > 0), (dx * dy).sum(axis=1) / np.where(denom > 0, denom, 1), np.nan)
+        
+        # Volatility: coefficient of variation of the yearly final cutoffs
+        y_std = np.sqrt(self._nanmean(np.where(valid, (final_by_year - y_mean[:, None]) ** 2, np.nan)))
+        volatility = np.where((n_years >= 2) & (y_mean > 0), y_std / np.where(y_mean > 0, y_mean, 1), np.nan)
+        
+        # Latest complete final cutoff and a one-step linear projection, kept
+        # within +/-50% of the latest cutoff so short noisy histories stay sane
+        has_final = valid.any(axis=1)
+        if len(years):
+            last_year_idx = len(years) - 1 - np.argmax(valid[:, ::-1], axis=1)
+            latest_final = np.where(has_final, final_by_year[np.arange(n_rows), last_year_idx], np.nan)
+        else:
+            latest_final = np.full(n_rows, np.nan)
+        projected = np.clip(latest_final + np.nan_to_num(yoy_slope), 0.5 * latest_final, 1.5 * latest_final)
+        predicted_next = np.where(np.isnan(yoy_slope), latest_final, np.maximum(1, projected))
+        
+        # Row indices per grouping value for fast aggregate queries
+        group_index = {}
+        for dimension, candidates in TREND_GROUP_COLUMNS.items():
+            col = next((c for c in candidates if c in df.columns), None)
+            if col is not None:
+                values = df[col].astype(str).str.strip('"').to_numpy()
+                group_index[dimension] = {
+                    value: np.asarray(indices) for value, indices in pd.Series(values).groupby(values).indices.items()
+                }
+        
+        self.datasets[key] = {
+            'index': df.index.to_numpy(),
+            'matrix': matrix,
+            'col_years': col_years,
+            'col_rounds': col_rounds,
+            'columns': columns,
+            'years': years,
+            'complete_years': complete,
+            'final_by_year': final_by_year,
+            'first_by_year': first_by_year,
+            'round_drift': round_drift,
+            'yoy_slope': yoy_slope,
+            'volatility': volatility,
+            'latest_final': latest_final,
+            'predicted_next': predicted_next,
+            'group_index': group_index,
+        }
+    
+    @staticmethod
+    def _nanmean(values: np.ndarray) -> np.ndarray:
+        """Row-wise nanmean that returns NaN for all-NaN rows without warnings"""
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=1)
+        totals = np.where(valid, values, 0.0).sum(axis=1)
+        return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+    
+    def select(self, key: str, **filters: Optional[str]) -> np.ndarray:
+        """Row positions matching every given group filter (institute, course, state, ...)"""
+        data = self.datasets.get(key)
+        if data is None:
+            return np.array([], dtype=int)
+        
+        selected = None
+        for dimension, value in filters.items():
+            if value is None:
+                continue
+            rows = data['group_index'].get(dimension, {}).get(value, np.array([], dtype=int))
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        
+        return np.arange(len(data['index'])) if selected is None else selected
+    
+    def positions_for_index(self, key: str, index: pd.Index) -> np.ndarray:
+        """Map DataFrame index labels back to matrix row positions"""
+        data = self.datasets[key]
+        return np.searchsorted(data['index'], np.asarray(index))
+    
+    def seat_group_stats(self, key: str, position: int) -> Dict[str, Any]:
+        """Trend statistics for a single seat group"""
+        data = self.datasets[key]
+        finals = data['final_by_year'][position]
+        return {
+            'final_cutoff_by_year': {
+                int(year): int(value) for year, value in zip(data['years'], finals) if not np.isnan(value)
+            },
+            'round_drift': self._round_or_none(data['round_drift'][position]),
+            'yoy_slope': self._round_or_none(data['yoy_slope'][position]),
+            'volatility': self._round_or_none(data['volatility'][position], 4),
+            'partial_years': [int(year) for year in data['years'][~data['complete_years']]],
+            'latest_final_cutoff': self._round_or_none(data['latest_final'][position], 0),
+            'predicted_next_cutoff': self._round_or_none(data['predicted_next'][position], 0),
+        }
+    
+    def aggregate(self, key: str, positions: np.ndarray) -> Dict[str, Any]:
+        """Aggregate trend statistics over a set of seat groups"""
+        data = self.datasets[key]
+        finals = data['final_by_year'][positions]
+        
+        yearly = {}
+        for j, year in enumerate(data['years']):
+            if not data['complete_years'][j]:
+                continue
+            column = finals[:, j]
+            column = column[~np.isnan(column)]
+            if column.size:
+                yearly[int(year)] = {
+                    'median_final_cutoff': int(np.median(column)),
+                    'min_final_cutoff': int(column.min()),
+                    'max_final_cutoff': int(column.max()),
+                    'seat_groups': int(column.size),
+                }
+        
+        def _median(values: np.ndarray, digits: int = 1) -> Optional[float]:
+            values = values[~np.isnan(values)]
+            return self._round_or_none(np.median(values), digits) if values.size else None
+        
+        return {
+            'seat_groups': int(len(positions)),
+            'yearly': yearly,
+            'median_round_drift': _median(data['round_drift'][positions]),
+            'median_yoy_slope': _median(data['yoy_slope'][positions]),
+            'median_volatility': _median(data['volatility'][positions], 4),
+            'median_predicted_next_cutoff': _median(data['predicted_next'][positions], 0),
+            'next_year': int(data['years'][data['complete_years']].max()) + 1 if len(data['years']) else None,
+            'partial_years': [int(year) for year in data['years'][~data['complete_years']]],
+        }
+    
+    @staticmethod
+    def _round_or_none(value: float, digits: int = 1) -> Optional[float]:
+        if value is None or np.isnan(value):
+            return None
+        return round(float(value), digits) if digits else int(round(float(value)))
+
+# ===============================
+# 📊 RANK DISTRIBUTION INDEX
+# ===============================
+
+class RankDistributionIndex:
+    """Sorted closing ranks per (exam, category, course[, state]) for O(log n) peer lookups
+    
+    Each seat group contributes its latest complete-year final cutoff (or its
+    worst historical rank when only in-progress data exists). A rank "clears"
+    a seat group when it is at or better than that closing rank.
+    """
+    
+    def __init__(self):
+        self.groups: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    
+    def build(self, datasets: Dict[str, pd.DataFrame], trend_engine: CutoffTrendEngine):
+        """Build sorted rank arrays from every loaded dataset"""
+        frames = []
+        for key, df in datasets.items():
+            data = trend_engine.datasets.get(key)
+            if df is None or data is None:
+                continue
+            
+            closing = data['latest_final'].copy()
+            missing = np.isnan(closing) & ~np.isnan(data['matrix']).all(axis=1) if data['matrix'].size else np.isnan(closing)
+            if data['matrix'].size:
+                closing[missing] = np.nanmax(data['matrix'][missing], axis=1)
+            
+            def column(*candidates):
+                col = next((c for c in candidates if c in df.columns), None)
+                return df[col].astype(str).str.strip('"').to_numpy() if col else np.full(len(df), '-', dtype=object)
+            
+            frames.append(pd.DataFrame({
+                'exam': ExamType.NEET_UG.value if key.startswith('ug') else ExamType.NEET_PG.value,
+                'category': column('CATEGORY', 'Category'),
+                'course': column('COURSE', 'Course'),
+                'state': column('STATE', 'State'),
+                'institute': column('INSTITUTE', 'Institute'),
+                'quota': column('QUOTA', 'Quota'),
+                'closing_rank': closing,
+                'year': data['years'][data['complete_years']].max() if len(data['years']) else 0,
+            }))
+        
+        if not frames:
+            return
+        
+        combined = pd.concat(frames, ignore_index=True)
+        combined = combined[~combined['closing_rank'].isna()].sort_values('closing_rank', kind='mergesort')
+        
+        self.groups = {}
+        for group_cols in (['exam', 'category', 'course'], ['exam', 'category', 'course', 'state']):
+            for group_key, group in combined.groupby(group_cols, sort=False):
+                self.groups[tuple(group_key)] = {
+                    'ranks': group['closing_rank'].to_numpy(dtype=float),
+                    'institutes': group['institute'].to_numpy(),
+                    'quotas': group['quota'].to_numpy(),
+                    'states': group['state'].to_numpy(),
+                    'years': group['year'].to_numpy(),
+                }
+    
+    def lookup(self, exam: str, category: str, course: str, state: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get the sorted group for a profile, preferring the state-specific one"""
+        if state and (exam, category, course, state) in self.groups:
+            return self.groups[(exam, category, course, state)]
+        return self.groups.get((exam, category, course))
+    
+    def query(self, group: Dict[str, Any], rank: int, band: float = 0.1, top_n: int = 5) -> Dict[str, Any]:
+        """Binary-search a rank against a sorted group"""
+        ranks = group['ranks']
+        total = len(ranks)
+        first_cleared = int(np.searchsorted(ranks, rank, side='left'))
+        cleared = total - first_cleared
+        
+        # Seat groups closing just after this rank are where peers at this rank land
+        band_end = int(np.searchsorted(ranks, rank * (1 + band), side='right'))
+        band_start = int(np.searchsorted(ranks, rank * (1 - band), side='left'))
+        landing = slice(first_cleared, max(band_end, min(total, first_cleared + top_n)))
+        # Ties on count go to the institute whose cutoff is closest to the rank (the slice is in cutoff order)
+        institutes, first_seen, counts = np.unique(group['institutes'][landing], return_index=True, return_counts=True)
+        order = np.lexsort((first_seen, -counts))[:top_n]
+        
+        return {
+            'total_seat_groups': total,
+            'seat_groups_cleared': cleared,
+            'rank_percentile': round(cleared / total * 100, 2) if total else 0.0,
+            'seat_groups_near_rank': band_end - band_start,
+            'most_common_institutes': [
+                {'institute': str(institutes[i]), 'seat_groups': int(counts[i])} for i in order
+            ],
+            'nearest_cutoffs': [
+                {
+                    'rank': int(group['ranks'][i]),
+                    'college': str(group['institutes'][i]),
+                    'quota': str(group['quotas'][i]),
+                    'state': str(group['states'][i]),
+                    'year': str(group['years'][i]),
+                }
+                for i in range(first_cleared, min(total, first_cleared + 3))
+            ],
+        }
+
+# ===============================
+# 🧭 SIMILAR COLLEGE INDEX
+# ===============================
+
+class SimilarCollegeIndex:
+    """Nearest-neighbour lookup over per-college (institute x course) feature vectors
+    
+    Features: yearly median log closing rank (the cutoff profile), fee, beds,
+    stipend, location and college type, standardized and weighted once at
+    load. A query takes a whole result page and compares it against the
+    colleges of the same course in one distance matrix.
+    """
+    
+    FEATURE_WEIGHTS = {
+        'cutoff': 2.0,
+        'fee': 1.0,
+        'beds': 0.7,
+        'stipend': 0.7,
+        'location': 1.0,
+        'college_type': 1.0,
+    }
+    
+    def __init__(self):
+        self.datasets: Dict[str, Dict[str, Any]] = {}
+    
+    def build(self, key: str, df: pd.DataFrame, trend_data: Dict[str, Any]):
+        """Aggregate rows to colleges and precompute the weighted feature matrix"""
+        institute_col = next((c for c in TREND_GROUP_COLUMNS['institute'] if c in df.columns), None)
+        course_col = next((c for c in TREND_GROUP_COLUMNS['course'] if c in df.columns), None)
+        if institute_col is None or course_col is None or len(df) == 0:
+            return
+        
+        finals = trend_data['final_by_year'][:, trend_data['complete_years']]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_finals = np.log(finals)
+        
+        rows = pd.DataFrame({
+            'institute': df[institute_col].astype(str).str.strip('"').to_numpy(),
+            'course': df[course_col].astype(str).to_numpy(),
+            'fee': np.log1p(df['FEE_NUM'].to_numpy(dtype=float)) if 'FEE_NUM' in df.columns else np.nan,
+            'beds': np.log1p(df['BEDS_NUM'].to_numpy(dtype=float)) if 'BEDS_NUM' in df.columns else np.nan,
+            'stipend': np.log1p(df['STIPEND_NUM'].to_numpy(dtype=float)) if 'STIPEND_NUM' in df.columns else np.nan,
+            'lat': df['LATITUDE'].to_numpy(dtype=float) if 'LATITUDE' in df.columns else np.nan,
+            'lng': df['LONGITUDE'].to_numpy(dtype=float) if 'LONGITUDE' in df.columns else np.nan,
+            'college_type': df['COLLEGE_TYPE'].astype(str).to_numpy() if 'COLLEGE_TYPE' in df.columns else '-',
+        })
+        cutoff_cols = [f'cutoff_{j}' for j in range(log_finals.shape[1])]
+        for j, col in enumerate(cutoff_cols):
+            rows[col] = log_finals[:, j]
+        
+        grouped = rows.groupby(['institute', 'course'], sort=True)
+        colleges = grouped.median(numeric_only=True)
+        college_type = grouped['college_type'].first()
+        
+        blocks = []
+        if cutoff_cols:
+            # One shared scale for all years keeps the shape of the profile;
+            # missing years fall back to the college's own mean
+            profile = colleges[cutoff_cols].to_numpy()
+            profile = np.where(np.isnan(profile), CutoffTrendEngine._nanmean(profile)[:, None], profile)
+            mean, std = np.nanmean(profile), np.nanstd(profile) or 1.0
+            profile = np.nan_to_num((profile - mean) / std)
+            blocks.append(profile * self.FEATURE_WEIGHTS['cutoff'] / np.sqrt(len(cutoff_cols)))
+        for feature in ('fee', 'beds', 'stipend'):
+            blocks.append(self._standardize(colleges[feature].to_numpy())[:, None] * self.FEATURE_WEIGHTS[feature])
+        location = colleges[['lat', 'lng']].to_numpy()
+        location = np.nan_to_num((location - np.nanmean(location, axis=0)) / 5.0)  # ~5 degrees per unit
+        blocks.append(location * self.FEATURE_WEIGHTS['location'] / np.sqrt(2))
+        types = pd.get_dummies(college_type).to_numpy(dtype=float)
+        blocks.append(types * self.FEATURE_WEIGHTS['college_type'] / np.sqrt(2))
+        
+        features = np.hstack(blocks).astype(np.float32)
+        names = colleges.index.get_level_values('institute').to_numpy()
+        courses = colleges.index.get_level_values('course').to_numpy()
+        self.datasets[key] = {
+            'features': features,
+            'norms': (features ** 2).sum(axis=1),
+            'names': names,
+            'positions': {pair: i for i, pair in enumerate(zip(names, courses))},
+            'by_course': {course: np.asarray(idx) for course, idx in pd.Series(courses).groupby(courses).indices.items()},
+        }
+    
+    @staticmethod
+    def _standardize(values: np.ndarray) -> np.ndarray:
+        if np.isnan(values).all():
+            return np.zeros_like(values)
+        std = np.nanstd(values) or 1.0
+        return np.nan_to_num((values - np.nanmean(values)) / std)
+    
+    def query(self, key: str, colleges: List[Tuple[str, str]], k: int = 3) -> List[List[str]]:
+        """k most similar colleges of the same course for each (institute, course)"""
+        results: List[List[str]] = [[] for _ in colleges]
+        data = self.datasets.get(key)
+        if data is None:
+            return results
+        
+        # Batch the page per course: one distance matrix per course present
+        by_course: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for slot, pair in enumerate(colleges):
+            position = data['positions'].get(pair)
+            if position is not None:
+                by_course[pair[1]].append((slot, position))
+        
+        for course, entries in by_course.items():
+            pool = data['by_course'][course]
+            slots = [slot for slot, _ in entries]
+            queries = np.array([position for _, position in entries])
+            distances = (data['norms'][queries][:, None] + data['norms'][pool][None, :]
+                         - 2 * data['features'][queries] @ data['features'][pool].T)
+            distances[queries[:, None] == pool[None, :]] = np.inf
+            
+            n_neighbours = min(k, len(pool) - 1)
+            if n_neighbours <= 0:
+                continue
+            nearest = np.argpartition(distances, n_neighbours - 1, axis=1)[:, :n_neighbours]
+            nearest = np.take_along_axis(nearest, np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1), axis=1)
+            for slot, neighbours in zip(slots, nearest):
+                results[slot] = [str(name) for name in data['names'][pool[neighbours]]]
+        return results
+
+# ===============================
+# 🔤 INSTITUTE NAME INDEX
+# ===============================
+
+# Short forms used in institute names -> full words (both forms get indexed)
+INSTITUTE_WORD_EXPANSIONS = {
+    'govt': 'government', 'med': 'medical', 'coll': 'college', 'col': 'college', 'medcoll': 'medical college',
+    'mc': 'medical college', 'hosp': 'hospital', 'inst': 'institute', 'ims': 'institute of medical sciences',
+    'sci': 'sciences', 'dist': 'district', 'gen': 'general', 'mem': 'memorial', 'cent': 'centre',
+    'res': 'research', 'spec': 'speciality', 'auton': 'autonomous', 'hq': 'headquarters',
+    'blr': 'bangalore', 'hyd': 'hyderabad', 'vizag': 'visakhapatnam', 'trivandrum': 'thiruvananthapuram',
+}
+
+# Well-known acronyms -> full names; an institute matching either form gets both
+INSTITUTE_ACRONYMS = {
+    'aiims': 'all india institute of medical sciences',
+    'jipmer': 'jawaharlal institute of postgraduate medical education and research',
+    'mamc': 'maulana azad medical college',
+    'abvims': 'atal bihari vajpayee institute of medical sciences',
+    'lhmc': 'lady hardinge medical college',
+    'vmmc': 'vardhman mahavir medical college',
+    'ucms': 'university college of medical sciences',
+    'gmc': 'government medical college',
+    'kgmu': 'king george medical university',
+    'pgimer': 'postgraduate institute of medical education and research',
+    'afmc': 'armed forces medical college',
+    'esic': 'employees state insurance corporation',
+    'cmc': 'christian medical college',
+    'bhu': 'banaras hindu university',
+    'amu': 'aligarh muslim university',
+    'gmers': 'gujarat medical education and research society',
+}
+
+
+def normalize_institute_name(name: str) -> str:
+    """Lowercase, punctuation to spaces, single-spaced ("ABVIMS , Delhi" -> "abvims delhi")"""
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', str(name).lower()).split())
+
+
+class InstituteSearchIndex:
+    """Typo-tolerant institute name lookup for autocomplete
+    
+    Every institute is indexed under its normalized name plus expanded short
+    forms and acronyms. A prefix trie over those tokens answers as-you-type
+    queries (every query word must prefix some token); a word-trigram index
+    scores fuzzy matches for typos. Both are built once at load.
+    """
+    
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}  # normalized name -> id (position in sorted order)
+        self.states: List[str] = []
+        self.datasets: List[List[str]] = []
+        self.trie: Dict[str, Any] = {}
+        self.trigram_postings: Dict[str, np.ndarray] = {}
+        self.trigram_counts = np.zeros(0)
+    
+    @staticmethod
+    def _tokens(normalized: str) -> set:
+        words = normalized.split()
+        tokens = set(words)
+        for word in words:
+            tokens.update(INSTITUTE_WORD_EXPANSIONS.get(word, '').split())
+        expanded = ' '.join(INSTITUTE_WORD_EXPANSIONS.get(word, word) for word in words)
+        for acronym, full_name in INSTITUTE_ACRONYMS.items():
+            if acronym in tokens:
+                tokens.update(full_name.split())
+            elif full_name in expanded:
+                tokens.add(acronym)
+        return tokens
+    
+    @staticmethod
+    def _trigrams(tokens) -> set:
+        grams = set()
+        for token in tokens:
+            padded = f'  {token} '
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return grams
+    
+    def build(self, neet_data: Dict[str, pd.DataFrame]):
+        """Collect unique institutes across datasets and index their tokens"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        for key, df in neet_data.items():
+            if df is None:
+                continue
+            institute_col = next((c for c in TREND_GROUP_COLUMNS['institute'] if c in df.columns), None)
+            if institute_col is None:
+                continue
+            state_col = next((c for c in TREND_GROUP_COLUMNS['state'] if c in df.columns), None)
+            pairs = pd.DataFrame({
+                'name': df[institute_col].astype(str).str.strip().str.strip('"').str.strip(),
+                'state': df[state_col].astype(str).str.strip() if state_col else '-',
+            }).drop_duplicates('name')
+            for name, state in zip(pairs['name'], pairs['state']):
+                normalized = normalize_institute_name(name)
+                if not normalized:
+                    continue
+                entry = entries.setdefault(normalized, {'name': name, 'state': '-', 'datasets': []})
+                if entry['state'] == '-' and state not in ('-', '', 'nan'):
+                    entry['state'] = state
+                entry['datasets'].append(key)
+        
+        postings: Dict[str, List[int]] = defaultdict(list)
+        self.trie = {}
+        counts = []
+        for entry_id, normalized in enumerate(sorted(entries)):
+            entry = entries[normalized]
+            self.ids[normalized] = entry_id
+            self.names.append(entry['name'])
+            self.states.append(entry['state'])
+            self.datasets.append(entry['datasets'])
+            
+            tokens = self._tokens(normalized)
+            for token in tokens:
+                node = self.trie
+                for char in token:
+                    node = node.setdefault(char, {})
+                    node.setdefault('#', set()).add(entry_id)
+            grams = self._trigrams(tokens)
+            counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(entry_id)
+        
+        self.trigram_postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.trigram_counts = np.array(counts, dtype=float)
+    
+    def _prefix_ids(self, prefix: str) -> set:
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get('#', set())
+    
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Prefix matches first (all query words), then fuzzy trigram matches"""
+        words = normalize_institute_name(query).split()
+        if not words or not self.names:
+            return []
+        
+        # Prefix: every query word must start some token of the institute
+        prefix_ids = None
+        for word in words:
+            ids = self._prefix_ids(word)
+            prefix_ids = ids if prefix_ids is None else prefix_ids & ids
+            if not prefix_ids:
+                break
+        
+        # Fuzzy: share of the query's trigrams found, lightly favouring shorter names
+        grams = self._trigrams(words)
+        lists = [self.trigram_postings[g] for g in grams if g in self.trigram_postings]
+        scores = np.zeros(len(self.names))
+        if lists:
+            shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+            scores = 0.85 * shared / len(grams) + 0.15 * shared / np.maximum(self.trigram_counts, 1)
+        
+        ranked = []
+        if prefix_ids:
+            ids = np.fromiter(prefix_ids, dtype=int)
+            ranked = [(1 + scores[i], int(i), 'prefix') for i in ids]
+        seen = {i for _, i, _ in ranked}
+        candidates = np.argpartition(-scores, min(limit * 2, len(scores) - 1))[:limit * 2]
+        ranked += [(scores[i], int(i), 'fuzzy') for i in candidates if scores[i] >= 0.3 and i not in seen]
+        ranked.sort(key=lambda item: (-item[0], self.names[item[1]]))
+        
+        return [
+            {
+                'id': i,
+                'institute': self.names[i],
+                'state': self.states[i],
+                'datasets': self.datasets[i],
+                'score': round(float(score), 3),
+                'match': match,
+            }
+            for score, i, match in ranked[:limit]
+        ]
+
+# ===============================
+# 🏫 COLLEGE DETAIL STORE
+# ===============================
+
+# Dataset key -> (exam type, counseling preference)
+DATASET_LABELS = {
+    'ug_all_india': (ExamType.NEET_UG.value, QuotaPreference.ALL_INDIA.value),
+    'ug_state_wise': (ExamType.NEET_UG.value, QuotaPreference.STATE_WISE.value),
+    'pg_all_india': (ExamType.NEET_PG.value, QuotaPreference.ALL_INDIA.value),
+    'pg_state_wise': (ExamType.NEET_PG.value, QuotaPreference.STATE_WISE.value),
+}
+
+
+class CollegeDetailStore:
+    """Per-institute aggregate behind /colleges/{id}
+    
+    IDs are the institute index's positions (institutes sorted by normalized
+    name), so they are stable for a given dataset. At load each id only gets
+    its row positions per dataset; the detail payload is assembled on first
+    request from those rows and the precomputed trend arrays, then memoized.
+    """
+    
+    def __init__(self, max_cached: int = 512):
+        self.rows: List[Dict[str, np.ndarray]] = []
+        self.cache = LRUCache(max_entries=max_cached)
+        self.neet_data: Dict[str, pd.DataFrame] = {}
+        self.trend_engine: Optional[CutoffTrendEngine] = None
+        self.institute_index: Optional[InstituteSearchIndex] = None
+    
+    def build(self, neet_data: Dict[str, pd.DataFrame], trend_engine: CutoffTrendEngine,
+              institute_index: InstituteSearchIndex):
+        self.neet_data, self.trend_engine, self.institute_index = neet_data, trend_engine, institute_index
+        self.rows = [{} for _ in institute_index.names]
+        self.cache = LRUCache(max_entries=self.cache.max_entries)
+        
+        for key, df in neet_data.items():
+            institute_col = next((c for c in TREND_GROUP_COLUMNS['institute'] if c in (df.columns if df is not None else [])), None)
+            if institute_col is None:
+                continue
+            names = df[institute_col].astype(str)
+            unique = pd.Series(names.unique())
+            id_by_name = dict(zip(unique, unique.map(normalize_institute_name).map(institute_index.ids)))
+            ids = names.map(id_by_name).to_numpy()
+            valid = ~pd.isna(ids)
+            for college_id, positions in pd.Series(np.flatnonzero(valid)).groupby(ids[valid].astype(int)).indices.items():
+                self.rows[college_id][key] = np.flatnonzero(valid)[positions]
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def get(self, college_id: int) -> Optional[Dict[str, Any]]:
+        """Detail payload for one college, built on first access"""
+        if not 0 <= college_id < len(self.rows):
+            return None
+        payload = self.cache.get(college_id)
+        if payload is None:
+            payload = self._build_payload(college_id)
+            self.cache.put(college_id, payload)
+        return payload
+    
+    @staticmethod
+    def _value(row: pd.Series, candidates: Tuple[str, ...]) -> Optional[str]:
+        for col in candidates:
+            if col in row.index and str(row[col]).strip() not in ('-', '', 'nan'):
+                return str(row[col]).strip()
+        return None
+    
+    def _build_payload(self, college_id: int) -> Dict[str, Any]:
+        round_or_none = CutoffTrendEngine._round_or_none
+        seat_groups = []
+        numeric = defaultdict(list)
+        college_type = None
+        location = None
+        
+        for key, positions in self.rows[college_id].items():
+            df = self.neet_data[key]
+            data = self.trend_engine.datasets[key]
+            exam_type, preference = DATASET_LABELS[key]
+            frame = df.iloc[positions]
+            matrix = data['matrix'][positions]
+            
+            if college_type is None and 'COLLEGE_TYPE' in frame.columns:
+                college_type = frame['COLLEGE_TYPE'].iloc[0]
+            if location is None and 'LATITUDE' in frame.columns:
+                location = {'lat': float(frame['LATITUDE'].iloc[0]), 'lng': float(frame['LONGITUDE'].iloc[0])}
+            for col in UltimateNEETCollegeFinder.NUMERIC_COLUMNS:
+                if col in frame.columns:
+                    numeric[col].extend(frame[col].dropna().tolist())
+            
+            for j, (_, row) in enumerate(frame.iterrows()):
+                history = defaultdict(dict)
+                for value, year, rnd in zip(matrix[j], data['col_years'], data['col_rounds']):
+                    if not np.isnan(value):
+                        history[str(year)][str(rnd)] = int(value)
+                p = positions[j]
+                seat_groups.append({
+                    'dataset': key,
+                    'exam_type': exam_type,
+                    'preference': preference,
+                    'course': self._value(row, TREND_GROUP_COLUMNS['course']),
+                    'quota': self._value(row, TREND_GROUP_COLUMNS['quota']),
+                    'category': self._value(row, TREND_GROUP_COLUMNS['category']),
+                    'fee': self._value(row, ('FEE', 'Fee')),
+                    'stipend': self._value(row, UltimateNEETCollegeFinder.NUMERIC_COLUMNS['STIPEND_NUM']),
+                    'bond_years': self._value(row, ('BOND YEARS', 'Bond Years')),
+                    'bond_penalty': self._value(row, ('BOND PENALTY', 'Bond Penalty')),
+                    'beds': self._value(row, ('BEDS', 'Beds')),
+                    'closing_ranks': dict(history),
+                    'latest_closing_rank': round_or_none(data['latest_final'][p], 0),
+                    'predicted_next_closing_rank': round_or_none(data['predicted_next'][p], 0),
+                    'yearly_change': round_or_none(data['yoy_slope'][p], 0),
+                    'volatility': round_or_none(data['volatility'][p], 3),
+                })
+        
+        def span(col: str) -> Optional[Dict[str, float]]:
+            values = numeric.get(col)
+            return {'min': float(min(values)), 'max': float(max(values))} if values else None
+        
+        return {
+            'id': college_id,
+            'institute': self.institute_index.names[college_id],
+            'state': self.institute_index.states[college_id],
+            'college_type': college_type,
+            'location': location,
+            'summary': {
+                'seat_groups': len(seat_groups),
+                'courses': sorted({g['course'] for g in seat_groups if g['course']}),
+                'quotas': sorted({g['quota'] for g in seat_groups if g['quota']}),
+                'categories': sorted({g['category'] for g in seat_groups if g['category']}),
+                'datasets': sorted(self.rows[college_id]),
+                'fee_range': span('FEE_NUM'),
+                'stipend_range': span('STIPEND_NUM'),
+                'bond_years_range': span('BOND_YEARS_NUM'),
+                'bond_penalty_range': span('BOND_PENALTY_NUM'),
+                'beds': span('BEDS_NUM'),
+            },
+            'seat_groups': seat_groups,
+        }
+
+# ===============================
+# ⚡ CANDIDATE RESOLUTION
+# ===============================
+
+# Safety level codes used by the vectorized classifier (0 = not possible)
+SAFETY_LEVEL_CODES = [
+    SafetyLevel.NOT_POSSIBLE, SafetyLevel.VERY_SAFE, SafetyLevel.SAFE,
+    SafetyLevel.MODERATE, SafetyLevel.RISKY, SafetyLevel.POSSIBLE,
+]
+SAFETY_LEVEL_SCORES = np.array([0.0, 0.95, 0.85, 0.70, 0.55, 0.35])
+
+
+def classify_admission_vectorized(best: np.ndarray, worst: np.ndarray,
+                                  user_rank: Union[int, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Classify seat groups by best/worst historical closing rank
+    
+    Same thresholds as the original per-row classifier. ``user_rank`` may be a
+    scalar or any array that broadcasts against ``best``/``worst`` (e.g. a
+    column of ranks for a sweep). Returns (level codes, base scores).
+    """
+    rank = np.asarray(user_rank, dtype=float)
+    with np.errstate(invalid='ignore'):
+        levels = np.select(
+            [
+                ~(rank <= worst * 1.05),
+                rank <= best * 0.8,
+                rank <= best,
+                rank <= best * 1.2,
+                rank <= worst * 0.9,
+            ],
+            [0, 1, 2, 3, 4],
+            default=5,
+        )
+    return levels, SAFETY_LEVEL_SCORES[levels]
+
+
+@dataclass
+class CandidateBlock:
+    """Rows matching a request's filters, with their closing-rank arrays"""
+    dataset_key: str
+    frame: pd.DataFrame
+    positions: np.ndarray  # Row positions in the trend engine matrices
+    best: np.ndarray
+    worst: np.ndarray
+    distances: np.ndarray
+    filter_report: Dict[str, Any]
+    
+    @property
+    def size(self) -> int:
+        return len(self.frame)
+
+
+class LRUCache:
+    """Small in-process LRU cache with hit/miss counters (safe to share with worker threads)"""
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def __contains__(self, key) -> bool:
+        return key in self._data
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# ===============================
+# ⏱️ STAGE TIMING
+# ===============================
+
+class StageTimer:
+    """Wall-clock spans for the stages of one request
+    
+    ``with timer.span('ranking'):`` times a block; ``add`` accumulates time
+    measured by hand (e.g. per-row work inside a loop) under one stage name.
+    """
+    
+    def __init__(self):
+        self.spans: Dict[str, float] = {}  # Stage -> seconds
+        self.started = time.perf_counter()
+    
+    def add(self, stage: str, seconds: float):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+    
+    def span(self, stage: str):
+        return _Span(self, stage)
+    
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+    
+    def as_ms(self) -> Dict[str, float]:
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.spans.items()}
+
+
+class _Span:
+    __slots__ = ('timer', 'stage', 'start')
+    
+    def __init__(self, timer: StageTimer, stage: str):
+        self.timer = timer
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.timer.add(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds) with bucket-interpolated quantiles"""
+    
+    BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+    
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+    
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= target:
+                lower = self.BUCKETS_MS[index - 1] if index else 0.0
+                upper = self.BUCKETS_MS[index] if index < len(self.BUCKETS_MS) else self.max_ms
+                return min(lower + (upper - lower) * (target - seen) / bucket_count, self.max_ms)
+            seen += bucket_count
+        return self.max_ms
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p95_ms": round(self.quantile(0.95), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class LatencyRecorder:
+    """Per-stage latency histograms aggregated across requests"""
+    
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._lock = threading.Lock()
+    
+    def record(self, spans: Dict[str, float]):
+        """Record a request's spans (seconds)"""
+        with self._lock:
+            for stage, seconds in spans.items():
+                self.histograms[stage].observe(seconds * 1000)
+    
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+# ===============================
+# 📈 METRICS
+# ===============================
+
+class RequestMetrics:
+    """Per-route request counters and latency histograms
+    
+    Routes are labelled by their path template so ids in URLs do not create
+    new series. Updates are a couple of dict operations under a lock.
+    """
+    
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, int], int] = defaultdict(int)  # (method, route, status) -> count
+        self.latency: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            self.latency[(method, route)].observe(seconds * 1000)
+    
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        with self._lock:
+            histograms = {}
+            for labels, histogram in self.latency.items():
+                copy = LatencyHistogram()
+                copy.counts, copy.count, copy.sum_ms = list(histogram.counts), histogram.count, histogram.sum_ms
+                histograms[labels] = copy
+            return dict(self.requests), histograms
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding RequestMetrics (no per-request task or body wrapping)"""
+    
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+        
+        start = time.perf_counter()
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.in_flight -= 1
+            route = scope.get('route')
+            self.metrics.observe(scope['method'], getattr(route, 'path', 'unmatched'), status,
+                                 time.perf_counter() - start)
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task"""
+    
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+    
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+
+def _prometheus_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class PrometheusWriter:
+    """Builds the Prometheus text exposition format"""
+    
+    def __init__(self):
+        self.lines: List[str] = []
+        self._declared = set()
+    
+    def _declare(self, name: str, kind: str, help_text: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+    
+    def sample(self, name: str, kind: str, help_text: str, value: float, **labels):
+        self._declare(name, kind, help_text)
+        self.lines.append(f"{name}{_prometheus_labels(labels)} {float(value):.6g}")
+    
+    def histogram(self, name: str, help_text: str, histogram: LatencyHistogram, **labels):
+        """A millisecond LatencyHistogram exported in seconds"""
+        self._declare(name, 'histogram', help_text)
+        cumulative = 0
+        for bound, bucket_count in zip((*histogram.BUCKETS_MS, None), histogram.counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound is None else f"{bound / 1000:g}"
+            self.lines.append(f"{name}_bucket{_prometheus_labels({**labels, 'le': le})} {cumulative}")
+        self.lines.append(f"{name}_sum{_prometheus_labels(labels)} {histogram.sum_ms / 1000:.6g}")
+        self.lines.append(f"{name}_count{_prometheus_labels(labels)} {histogram.count}")
+    
+    def render(self) -> str:
+        return '\n'.join(self.lines) + '\n'
+
+# ===============================
+# 🔬 SAMPLING PROFILER
+# ===============================
+
+# Token for /admin endpoints and ?profile=1 (profiling is disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Leaf frames of threads that are blocked rather than working
+IDLE_LEAF_FRAMES = {
+    ('selectors.py', 'select'), ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'), ('queue.py', 'get'),
+}
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler over live threads
+    
+    A daemon thread reads ``sys._current_frames()`` every ``interval`` seconds
+    and counts each thread's stack in collapsed form (``root;...;leaf``), which
+    flamegraph.pl and speedscope read directly. Nothing is hooked into the
+    profiled code, so it can run against production traffic. Sampling a busy
+    thread waits for the GIL, so resolution is bounded by ``sys.getswitchinterval()``.
+    """
+    
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[set] = None,
+                 include_idle: bool = False):
+        self.interval = interval
+        self.thread_ids = thread_ids  # None = every thread
+        self.include_idle = include_idle
+        self.stacks: Dict[str, int] = defaultdict(int)
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._started = 0.0
+        self.duration = 0.0
+    
+    def start(self) -> 'SamplingProfiler':
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+    
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+    
+    @staticmethod
+    def _label(code) -> str:
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in IDLE_LEAF_FRAMES and not self.include_idle:
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+    
+    def collapsed(self) -> str:
+        """Collapsed stacks, heaviest first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]))
+    
+    def summary(self, top: int = 15) -> Dict[str, Any]:
+        """Sample counts plus the functions with the most self time"""
+        self_counts: Dict[str, int] = defaultdict(int)
+        for stack, count in self.stacks.items():
+            self_counts[stack.rsplit(';', 1)[-1]] += count
+        return {
+            "duration_ms": round(self.duration * 1000, 1),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "top_self": [
+                {"frame": frame, "samples": count, "share": round(count / self.samples, 3)}
+                for frame, count in sorted(self_counts.items(), key=lambda item: -item[1])[:top]
+            ],
+            "collapsed": self.collapsed().splitlines(),
+        }
+
+
+def require_admin_token(token: Optional[str]):
+    """403 unless ADMIN_TOKEN is configured and ``token`` matches it"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling is disabled: set ADMIN_TOKEN")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+# ===============================
+# 🐢 SLOW QUERY LOG
+# ===============================
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "1000"))  # Negative disables the log
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", str(Path(__file__).parent / "logs" / "slow_queries.jsonl"))
+SLOW_QUERY_LOG_MAX_MB = float(os.getenv("SLOW_QUERY_LOG_MAX_MB", "10"))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+
+class SlowQueryLog:
+    """Rotating JSON-lines log of searches slower than a threshold
+    
+    Each entry carries the normalized request, so ``replay_slow_queries.py``
+    can re-run it against a local instance. The file handler is opened on
+    first use, so a disabled or never-triggered log creates no file.
+    """
+    
+    def __init__(self, path: str = SLOW_QUERY_LOG, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 max_bytes: int = int(SLOW_QUERY_LOG_MAX_MB * 1024 * 1024), backups: int = SLOW_QUERY_LOG_BACKUPS):
+        self.path = Path(path)
+        self.threshold_ms = threshold_ms
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recorded = 0
+        self._logger: Optional[logging.Logger] = None
+    
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms >= 0
+    
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            slow_logger = logging.getLogger(f"{__name__}.search_log.{self.path.stem}")
+            slow_logger.handlers = [handler]
+            slow_logger.setLevel(logging.INFO)
+            slow_logger.propagate = False
+            self._logger = slow_logger
+        return self._logger
+    
+    def maybe_record(self, endpoint: str, request: BaseModel, timer: 'StageTimer',
+                     diagnostics: Dict[str, Any], finder: 'UltimateNEETCollegeFinder') -> bool:
+        """Write an entry if the request took longer than the threshold"""
+        duration_ms = timer.elapsed * 1000
+        if not self.enabled or duration_ms < self.threshold_ms:
+            return False
+        
+        dataset_key = diagnostics.get('dataset_key')
+        filter_report = diagnostics.get('filter_report', {})
+        entry = {
+            "timestamp": datetime.now().isoformat(timespec='milliseconds'),
+            "endpoint": endpoint,
+            "duration_ms": round(duration_ms, 3),
+            "threshold_ms": self.threshold_ms,
+            "request": jsonable_encoder(request),
+            "stage_timings_ms": timer.as_ms(),
+            "candidates": {
+                "matching_selection": filter_report.get('rows_matching_selection'),
+                "after_filters": filter_report.get('rows_remaining'),
+                "admissible": diagnostics.get('admissible'),
+                "returned": diagnostics.get('returned'),
+            },
+            "dataset_key": dataset_key,
+            "dataset_version": finder.dataset_versions.get(dataset_key),
+            "model_version": finder.ml_engine.model_version,
+        }
+        try:
+            self._get_logger().info(json.dumps(entry, default=str))
+            self.recorded += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Slow query log write failed: {e}")
+            return False
+        return True
+
+# ===============================
+# 🌅 STARTUP PIPELINE
+# ===============================
+
+# Seconds a gated request is told to wait before retrying
+READINESS_RETRY_AFTER = int(os.getenv("READINESS_RETRY_AFTER", "5"))
+
+# Paths served while warming: probes, monitoring and docs
+READINESS_EXEMPT_PATHS = {
+    "/", "/livez", "/readyz", "/health", "/metrics", "/admin/profile",
+    "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json",
+}
+
+class StartupPipeline:
+    """Loads datasets, builds indexes and runs warm-up steps after the server binds
+
+    Importing main.py only creates empty objects, so uvicorn accepts
+    connections within the import time. The startup hook then runs
+    ``run`` in a worker thread. Status goes starting -> warming -> ready
+    (or failed), and every phase is timed. Warm-up steps registered with
+    ``add_warmer`` run after the indexes are built. A failing step is logged
+    and does not fail startup. Scripts and benchmarks that import the module
+    call ``run()`` directly.
+    """
+
+    def __init__(self, finder: 'UltimateNEETCollegeFinder'):
+        self.finder = finder
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.timer = StageTimer()
+        self.time_to_ready: Optional[float] = None  # Seconds from module import to ready
+        self.task: Optional[asyncio.Task] = None
+        self.indexes_built = False
+        self.warmers: List[Tuple[str, Any]] = []  # (name, zero-argument callable)
+        self.warmers_done = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    def add_warmer(self, name: str, warm):
+        self.warmers.append((name, warm))
+
+    def run(self):
+        """Blocking warm-up; a no-op once it has started"""
+        with self._lock:
+            if self.status != "starting":
+                return
+            self.status = "warming"
+        try:
+            with self.timer.span('data_load'):
+                self.finder.load_data(self.timer)
+        except Exception as e:
+            self.status, self.error = "failed", str(getattr(e, 'detail', e))
+            logger.error(f"❌ Startup failed: {self.error}")
+            raise
+        self.indexes_built = True
+        for name, warm in self.warmers:
+            try:
+                with self.timer.span(f'warm_{name}'):
+                    warm()
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up step {name} failed: {e}")
+        self.warmers_done = True
+        self.time_to_ready = time.perf_counter() - _IMPORT_STARTED
+        self.status = "ready"
+        logger.info(f"✅ Ready {self.time_to_ready:.2f}s after import started "
+                    f"({', '.join(f'{k} {v:.0f}ms' for k, v in self.timer.as_ms().items())})")
+
+    async def run_in_background(self):
+        try:
+            await asyncio.to_thread(self.run)
+        except Exception:
+            pass  # Status and error are recorded for /health and /readyz
+
+    def checks(self) -> Dict[str, bool]:
+        """Readiness conditions, in the order the pipeline satisfies them"""
+        return {
+            "datasets_loaded": all(self.finder.neet_data.get(key) is not None for key in DATASET_FILES),
+            "indexes_built": self.indexes_built,
+            "warm_up_finished": self.warmers_done,
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "phases_ms": self.timer.as_ms(),
+            "time_to_ready_seconds": round(self.time_to_ready, 3) if self.time_to_ready is not None else None,
+        }
+
+
+class ReadinessGateMiddleware:
+    """ASGI middleware answering 503 + Retry-After until the startup pipeline is ready
+
+    Requests never reach a half-loaded finder. A gated request still gets its
+    route looked up, so /metrics counts the 503 under the route's own label.
+    """
+
+    def __init__(self, app, pipeline: StartupPipeline, routes: list,
+                 exempt_paths: set = READINESS_EXEMPT_PATHS, retry_after: int = READINESS_RETRY_AFTER):
+        self.app = app
+        self.pipeline = pipeline
+        self.routes = routes
+        self.exempt_paths = exempt_paths
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or self.pipeline.is_ready or scope['path'] in self.exempt_paths:
+            return await self.app(scope, receive, send)
+        for route in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                scope['route'] = route
+                break
+        failed = self.pipeline.status == "failed"
+        response = JSONResponse(
+            status_code=503,
+            content={
+                "detail": "Startup failed; this worker cannot serve requests" if failed
+                          else "Service is warming up; retry shortly",
+                "startup_status": self.pipeline.status,
+            },
+            headers={} if failed else {"Retry-After": str(self.retry_after)},
+        )
+        await response(scope, receive, send)
+
+# ===============================
+# 🔥 CACHE WARMING
+# ===============================
+
+# Optional log of every search (same format as the slow query log), for the warmer
+REQUEST_LOG = os.getenv("REQUEST_LOG", "")
+# Comma-separated log files, directories or globs the warmer learns popular requests from
+CACHE_WARM_SOURCES = os.getenv("CACHE_WARM_SOURCES", ",".join(filter(None, [SLOW_QUERY_LOG, REQUEST_LOG])))
+CACHE_WARM_MAX_ENTRIES = int(os.getenv("CACHE_WARM_MAX_ENTRIES", "100"))
+CACHE_WARM_BUDGET_SECONDS = float(os.getenv("CACHE_WARM_BUDGET_SECONDS", "60"))
+# Part of the budget spent before /readyz turns 200; the rest runs after, at low priority
+CACHE_WARM_PRE_READY_SECONDS = float(os.getenv("CACHE_WARM_PRE_READY_SECONDS", "10"))
+# Full /ultimate-search responses kept; each is roughly 250 KB of JSON
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "128"))
+# Logged requests are rebuilt with their endpoint's model; anything else is an UltimateSearchRequest
+WARM_REQUEST_MODELS = {'/counseling-strategy': CounselingStrategyRequest}
+
+def search_result_key(request: UltimateSearchRequest) -> str:
+    """Normalized request key: every field, defaults filled in, in a stable order"""
+    return json.dumps(request.dict(), sort_keys=True, default=str)
+
+
+class CacheWarmer:
+    """Precomputes the most frequent logged searches after a deploy or reload
+
+    Log entries are parsed with their endpoint's request model, normalized
+    into keys and ranked by frequency. /ultimate-search keys get their full response
+    computed into the result cache. Keys from other search endpoints only
+    fill the candidate cache, because their responses are not cached.
+    ``warm_before_ready`` runs as a startup pipeline step.
+    ``warm_after_ready`` continues with what is left of the budget in its
+    own niced thread. It pauses while live searches are running.
+    """
+
+    def __init__(self, finder: 'UltimateNEETCollegeFinder', result_cache: LRUCache, compute,
+                 sources: str = CACHE_WARM_SOURCES, max_entries: int = CACHE_WARM_MAX_ENTRIES,
+                 budget_seconds: float = CACHE_WARM_BUDGET_SECONDS,
+                 pre_ready_seconds: float = CACHE_WARM_PRE_READY_SECONDS):
+        self.finder = finder
+        self.result_cache = result_cache
+        self.compute = compute  # async (request, timer, diagnostics, record) -> cached response parts
+        self.sources = [source.strip() for source in sources.split(",") if source.strip()]
+        self.max_entries = max_entries
+        self.budget_seconds = budget_seconds
+        self.pre_ready_seconds = min(pre_ready_seconds, budget_seconds)
+        self.queue: List[Tuple[str, UltimateSearchRequest]] = []  # (endpoint, request), most frequent first
+        self.warmed_keys: set = set()
+        self.warmed_hits = 0  # Result cache hits on keys the warmer computed
+        self.report: Dict[str, Any] = {"status": "pending"}
+        self._spent = 0.0
+        self._budget_left = budget_seconds
+        self._ready_hits = self._ready_misses = 0
+
+    def _log_files(self) -> List[Path]:
+        files = []
+        for source in self.sources:
+            path = Path(source)
+            if path.is_dir():
+                files.extend(path.glob('*.jsonl*'))
+            elif path.exists():
+                files.append(path)
+            else:
+                files.extend(Path(p) for p in sorted(glob.glob(source)))
+        return files
+
+    def load_requests(self) -> int:
+        """Rank normalized request keys from the logs; returns distinct keys found"""
+        counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        requests: Dict[Tuple[str, str], UltimateSearchRequest] = {}
+        skipped = 0
+        files = self._log_files()
+        for file in files:
+            with open(file, encoding='utf-8') as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                        model = WARM_REQUEST_MODELS.get(entry['endpoint'], UltimateSearchRequest)
+                        request = model(**entry['request'])
+                        endpoint = entry['endpoint'] if entry['endpoint'] == '/ultimate-search' else 'candidates'
+                    except Exception:
+                        skipped += 1
+                        continue
+                    key = (endpoint, search_result_key(request))
+                    counts[key] += 1
+                    requests.setdefault(key, request)
+        ranked = sorted(counts, key=lambda key: -counts[key])
+        self.queue = [(endpoint, requests[(endpoint, key)]) for endpoint, key in ranked]
+        self.report.update({"log_files": len(files), "distinct_keys": len(ranked),
+                            "log_lines_skipped": skipped})
+        return len(ranked)
+
+    def _warm(self, seconds: float, background: bool) -> str:
+        """Warm queued keys until the queue, the entry budget or ``seconds`` runs out"""
+        deadline = time.perf_counter() + seconds
+        loop = asyncio.new_event_loop()
+        try:
+            while self.queue:
+                if len(self.warmed_keys) >= self.max_entries:
+                    return "entry budget"
+                while background and self.finder.searches_in_flight > 0 and time.perf_counter() < deadline:
+                    time.sleep(0.05)  # Live traffic first
+                if time.perf_counter() >= deadline:
+                    return "time budget"
+                endpoint, request = self.queue.pop(0)
+                start = time.perf_counter()
+                if endpoint == '/ultimate-search':
+                    key = search_result_key(request)
+                    if key not in self.result_cache:
+                        self.result_cache.put(key, loop.run_until_complete(
+                            self.compute(request, StageTimer(), {}, False)))
+                    self.warmed_keys.add(key)
+                else:
+                    self.finder._resolve_candidates(request)
+                    self.warmed_keys.add(self.finder.candidate_key(request))
+                self._spent += time.perf_counter() - start
+            return "exhausted"
+        finally:
+            loop.close()
+
+    def warm_before_ready(self):
+        """Startup pipeline step: load the logs and warm within the pre-ready budget"""
+        started = time.perf_counter()
+        if not self.sources or self.max_entries <= 0 or self.budget_seconds <= 0:
+            self.report = {"status": "disabled"}
+            return
+        self.load_requests()
+        stopped_by = self._warm(self.pre_ready_seconds - (time.perf_counter() - started), background=False)
+        self.report.update({"status": "warming", "warmed_before_ready": len(self.warmed_keys),
+                            "stopped_before_ready_by": stopped_by})
+        self._ready_hits, self._ready_misses = self.result_cache.hits, self.result_cache.misses
+        self._budget_left = self.budget_seconds - (time.perf_counter() - started)
+
+    def warm_after_ready(self):
+        """Rest of the budget at low priority, once the server takes traffic
+
+        Meant to run in a dedicated thread (see ``start_background``): the
+        nice value is per thread on Linux and is not reset afterwards.
+        """
+        if self.report.get("status") != "warming":
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)  # Linux: nice this thread only
+        except (AttributeError, OSError):
+            pass
+        stopped_by = self._warm(max(0.0, self._budget_left), background=True)
+        self.report.update({"status": "done", "stopped_by": stopped_by, "keys_left": len(self.queue)})
+        logger.info(f"🔥 Cache warming done: {len(self.warmed_keys)} keys in {self._spent:.1f}s ({stopped_by})")
+
+    def start_background(self) -> threading.Thread:
+        """Run ``warm_after_ready`` in its own daemon thread, not a shared executor worker"""
+        thread = threading.Thread(target=self.warm_after_ready, name="cache-warmer", daemon=True)
+        thread.start()
+        return thread
+
+    def summary(self) -> Dict[str, Any]:
+        hits = self.result_cache.hits - self._ready_hits
+        lookups = hits + self.result_cache.misses - self._ready_misses
+        return {
+            **self.report,
+            "warmed_keys": len(self.warmed_keys),
+            "warm_seconds": round(self._spent, 3),
+            "max_entries": self.max_entries,
+            "budget_seconds": self.budget_seconds,
+            "result_cache_entries": len(self.result_cache),
+            "result_cache_hit_ratio_since_ready": round(hits / lookups, 3) if lookups else None,
+            "hits_on_warmed_keys": self.warmed_hits,
+        }
+
+# ===============================
+# 🎲 ADMISSION PROBABILITY SIMULATOR
+# ===============================
+
+# Simulated rounds: (counseling round, CR round number; None = last round of the year)
+SIMULATED_ROUNDS = [
+    (CounselingRound.ROUND_1, 1),
+    (CounselingRound.ROUND_2, 2),
+    (CounselingRound.ROUND_3, 3),
+    (CounselingRound.MOP_UP, None),
+]
+
+
+class AdmissionProbabilitySimulator:
+    """Monte Carlo model of next year's round-wise closing ranks
+    
+    Each seat group's next-year closing rank for a round is log-normal around
+    its latest complete-year value, shifted by its year-over-year log trend.
+    The spread comes from the year-to-year variation of its final cutoff. Rounds of
+    one year share a common shock (cutoffs move together) plus a smaller
+    round-specific one. Sampling happens in threshold space, and every
+    candidate shares one fixed shock matrix (common random numbers), so
+    ``n_samples`` draws for the whole block are a single broadcast comparison.
+    """
+    
+    def __init__(self, n_samples: int = 2000, round_correlation: float = 0.8, seed: int = 2024):
+        self.n_samples = n_samples
+        self.round_correlation = round_correlation
+        self.seed = seed
+        
+        # Shocks stored round-major (rounds x samples) for contiguous comparisons
+        rng = np.random.default_rng(seed)
+        common = rng.standard_normal((1, n_samples), dtype=np.float32)
+        specific = rng.standard_normal((len(SIMULATED_ROUNDS), n_samples), dtype=np.float32)
+        rho = round_correlation
+        self.shocks = rho * common + np.float32(np.sqrt(1 - rho ** 2)) * specific
+    
+    def prepare(self, data: Dict[str, Any], positions: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-candidate log-normal parameters (mu per round, sigma) from the rank matrix"""
+        n = len(positions)
+        matrix = data['matrix'][positions]
+        col_years, col_rounds = data['col_years'], data['col_rounds']
+        finals = data['final_by_year'][positions][:, data['complete_years']]
+        years = data['years'][data['complete_years']]
+        
+        # Round values of the latest complete year that has data for each row
+        base = np.full((n, len(SIMULATED_ROUNDS)), np.nan)
+        for j, year in enumerate(years):
+            has_year = ~np.isnan(finals[:, j])
+            year_rounds = np.full((n, len(SIMULATED_ROUNDS)), np.nan)
+            for k, (_, round_number) in enumerate(SIMULATED_ROUNDS):
+                if round_number is None:
+                    year_rounds[:, k] = finals[:, j]
+                    continue
+                cols = np.flatnonzero((col_years == year) & (col_rounds == round_number))
+                if cols.size:
+                    year_rounds[:, k] = matrix[:, cols[0]]
+            # A round with no new allotment keeps the previous round's cutoff
+            year_rounds = pd.DataFrame(year_rounds).ffill(axis=1).to_numpy()
+            base[has_year] = year_rounds[has_year]
+        
+        # Year-over-year log trend (shrunk by half) and spread of the log finals
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_finals = np.log(finals)
+            steps = np.diff(log_finals, axis=1) if finals.shape[1] > 1 else np.full((n, 1), np.nan)
+        trend = np.clip(np.nan_to_num(CutoffTrendEngine._nanmean(steps)), -0.25, 0.25) * 0.5
+        valid = ~np.isnan(log_finals)
+        counts = valid.sum(axis=1)
+        mean = CutoffTrendEngine._nanmean(log_finals)
+        var = np.where(valid, (log_finals - mean[:, None]) ** 2, 0.0).sum(axis=1) / np.maximum(counts - 1, 1)
+        sigma = np.where(counts >= 2, np.sqrt(var), 0.2)
+        sigma = np.clip(sigma, 0.08, 0.6)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mu = np.log(base) + trend[:, None]
+        return {'mu': mu, 'sigma': sigma}
+    
+    def simulate(self, data: Dict[str, Any], positions: np.ndarray, user_rank: int) -> Dict[str, np.ndarray]:
+        """Per-candidate, per-round admission probabilities with 95% intervals"""
+        params = self.prepare(data, positions)
+
+        # Admitted in a round when the sampled closing rank is at or after user_rank:
+        # log(rank) <= mu + sigma * X  <=>  X >= (log(rank) - mu) / sigma
+        with np.errstate(invalid='ignore'):
+            threshold = (np.log(max(user_rank, 1)) - params['mu']) / params['sigma'][:, None]
+        threshold = np.where(np.isnan(threshold), np.inf, threshold).astype(np.float32)
+        
+        # Once a seat is held it is kept, so "admitted by round" accumulates
+        n, n_rounds = threshold.shape
+        open_counts = np.empty((n, n_rounds))
+        admitted_counts = np.empty((n, n_rounds))
+        admitted = None
+        for k in range(n_rounds):
+            open_in_round = self.shocks[k][None, :] >= threshold[:, k][:, None]
+            open_counts[:, k] = open_in_round.sum(axis=1)
+            if admitted is None:
+                missed_first = ~open_in_round
+                admitted = open_in_round.copy()
+            else:
+                np.logical_or(admitted, open_in_round, out=admitted)
+            admitted_counts[:, k] = admitted.sum(axis=1)
+        
+        p_round = open_counts / self.n_samples
+        p_by = admitted_counts / self.n_samples
+        low, high = self._wilson_interval(p_round, self.n_samples)
+        
+        # Waitlist: no seat in round 1 but one in a later round. The conditional
+        # version answers "I missed round 1 - will a later round still come through?"
+        missed = missed_first.sum(axis=1)
+        later = (admitted & missed_first).sum(axis=1)
+        waitlist = later / self.n_samples
+        later_given_missed = np.where(missed > 0, later / np.maximum(missed, 1), 0.0)
+        
+        return {
+            'p_round': p_round,
+            'p_admitted_by': p_by,
+            'ci_low': low,
+            'ci_high': high,
+            'waitlist': waitlist,
+            'later_given_missed': later_given_missed,
+            'median_cutoff': np.exp(params['mu']),
+        }
+    
+    @staticmethod
+    def _wilson_interval(p: np.ndarray, n: int, z: float = 1.96) -> Tuple[np.ndarray, np.ndarray]:
+        denom = 1 + z ** 2 / n
+        centre = (p + z ** 2 / (2 * n)) / denom
+        margin = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denom
+        return np.clip(centre - margin, 0, 1), np.clip(centre + margin, 0, 1)
+
+# ===============================
+# 🧮 CHOICE PORTFOLIO OPTIMIZER
+# ===============================
+
+class ChoicePortfolioOptimizer:
+    """Pick an ordered counseling choice list that maximizes expected utility
+    
+    A choice list is filled in order, so with admission probabilities p and
+    utilities u (list sorted by utility) its value is
+    ``sum_i u_i * p_i * prod_{j<i} (1 - p_j)``. That splits as
+    ``V(i, k, s) = max(V(i+1, k, s), u_i p_i + (1 - p_i) V(i+1, k-1, s - safe_i))``
+    over candidates i, remaining slots k and safe choices still required s,
+    solved exactly bottom-up with the (k, s) table vectorized per candidate.
+    """
+    
+    def optimize(self, utilities: np.ndarray, probabilities: np.ndarray, is_safe: np.ndarray,
+                 n_choices: int, min_safe: int = 0) -> Dict[str, Any]:
+        """Returns chosen candidate indices (list order), expected utility and P(any seat)"""
+        n = len(utilities)
+        order = np.argsort(-utilities, kind='stable')
+        u, p = utilities[order], probabilities[order]
+        safe = is_safe[order].astype(int)
+        n_choices = min(n_choices, n)
+        min_safe = min(min_safe, int(safe.sum()), n_choices)
+        
+        # value[k, s]: best expected utility of the remaining candidates
+        value = np.full((n_choices + 1, min_safe + 1), -np.inf)
+        value[:, 0] = 0.0
+        take = np.zeros((n, n_choices + 1, min_safe + 1), dtype=bool)
+        s_after = np.arange(min_safe + 1)
+        for i in range(n - 1, -1, -1):
+            next_s = np.maximum(s_after - safe[i], 0)
+            taken = np.full_like(value, -np.inf)
+            taken[1:] = u[i] * p[i] + (1 - p[i]) * value[:-1][:, next_s]
+            # Ties go to taking, so zero-value slots still fill out the list
+            take[i] = np.isfinite(taken) & (taken >= value)
+            value = np.where(take[i], taken, value)
+        
+        chosen = []
+        k, s = n_choices, min_safe
+        for i in range(n):
+            if k == 0:
+                break
+            if take[i, k, s]:
+                chosen.append(int(order[i]))
+                k, s = k - 1, max(s - safe[i], 0)
+        
+        chosen_p = probabilities[chosen]
+        return {
+            'chosen': chosen,
+            'expected_utility': float(value[n_choices, min_safe]) if chosen else 0.0,
+            'admission_probability': float(1 - np.prod(1 - chosen_p)) if chosen else 0.0,
+            'safe_choices': int(is_safe[chosen].sum()) if chosen else 0,
+            'min_safe_applied': min_safe,
+        }
+
 # ===============================
 # 🎯 ULTIMATE COLLEGE FINDER
 # ===============================
 
+# Comparison rows, in response order, and which direction is better
+COMPARISON_METRICS = [
+    'quota', 'category', 'course', 'safety_level', 'historical_safety_level', 'admission_probability',
+    *[f'{counseling_round.name.lower()}_probability' for counseling_round, _ in SIMULATED_ROUNDS],
+    'waitlist_probability', 'later_round_probability_given_missed', 'latest_closing_rank', 'predicted_next_closing_rank', 'yearly_change',
+    'volatility', 'annual_fee', 'stipend', 'bond_years', 'bond_penalty', 'beds',
+]
+# Open-merit quotas per dataset: the All India quota, institutes' own open seats (AIIMS, JIPMER...) and
+# deemed paid seats. NRI, foreign-national and minority quotas are left out. State Wise quotas are
+# state-specific, so /compare needs an explicit quota there.
+DEFAULT_COMPARISON_QUOTAS = {
+    'ug_all_india': ['AI', 'AIIMS SO', 'JPMR SO', 'BHU SO', 'AMU SO', 'DEEMED PS'],
+    'pg_all_india': ['AIQ', 'DNB Post MBBS', 'NBE Diploma', 'MNG'],
+}
+# Minimum simulated final admission probability per safety level, highest first
+SIMULATED_SAFETY_BANDS = [
+    (0.90, SafetyLevel.VERY_SAFE), (0.75, SafetyLevel.SAFE), (0.50, SafetyLevel.MODERATE),
+    (0.25, SafetyLevel.RISKY), (0.01, SafetyLevel.POSSIBLE),
+]
+COMPARISON_PREFERENCES = {
+    'admission_probability': 'max',
+    'predicted_next_closing_rank': 'max',
+    'volatility': 'min',
+    'annual_fee': 'min',
+    'stipend': 'max',
+    'bond_years': 'min',
+    'bond_penalty': 'min',
+    'beds': 'max',
+}
+
+
+# Spreadsheet export columns, in order
+EXPORT_COLUMNS = [
+    'requested_category', 'institute', 'course', 'state', 'quota', 'category', 'college_type',
+    'fee', 'annual_fee', 'stipend', 'bond_years', 'bond_penalty', 'beds',
+    'safety_level', 'admission_probability',
+    *[f'{counseling_round.name.lower()}_probability' for counseling_round, _ in SIMULATED_ROUNDS],
+    'best_closing_rank', 'worst_closing_rank', 'latest_closing_rank', 'predicted_next_closing_rank',
+    'yearly_change', 'distance_km',
+]
+
+
+# Data file behind each dataset key
+DATASET_FILES = {
+    'ug_all_india': 'NEET_UG_all_india.csv',
+    'ug_state_wise': 'NEET_UG_statewise.csv',
+    'pg_all_india': 'NEET_PG_all_india.csv',
+    'pg_state_wise': 'NEET_PG_statewise.csv',
+}
+
+
 class UltimateNEETCollegeFinder:
     """Ultimate College Finder with AI-Powered Features"""
     
+    # Parsed numeric columns -> candidate source columns (naming differs per dataset)
+    NUMERIC_COLUMNS = {
+        'FEE_NUM': ('FEE', 'Fee'),
+        'STIPEND_NUM': ('STIPEND YEAR 1', 'Stipend Year 1', 'STIPEND'),
+        'BOND_YEARS_NUM': ('BOND YEARS', 'Bond Years'),
+        'BOND_PENALTY_NUM': ('BOND PENALTY', 'Bond Penalty'),
+        'BEDS_NUM': ('BEDS', 'Beds'),
+    }
+    
     def __init__(self):
-        # Get data path relative to this file for production compatibility
+        # Get data path relative to this file for production compatibility (NEET_DATA_DIR overrides)
         base_path = Path(__file__).parent.parent
-        self.data_path = base_path / "data" / "raw"
+        self.data_path = Path(os.getenv("NEET_DATA_DIR", base_path / "data" / "raw"))
         self.neet_data = {}
         self.ml_engine = MLPredictionEngine()
-        self.cache = {}  # In-memory cache (use Redis in production)
-        self.load_data()
-        self.initialize_ai_features()
+        self.geo_index = GeoSpatialIndex()
+        self.city_table = CityCoordinateTable()
+        self.institute_coordinates: Dict[str, Tuple[float, float]] = {}  # Institutes placed by city only
+        self.unlocated_institutes: set = set()  # No city match: state centroid for scoring, no distance
+        self.trend_engine = CutoffTrendEngine()
+        self.rank_index = RankDistributionIndex()
+        self.similar_index = SimilarCollegeIndex()
+        self.institute_index = InstituteSearchIndex()
+        self.college_store = CollegeDetailStore()
+        self.admission_simulator = AdmissionProbabilitySimulator()
+        self.portfolio_optimizer = ChoicePortfolioOptimizer()
+        self.cache = LRUCache(max_entries=256)  # Candidate blocks by filter set (use Redis in production)
+        self.stage_latency = LatencyRecorder()  # Search stage histograms for /health
+        self.searches_in_flight = 0
+        self._activity_lock = threading.Lock()  # Searches run on the event loop and in the cache warmer thread
+        self.dataset_versions: Dict[str, str] = {}  # Dataset -> content hash of its CSV
+        self.started_at = time.time()
+        # Data is loaded by the startup pipeline once the server is accepting connections
         
-    def load_data(self):
-        """Load all NEET data files with enhanced processing"""
+    def load_data(self, timer: Optional['StageTimer'] = None):
+        """Load all NEET data files with enhanced processing (phases timed into ``timer``)"""
+        timer = timer or StageTimer()
         try:
-            logger.info("🔄 Loading NEET data for Ultimate Backend...")
-            
-            # Load data files
-            self.neet_data["ug_all_india"] = pd.read_csv(
-                self.data_path / "NEET_UG_all_india.csv", 
-                encoding='utf-8-sig'
-            )
-            self.neet_data["ug_state_wise"] = pd.read_csv(
-                self.data_path / "NEET_UG_statewise.csv", 
-                encoding='utf-8-sig'
-            )
-            self.neet_data["pg_all_india"] = pd.read_csv(
-                self.data_path / "NEET_PG_all_india.csv", 
-                encoding='utf-8-sig'
-            )
-            self.neet_data["pg_state_wise"] = pd.read_csv(
-                self.data_path / "NEET_PG_statewise.csv", 
-                encoding='utf-8-sig'
-            )
+            logger.info("🔄 Loading NEET data for Ultimate Backend...")
+            
+            # Load data files; a content hash identifies which version this process serves
+            with timer.span('read_csv'):
+                for key, filename in DATASET_FILES.items():
+                    raw = (self.data_path / filename).read_bytes()
+                    self.dataset_versions[key] = hashlib.sha256(raw).hexdigest()[:12]
+                    self.neet_data[key] = pd.read_csv(io.BytesIO(raw), encoding='utf-8-sig')
+            
+            with timer.span('city_table'):
+                self.city_table.load(CITY_COORDINATES_FILE)
             
             # Clean and enhance data
-            for key, df in self.neet_data.items():
-                if df is not None:
-                    df.columns = df.columns.str.replace('\ufeff', '').str.strip()
-                    df.fillna('-', inplace=True)
-                    # Add enhanced columns for ML
-                    self._enhance_dataframe(df, key)
+            with timer.span('enhance'):
+                for key, df in self.neet_data.items():
+                    if df is not None:
+                        df.columns = df.columns.str.replace('\ufeff', '').str.strip()
+                        df.fillna('-', inplace=True)
+                        # Add enhanced columns for ML
+                        self._enhance_dataframe(df, key)
+            
+            with timer.span('geo_index'):
+                self.geo_index.build(self.institute_coordinates)
+            logger.info(f"🗺️ Geo index built for {len(self.institute_coordinates):,} institutes "
+                        f"({len(self.unlocated_institutes):,} without a city match)")
+            
+            with timer.span('trend_engine'):
+                for key, df in self.neet_data.items():
+                    if df is not None:
+                        self.trend_engine.build(key, df)
+            logger.info("📈 Cutoff trend statistics precomputed")
+            
+            with timer.span('rank_index'):
+                self.rank_index.build(self.neet_data, self.trend_engine)
+            logger.info(f"📊 Rank distribution index built for {len(self.rank_index.groups):,} groups")
+            
+            with timer.span('similar_index'):
+                for key, df in self.neet_data.items():
+                    if df is not None:
+                        self.similar_index.build(key, df, self.trend_engine.datasets[key])
+            logger.info("🧭 Similar college index built")
+            
+            with timer.span('institute_index'):
+                self.institute_index.build(self.neet_data)
+            logger.info(f"🔤 Institute name index built for {len(self.institute_index.names):,} institutes")
+            
+            with timer.span('college_store'):
+                self.college_store.build(self.neet_data, self.trend_engine, self.institute_index)
             
             logger.info("✅ Ultimate NEET data loaded successfully!")
             self.print_enhanced_summary()
@@ -439,10 +2468,34 @@ class UltimateNEETCollegeFinder:
             if 'INSTITUTE' in df.columns:
                 df['COLLEGE_TYPE'] = df['INSTITUTE'].apply(self._classify_college_type)
             
-            # Add geographic coordinates (simplified - in production use real geocoding)
-            if 'STATE' in df.columns:
-                df['LATITUDE'] = df['STATE'].apply(self._get_state_lat)
-                df['LONGITUDE'] = df['STATE'].apply(self._get_state_lng)
+            # Parse fee, stipend, bond and bed columns once for numeric filtering
+            for numeric_col, source_cols in self.NUMERIC_COLUMNS.items():
+                source_col = next((col for col in source_cols if col in df.columns), None)
+                if source_col is not None:
+                    df[numeric_col] = self._parse_numeric_series(df[source_col])
+                else:
+                    df[numeric_col] = np.nan
+            
+            # Add per-institute coordinates (city in the name, else state centroid)
+            institute_col = 'INSTITUTE' if 'INSTITUTE' in df.columns else 'Institute'
+            state_col = 'STATE' if 'STATE' in df.columns else 'State'
+            if institute_col in df.columns:
+                names = df[institute_col].astype(str).str.strip('"')
+                states = df[state_col] if state_col in df.columns else pd.Series('-', index=df.index)
+                pairs = pd.DataFrame({'name': names, 'state': states}).drop_duplicates('name')
+                coordinates = {}
+                for name, state in zip(pairs['name'], pairs['state']):
+                    point = self.institute_coordinates.get(name) or self.city_table.locate(name, state)
+                    if point is not None:
+                        self.institute_coordinates[name] = point
+                        self.unlocated_institutes.discard(name)
+                    else:
+                        point = (self._get_state_lat(state), self._get_state_lng(state))
+                        self.unlocated_institutes.add(name)
+                    coordinates[name] = point
+                df['LATITUDE'] = names.map(lambda n: coordinates[n][0])
+                df['LONGITUDE'] = names.map(lambda n: coordinates[n][1])
+                df['CITY_MATCHED'] = names.isin(self.institute_coordinates.keys())
             
             # Calculate average closing ranks for ML
             cr_columns = [col for col in df.columns if str(col).startswith('CR')]
@@ -463,6 +2516,12 @@ class UltimateNEETCollegeFinder:
         except Exception as e:
             logger.warning(f"⚠️ Error enhancing dataframe: {e}")
     
+    @staticmethod
+    def _parse_numeric_series(series: pd.Series) -> pd.Series:
+        """Parse values like "₹ 1,58,600" or "2250" into floats (NaN when unknown)"""
+        cleaned = series.astype(str).str.replace(r'[^\d.]', '', regex=True)
+        return pd.to_numeric(cleaned.replace('', np.nan), errors='coerce')
+    
     def _classify_college_type(self, institute_name: str) -> CollegeType:
         """Classify college type based on name"""
         name_lower = str(institute_name).lower()
@@ -477,22 +2536,12 @@ class UltimateNEETCollegeFinder:
             return CollegeType.PRIVATE
     
     def _get_state_lat(self, state: str) -> float:
-        """Get latitude for state (simplified mapping)"""
-        state_coords = {
-            'Delhi': 28.6139, 'Maharashtra': 19.7515, 'Karnataka': 15.3173,
-            'Tamil Nadu': 11.1271, 'Uttar Pradesh': 26.8467, 'Gujarat': 23.0225,
-            'Rajasthan': 27.0238, 'West Bengal': 22.9868, 'Madhya Pradesh': 22.9734
-        }
-        return state_coords.get(state, 20.5937)  # Default to India center
+        """Get latitude for state"""
+        return STATE_COORDINATES.get(state, (20.5937, 78.9629))[0]  # Default to India center
     
     def _get_state_lng(self, state: str) -> float:
-        """Get longitude for state (simplified mapping)"""
-        state_coords = {
-            'Delhi': 77.2090, 'Maharashtra': 75.7139, 'Karnataka': 75.7139,
-            'Tamil Nadu': 78.6569, 'Uttar Pradesh': 80.9462, 'Gujarat': 72.5714,
-            'Rajasthan': 74.2179, 'West Bengal': 87.8550, 'Madhya Pradesh': 78.6569
-        }
-        return state_coords.get(state, 78.9629)  # Default to India center
+        """Get longitude for state"""
+        return STATE_COORDINATES.get(state, (20.5937, 78.9629))[1]  # Default to India center
     
     async def initialize_ai_features(self):
         """Initialize AI and ML features"""
@@ -531,124 +2580,598 @@ class UltimateNEETCollegeFinder:
     # 🔍 ENHANCED SEARCH METHODS
     # ===============================
     
-    async def ultimate_search(self, request: UltimateSearchRequest) -> List[UltimateCollegeRecommendation]:
-        """Ultimate search with all AI features"""
+    async def ultimate_search(self, request: UltimateSearchRequest,
+                              diagnostics: Optional[Dict[str, Any]] = None,
+                              timer: Optional[StageTimer] = None,
+                              record: bool = True,
+                              use_cache: bool = True,
+                              limit: Optional[int] = 100) -> List[UltimateCollegeRecommendation]:
+        """Ultimate search with all AI features
+        
+        If a ``diagnostics`` dict is passed it is filled with search internals
+        (e.g. ``filter_report``) for the caller to expose in response metadata.
+        Stage spans go into ``timer`` (a fresh one if not given) and are
+        recorded in ``stage_latency`` once the search finishes, unless
+        ``record`` is False (cache warming). ``use_cache=False`` filters the
+        candidates afresh without reading or filling the candidate cache.
+        ``limit=None`` returns every admissible candidate, ranked.
+        """
+        timer = timer if timer is not None else StageTimer()
+        with self._activity_lock:
+            self.searches_in_flight += 1
         try:
             logger.info(f"🔍 Starting Ultimate Search for rank {request.rank_min}-{request.rank_max}")
             
-            # Get base data
-            df = self._get_dataset(request.exam_type, request.preference)
-            if df is None or df.empty:
-                return []
-            
-            # Apply basic filters
-            df = self._apply_basic_filters(df, request)
-            if df.empty:
+            with timer.span('filter_resolution'):
+                block = self._resolve_candidates(request, use_cache=use_cache)
+            if diagnostics is not None:
+                diagnostics['filter_report'] = dict(block.filter_report)
+                diagnostics['dataset_key'] = block.dataset_key
+            if block.size == 0:
                 return []
             
-            # Process each college with AI enhancement
-            recommendations = []
+            # Classify every candidate at once; only admissible rows get the full treatment
             user_rank = request.rank_min if request.rank_min == request.rank_max else int((request.rank_min + request.rank_max) / 2)
+            with timer.span('classification'):
+                levels, base_scores = classify_admission_vectorized(block.best, block.worst, user_rank)
+                admissible = np.flatnonzero(levels > 0)
             
-            for _, row in df.iterrows():
+            # Monte Carlo round-wise chances for all admissible rows in one batch
+            with timer.span('simulation'):
+                simulation = self.admission_simulator.simulate(
+                    self.trend_engine.datasets[block.dataset_key], block.positions[admissible], user_rank
+                )
+            if diagnostics is not None:
+                diagnostics['admissible'] = int(admissible.size)
+            
+            # Per-row stages are interleaved, so they are accumulated by hand
+            ml_seconds = geo_seconds = 0.0
+            build_start = time.perf_counter()
+            recommendations = []
+            for j, i in enumerate(admissible):
                 try:
-                    # Get closing ranks
+                    row = block.frame.iloc[i]
                     closing_ranks = self._extract_closing_ranks(row)
+                    safety_level = SAFETY_LEVEL_CODES[levels[i]]
+                    base_score = float(base_scores[i])
+                    
+                    # Enhanced AI analysis
+                    college_data = self._prepare_college_data(row, closing_ranks)
                     
-                    # Calculate base admission possibility
-                    admission_possible, safety_level, base_score = self._calculate_admission_possibility(
-                        closing_ranks, user_rank
+                    # ML-enhanced prediction
+                    stage_start = time.perf_counter()
+                    ml_confidence = await self.ml_engine.predict_admission_probability(
+                        college_data, user_rank
                     )
+                    ml_seconds += time.perf_counter() - stage_start
                     
-                    # Only proceed if admission is possible
-                    if admission_possible:
-                        # Enhanced AI analysis
-                        college_data = self._prepare_college_data(row, closing_ranks)
-                        
-                        # ML-enhanced prediction
-                        ml_confidence = await self.ml_engine.predict_admission_probability(
-                            college_data, user_rank
-                        )
-                        
-                        # Round-wise analysis
-                        round_wise_chances = self._calculate_round_wise_chances(
-                            closing_ranks, user_rank, ml_confidence
-                        )
-                        
-                        # Geographic analysis
-                        geographic_scores = self._calculate_geographic_scores(
-                            row, request.home_location, request.climate_preference
-                        )
-                        
-                        # Build ultimate recommendation
-                        recommendation = self._build_ultimate_recommendation(
-                            row, closing_ranks, safety_level, base_score, 
-                            ml_confidence, round_wise_chances, geographic_scores,
-                            user_rank, request
-                        )
-                        
-                        recommendations.append(recommendation)
+                    # Round-wise analysis
+                    round_wise_chances, admission_simulation = self._calculate_round_wise_chances(simulation, j)
+                    
+                    # Geographic analysis
+                    stage_start = time.perf_counter()
+                    geographic_scores = self._calculate_geographic_scores(
+                        row, request.home_location, request.climate_preference, block.distances[i]
+                    )
+                    geo_seconds += time.perf_counter() - stage_start
+                    
+                    # Build ultimate recommendation
+                    recommendation = self._build_ultimate_recommendation(
+                        row, closing_ranks, safety_level, base_score, 
+                        ml_confidence, round_wise_chances, geographic_scores,
+                        user_rank, request, admission_simulation
+                    )
+                    
+                    recommendations.append(recommendation)
                         
                 except Exception as e:
                     logger.warning(f"⚠️ Error processing college row: {e}")
                     continue
+            timer.add('ml_scoring', ml_seconds)
+            timer.add('geographic_scoring', geo_seconds)
+            timer.add('model_building', time.perf_counter() - build_start - ml_seconds - geo_seconds)
             
             # Apply AI-powered ranking
-            recommendations = self._apply_ai_ranking(recommendations, request)
+            with timer.span('ranking'):
+                recommendations = self._apply_ai_ranking(recommendations, request)
+                
+                # Limit results for performance
+                if limit is not None:
+                    recommendations = recommendations[:limit]
             
-            # Limit results for performance
-            recommendations = recommendations[:100]  # Top 100 results
+            # Similar colleges for the whole page in one batched lookup
+            with timer.span('alternatives'):
+                suggestions = self.similar_index.query(
+                    block.dataset_key, [(r.institute, r.course) for r in recommendations]
+                )
+                for recommendation, similar in zip(recommendations, suggestions):
+                    recommendation.alternative_suggestions = similar
             
+            if diagnostics is not None:
+                diagnostics['returned'] = len(recommendations)
             logger.info(f"✅ Ultimate Search completed: {len(recommendations)} colleges found")
             return recommendations
             
         except Exception as e:
             logger.error(f"❌ Ultimate search failed: {e}")
             raise HTTPException(status_code=500, detail=f"Ultimate search failed: {str(e)}")
+        finally:
+            with self._activity_lock:
+                self.searches_in_flight -= 1
+            timer.spans['search'] = timer.elapsed
+            if record:
+                self.stage_latency.record(timer.spans)
     
-    def _get_dataset(self, exam_type: ExamType, preference: QuotaPreference) -> pd.DataFrame:
-        """Get appropriate dataset"""
+    # Request fields that only affect scoring, not which rows are candidates
+    SCORING_ONLY_FIELDS = {
+        'rank_min', 'rank_max', 'climate_preference', 'consider_stipend', 'roi_priority',
+        'include_risky_options', 'counseling_round_focus', 'similar_profile_analysis',
+        'ml_prediction_weight',
+    }
+    
+    def candidate_key(self, request: UltimateSearchRequest) -> str:
+        """Candidate cache key: the base request's filter fields only
+
+        Subclass fields (e.g. ``CounselingStrategyRequest.n_choices``) never
+        change which rows are candidates, so they are left out as well.
+        """
+        fields = set(UltimateSearchRequest.model_fields) - self.SCORING_ONLY_FIELDS
+        return json.dumps(request.dict(include=fields), sort_keys=True, default=str)
+
+    def _resolve_candidates(self, request: UltimateSearchRequest, use_cache: bool = True) -> CandidateBlock:
+        """Filter a request's dataset once into a cached candidate block"""
+        cache_key = self.candidate_key(request)
+        cached = self.cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+        
+        key = self._get_dataset_key(request.exam_type, request.preference)
+        df = self.neet_data.get(key)
+        filter_report = {}
+        
+        if df is None or df.empty:
+            df = pd.DataFrame()
+        else:
+            df = self._apply_basic_filters(df, request, filter_report)
+            
+            # Prune by distance through the geo index before any per-row scoring
+            home = self._parse_home_location(request.home_location)
+            if home and request.max_distance_km:
+                df = self._apply_distance_filter(df, home, request.max_distance_km, filter_report)
+        
+        if df.empty or key not in self.trend_engine.datasets:
+            positions = np.array([], dtype=int)
+            best = worst = distances = np.array([], dtype=float)
+        else:
+            positions = self.trend_engine.positions_for_index(key, df.index)
+            best, worst = self._closing_rank_bounds(self.trend_engine.datasets[key]['matrix'][positions])
+            
+            # Distance for all candidates in one vectorized call
+            home = self._parse_home_location(request.home_location)
+            distances = (
+                GeoSpatialIndex.haversine_km(home[0], home[1], df['LATITUDE'].to_numpy(), df['LONGITUDE'].to_numpy())
+                if home and 'LATITUDE' in df.columns else np.full(len(df), np.nan)
+            )
+        
+        block = CandidateBlock(
+            dataset_key=key, frame=df, positions=positions, best=best, worst=worst,
+            distances=distances, filter_report=filter_report
+        )
+        if use_cache:
+            self.cache.put(cache_key, block)
+        return block
+    
+    @staticmethod
+    def _closing_rank_bounds(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Best and worst historical closing rank per row (NaN without history)"""
+        n_rows = matrix.shape[0]
+        has_rank = ~np.isnan(matrix).all(axis=1) if matrix.size else np.zeros(n_rows, dtype=bool)
+        best = np.full(n_rows, np.nan)
+        worst = np.full(n_rows, np.nan)
+        best[has_rank] = np.nanmin(matrix[has_rank], axis=1)
+        worst[has_rank] = np.nanmax(matrix[has_rank], axis=1)
+        return best, worst
+    
+    def compare_colleges(self, request: CollegeComparisonRequest) -> Dict[str, Any]:
+        """Evaluate a shortlist at one rank in a single pass; metrics aligned to college_ids
+        
+        Each college is represented by its matching seat group with the best
+        simulated final chance. ``safety_level`` is banded from that same
+        probability, so the two always agree. The closing-rank classifier's
+        verdict (what /ultimate-search shows) is ``historical_safety_level``.
+        """
+        key = self._get_dataset_key(request.exam_type, request.preference)
+        df = self.neet_data.get(key)
+        data = self.trend_engine.datasets.get(key)
+        if df is None or data is None:
+            raise HTTPException(status_code=404, detail=f"No data loaded for {key}")
+        if len(set(request.college_ids)) != len(request.college_ids):
+            raise HTTPException(status_code=400, detail="college_ids must not contain duplicates")
+        course = request.course or ("MBBS" if request.exam_type == ExamType.NEET_UG else None)
+        # Without a quota the best row could be any quota (NRI, foreign national...), which compares nothing
+        quotas = [request.quota] if request.quota else DEFAULT_COMPARISON_QUOTAS.get(key)
+        if not quotas:
+            raise HTTPException(status_code=400, detail="quota is required for State Wise comparison")
+        
+        # Every seat group of every shortlisted college, tagged with its slot
+        slot_rows = [
+            self.college_store.rows[college_id].get(key, np.array([], dtype=int))
+            if 0 <= college_id < len(self.college_store) else np.array([], dtype=int)
+            for college_id in request.college_ids
+        ]
+        positions = np.concatenate(slot_rows).astype(int)
+        owners = np.repeat(np.arange(len(slot_rows)), [len(rows) for rows in slot_rows])
+        
+        frame = df.iloc[positions]
+        mask = np.ones(len(frame), dtype=bool)
+        for dimension, wanted in (('category', [request.category]), ('quota', quotas), ('course', [course] if course else [])):
+            col = next((c for c in TREND_GROUP_COLUMNS[dimension] if c in frame.columns), None)
+            if wanted and col is not None:
+                mask &= np.isin(frame[col].astype(str).str.strip().str.lower().to_numpy(),
+                                [value.strip().lower() for value in wanted])
+        positions, owners, frame = positions[mask], owners[mask], frame[mask]
+        
+        # One vectorized pass: classifier, admission simulation, trend arrays
+        best, worst = self._closing_rank_bounds(data['matrix'][positions])
+        levels, _ = classify_admission_vectorized(best, worst, request.rank)
+        simulation = self.admission_simulator.simulate(data, positions, request.rank)
+        final_probability = simulation['p_admitted_by'][:, -1]
+        
+        # Per college, the matching seat group with the best final chance
+        order = np.lexsort((-final_probability, owners))
+        first = order[np.r_[True, owners[order][1:] != owners[order][:-1]]] if len(order) else order
+        chosen = {int(owners[i]): int(i) for i in first}
+        matched_counts = np.bincount(owners, minlength=len(slot_rows))
+        
+        round_or_none = CutoffTrendEngine._round_or_none
+        metrics = defaultdict(list)
+        colleges = []
+        for slot, college_id in enumerate(request.college_ids):
+            valid_id = 0 <= college_id < len(self.college_store)
+            colleges.append({
+                'id': college_id,
+                'institute': self.institute_index.names[college_id] if valid_id else None,
+                'state': self.institute_index.states[college_id] if valid_id else None,
+                'found': valid_id,
+            })
+            i = chosen.get(slot)
+            metrics['seat_groups_matched'].append(int(matched_counts[slot]))
+            if i is None:
+                for metric in COMPARISON_METRICS:
+                    metrics[metric].append(None)
+                continue
+            
+            row = frame.iloc[i]
+            p = positions[i]
+            values = {
+                'quota': str(row.get('QUOTA', row.get('Quota', ''))),
+                'category': str(row.get('CATEGORY', row.get('Category', ''))),
+                'course': str(row.get('COURSE', row.get('Course', ''))),
+                'safety_level': next((level for threshold, level in SIMULATED_SAFETY_BANDS
+                                      if final_probability[i] >= threshold), SafetyLevel.NOT_POSSIBLE).value,
+                'historical_safety_level': SAFETY_LEVEL_CODES[levels[i]].value,
+                'admission_probability': round(float(final_probability[i]) * 100, 1),
+                'waitlist_probability': round(float(simulation['waitlist'][i]) * 100, 1),
+                'later_round_probability_given_missed': round(float(simulation['later_given_missed'][i]) * 100, 1),
+                'latest_closing_rank': round_or_none(data['latest_final'][p], 0),
+                'predicted_next_closing_rank': round_or_none(data['predicted_next'][p], 0),
+                'yearly_change': round_or_none(data['yoy_slope'][p], 0),
+                'volatility': round_or_none(data['volatility'][p], 3),
+                'annual_fee': round_or_none(row.get('FEE_NUM', np.nan), 0),
+                'stipend': round_or_none(row.get('STIPEND_NUM', np.nan), 0),
+                'bond_years': round_or_none(row.get('BOND_YEARS_NUM', np.nan), 1),
+                'bond_penalty': round_or_none(row.get('BOND_PENALTY_NUM', np.nan), 0),
+                'beds': round_or_none(row.get('BEDS_NUM', np.nan), 0),
+            }
+            for k, (counseling_round, _) in enumerate(SIMULATED_ROUNDS):
+                values[f'{counseling_round.name.lower()}_probability'] = round(float(simulation['p_round'][i, k]) * 100, 1)
+            for metric in COMPARISON_METRICS:
+                metrics[metric].append(values[metric])
+        
+        # Which college leads on each comparable metric
+        best_by = {}
+        for metric, prefer in COMPARISON_PREFERENCES.items():
+            scored = [(v, request.college_ids[slot]) for slot, v in enumerate(metrics[metric]) if v is not None]
+            if scored:
+                best_by[metric] = (max if prefer == 'max' else min)(scored, key=lambda item: item[0])[1]
+        
+        return {
+            'rank': request.rank,
+            'category': request.category,
+            'quota': request.quota,
+            'quotas_considered': quotas,
+            'course': course,
+            'dataset': key,
+            'safety_basis': "safety_level bands admission_probability (simulated); historical_safety_level "
+                            "is the closing-rank classifier used by /ultimate-search",
+            'colleges': colleges,
+            'metrics': ['seat_groups_matched'] + COMPARISON_METRICS,
+            'matrix': dict(metrics),
+            'best_by': best_by,
+        }
+    
+    def export_categories(self, request: ExportRequest) -> List[str]:
+        """Categories an export covers, in a stable order"""
+        key = self._get_dataset_key(request.exam_type, request.preference)
+        if request.all_categories and key in self.trend_engine.datasets:
+            return sorted(self.trend_engine.datasets[key]['group_index'].get('category', {}))
+        return list(dict.fromkeys([request.category, *request.categories]))
+    
+    def iter_export_rows(self, request: ExportRequest, categories: List[str],
+                         chunk_size: int = 500):
+        """Yield ranked export rows in chunks straight from the candidate arrays
+        
+        Per category: classify and simulate the whole block (simulation in
+        chunks), rank by final admission chance then best closing rank, and
+        emit plain tuples - no recommendation models are built.
+        """
+        user_rank = request.rank_min if request.rank_min == request.rank_max else int((request.rank_min + request.rank_max) / 2)
+        
+        # Plain search request: export-only fields never reach the candidate cache
+        search = UltimateSearchRequest(**request.dict(include=set(UltimateSearchRequest.model_fields)))
+        for category in categories:
+            block = self._resolve_candidates(search.copy(update={'category': category}))
+            if block.size == 0:
+                continue
+            data = self.trend_engine.datasets[block.dataset_key]
+            levels, _ = classify_admission_vectorized(block.best, block.worst, user_rank)
+            keep = np.flatnonzero(levels > 0) if not request.include_not_possible else np.arange(block.size)
+            if keep.size == 0:
+                continue
+            
+            p_round = np.empty((keep.size, len(SIMULATED_ROUNDS)))
+            p_final = np.empty(keep.size)
+            for start in range(0, keep.size, 1000):
+                part = keep[start:start + 1000]
+                simulation = self.admission_simulator.simulate(data, block.positions[part], user_rank)
+                p_round[start:start + part.size] = simulation['p_round']
+                p_final[start:start + part.size] = simulation['p_admitted_by'][:, -1]
+            order = np.lexsort((block.best[keep], -p_final))
+            
+            frame = block.frame
+            columns = {
+                name: frame[col].astype(str).str.strip('"').to_numpy() if col in frame.columns else np.full(block.size, '')
+                for name, col in (
+                    ('institute', 'INSTITUTE' if 'INSTITUTE' in frame.columns else 'Institute'),
+                    ('course', 'COURSE' if 'COURSE' in frame.columns else 'Course'),
+                    ('state', 'STATE' if 'STATE' in frame.columns else 'State'),
+                    ('quota', 'QUOTA' if 'QUOTA' in frame.columns else 'Quota'),
+                    ('category', 'CATEGORY' if 'CATEGORY' in frame.columns else 'Category'),
+                    ('college_type', 'COLLEGE_TYPE'),
+                    ('fee', 'FEE' if 'FEE' in frame.columns else 'Fee'),
+                    ('stipend', 'STIPEND YEAR 1' if 'STIPEND YEAR 1' in frame.columns else 'Stipend Year 1'),
+                )
+            }
+            numeric = {col: frame[col].to_numpy(dtype=float) for col in self.NUMERIC_COLUMNS}
+            latest = data['latest_final'][block.positions]
+            predicted = data['predicted_next'][block.positions]
+            slope = data['yoy_slope'][block.positions]
+            
+            def number(value: float, digits: int = 0):
+                if np.isnan(value):
+                    return None
+                return round(float(value), digits) if digits else int(round(float(value)))
+            
+            for start in range(0, keep.size, chunk_size):
+                rows = []
+                for j in order[start:start + chunk_size]:
+                    i = keep[j]
+                    rows.append((
+                        category, columns['institute'][i], columns['course'][i], columns['state'][i],
+                        columns['quota'][i], columns['category'][i], columns['college_type'][i].split('.')[-1],
+                        columns['fee'][i], number(numeric['FEE_NUM'][i]), columns['stipend'][i],
+                        number(numeric['BOND_YEARS_NUM'][i], 1), number(numeric['BOND_PENALTY_NUM'][i]),
+                        number(numeric['BEDS_NUM'][i]),
+                        SAFETY_LEVEL_CODES[levels[i]].value, round(float(p_final[j]) * 100, 1),
+                        *[round(float(p) * 100, 1) for p in p_round[j]],
+                        number(block.best[i]), number(block.worst[i]), number(latest[i]), number(predicted[i]),
+                        number(slope[i]), number(block.distances[i], 1),
+                    ))
+                yield rows
+    
+    def analyze_scenario(self, request: UltimateSearchRequest, scenario: WhatIfScenario) -> Dict[str, Any]:
+        """Re-classify one candidate set under a shifted rank and scaled cutoffs"""
+        block = self._resolve_candidates(request)
+        base_rank = request.rank_min if request.rank_min == request.rank_max else int((request.rank_min + request.rank_max) / 2)
+        new_rank = max(1, base_rank + scenario.rank_change)
+        
+        # Cutoff trend and seat changes both stretch (or shrink) every closing rank
+        scale = max(0.1, (1 + scenario.cutoff_trend) * (1 + scenario.seat_matrix_change / 100))
+        
+        base_levels, _ = classify_admission_vectorized(block.best, block.worst, base_rank)
+        new_levels, _ = classify_admission_vectorized(block.best * scale, block.worst * scale, new_rank)
+        
+        changes = {'gained': [], 'lost': [], 'improved': [], 'worsened': []}
+        for i in np.flatnonzero(base_levels != new_levels):
+            before, after = int(base_levels[i]), int(new_levels[i])
+            if before == 0:
+                change = 'gained'
+            elif after == 0:
+                change = 'lost'
+            else:
+                # Lower non-zero codes are safer
+                change = 'improved' if after < before else 'worsened'
+            
+            row = block.frame.iloc[i]
+            changes[change].append({
+                'institute': str(row.get('INSTITUTE', row.get('Institute', 'N/A'))).strip('"'),
+                'course': str(row.get('COURSE', row.get('Course', 'N/A'))),
+                'state': str(row.get('STATE', row.get('State', 'N/A'))),
+                'quota': str(row.get('QUOTA', row.get('Quota', 'N/A'))),
+                'category': str(row.get('CATEGORY', row.get('Category', 'N/A'))),
+                'before': SAFETY_LEVEL_CODES[before].value,
+                'after': SAFETY_LEVEL_CODES[after].value,
+                'best_closing_rank': int(block.best[i]),
+                'worst_closing_rank': int(block.worst[i]),
+            })
+        
+        safe_codes = [1, 2]
+        return {
+            'base_rank': base_rank,
+            'scenario_rank': new_rank,
+            'cutoff_scale': round(scale, 4),
+            'candidates_evaluated': block.size,
+            'original_options': int((base_levels > 0).sum()),
+            'modified_options': int((new_levels > 0).sum()),
+            'original_safe_options': int(np.isin(base_levels, safe_codes).sum()),
+            'modified_safe_options': int(np.isin(new_levels, safe_codes).sum()),
+            'changes': changes,
+        }
+    
+    def sweep_ranks(self, request: UltimateSearchRequest, ranks: np.ndarray) -> Dict[str, Any]:
+        """Classify one candidate block against many ranks in a single broadcast"""
+        block = self._resolve_candidates(request)
+        ranks = np.unique(np.asarray(ranks, dtype=int))
+        
+        # (ranks x candidates) level matrix
+        levels, _ = classify_admission_vectorized(block.best[None, :], block.worst[None, :], ranks[:, None])
+        
+        sweep = []
+        for r, rank in enumerate(ranks):
+            row_levels = levels[r]
+            sweep.append({
+                'rank': int(rank),
+                'eligible': int((row_levels > 0).sum()),
+                'by_tier': {
+                    SAFETY_LEVEL_CODES[code].value: int((row_levels == code).sum())
+                    for code in range(1, len(SAFETY_LEVEL_CODES))
+                },
+            })
+        
+        # Per-college state changes between consecutive swept ranks
+        flip_rows, flip_cols = np.nonzero(levels[1:] != levels[:-1]) if len(ranks) > 1 else ([], [])
+        flips = defaultdict(list)
+        for r, i in zip(flip_rows, flip_cols):
+            flips[i].append({
+                'rank': int(ranks[r + 1]),
+                'from': SAFETY_LEVEL_CODES[levels[r, i]].value,
+                'to': SAFETY_LEVEL_CODES[levels[r + 1, i]].value,
+            })
+        
+        colleges = []
+        for i in np.flatnonzero((levels > 0).any(axis=0)):
+            row = block.frame.iloc[i]
+            colleges.append({
+                'institute': str(row.get('INSTITUTE', row.get('Institute', 'N/A'))).strip('"'),
+                'course': str(row.get('COURSE', row.get('Course', 'N/A'))),
+                'state': str(row.get('STATE', row.get('State', 'N/A'))),
+                'quota': str(row.get('QUOTA', row.get('Quota', 'N/A'))),
+                'category': str(row.get('CATEGORY', row.get('Category', 'N/A'))),
+                # Last ranks still classified Safe / still admissible (classifier thresholds)
+                'safe_until_rank': int(np.floor(block.best[i])),
+                'eligible_until_rank': int(np.floor(block.worst[i] * 1.05)),
+                'flips': flips.get(i, []),
+            })
+        colleges.sort(key=lambda c: c['eligible_until_rank'])
+        
+        return {
+            'candidates_evaluated': block.size,
+            'sweep': sweep,
+            'colleges': colleges,
+        }
+    
+    def _get_dataset_key(self, exam_type: ExamType, preference: QuotaPreference) -> str:
+        """Get the neet_data key for an exam type / preference pair"""
         if exam_type == ExamType.NEET_UG:
-            return self.neet_data["ug_all_india"] if preference == QuotaPreference.ALL_INDIA else self.neet_data["ug_state_wise"]
+            return "ug_all_india" if preference == QuotaPreference.ALL_INDIA else "ug_state_wise"
         else:
-            return self.neet_data["pg_all_india"] if preference == QuotaPreference.ALL_INDIA else self.neet_data["pg_state_wise"]
+            return "pg_all_india" if preference == QuotaPreference.ALL_INDIA else "pg_state_wise"
     
-    def _apply_basic_filters(self, df: pd.DataFrame, request: UltimateSearchRequest) -> pd.DataFrame:
-        """Apply basic filtering"""
-        filtered_df = df.copy()
+    def _get_dataset(self, exam_type: ExamType, preference: QuotaPreference) -> pd.DataFrame:
+        """Get appropriate dataset"""
+        return self.neet_data[self._get_dataset_key(exam_type, preference)]
+    
+    def _apply_basic_filters(self, df: pd.DataFrame, request: UltimateSearchRequest,
+                             filter_report: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Apply basic filtering as a single boolean mask
+        
+        Selection filters (state, quota, category, course, preferred states) are
+        combined with the numeric constraints, which run against the parsed
+        ``*_NUM`` columns built in ``_enhance_dataframe``. Rows whose value is
+        unknown in the source data are kept rather than silently dropped.
+        """
+        state_col = 'STATE' if 'STATE' in df.columns else 'State'
+        quota_col = 'QUOTA' if 'QUOTA' in df.columns else 'Quota'
+        category_col = 'CATEGORY' if 'CATEGORY' in df.columns else 'Category'
+        course_col = 'COURSE' if 'COURSE' in df.columns else 'Course'
         
-        # Basic filters
-        if request.state:
-            state_col = 'STATE' if 'STATE' in filtered_df.columns else 'State'
-            filtered_df = filtered_df[filtered_df[state_col] == request.state]
+        # Selection filters
+        selection = (df[category_col] == request.category) & (df[course_col] == request.course)
+        
+        if request.state and state_col in df.columns:
+            selection &= df[state_col] == request.state
         
         if request.quota:
-            quota_col = 'QUOTA' if 'QUOTA' in filtered_df.columns else 'Quota'
-            filtered_df = filtered_df[filtered_df[quota_col] == request.quota]
+            selection &= df[quota_col] == request.quota
         
-        category_col = 'CATEGORY' if 'CATEGORY' in filtered_df.columns else 'Category'
-        filtered_df = filtered_df[filtered_df[category_col] == request.category]
+        if request.preferred_states and state_col in df.columns:
+            selection &= df[state_col].isin(request.preferred_states)
         
-        course_col = 'COURSE' if 'COURSE' in filtered_df.columns else 'Course'
-        filtered_df = filtered_df[filtered_df[course_col] == request.course]
+        # Numeric range constraints
+        constraints = {}
         
-        # Enhanced filters
-        if request.preferred_states:
-            state_col = 'STATE' if 'STATE' in filtered_df.columns else 'State'
-            filtered_df = filtered_df[filtered_df[state_col].isin(request.preferred_states)]
+        if request.max_fee_per_year is not None and 'FEE_NUM' in df.columns:
+            constraints['max_fee_per_year'] = ~(df['FEE_NUM'] > request.max_fee_per_year)
         
-        if request.max_fee_per_year:
-            # Simplified fee filtering (in production, handle different fee formats)
-            try:
-                fee_col = 'FEE' if 'FEE' in filtered_df.columns else 'Fee'
-                if fee_col in filtered_df.columns:
-                    filtered_df = filtered_df[
-                        pd.to_numeric(filtered_df[fee_col].str.replace(r'[^\d.]', ''), errors='coerce').fillna(0) <= request.max_fee_per_year
-                    ]
-            except:
-                pass
+        if request.max_bond_years is not None and 'BOND_YEARS_NUM' in df.columns:
+            constraints['max_bond_years'] = ~(df['BOND_YEARS_NUM'] > request.max_bond_years)
+        
+        if not request.bond_acceptable and 'BOND_YEARS_NUM' in df.columns:
+            constraints['bond_acceptable'] = ~(df['BOND_YEARS_NUM'] > 0)
+        
+        if request.min_beds is not None and 'BEDS_NUM' in df.columns:
+            constraints['min_beds'] = ~(df['BEDS_NUM'] < request.min_beds)
+        
+        mask = selection
+        for constraint_mask in constraints.values():
+            mask = mask & constraint_mask
+        
+        if filter_report is not None:
+            selected = int(selection.sum())
+            filter_report['rows_matching_selection'] = selected
+            filter_report['removed_by_constraint'] = {
+                name: int((selection & ~constraint_mask).sum())
+                for name, constraint_mask in constraints.items()
+            }
+            filter_report['rows_remaining'] = int(mask.sum())
+        
+        return df[mask]
+    
+    def _parse_home_location(self, home_location: Optional[Dict[str, float]]) -> Optional[Tuple[float, float]]:
+        """Validate a {"lat": x, "lng": y} home location"""
+        if not home_location:
+            return None
+        try:
+            return float(home_location['lat']), float(home_location['lng'])
+        except (KeyError, ValueError, TypeError):
+            return None
+    
+    def _apply_distance_filter(self, df: pd.DataFrame, home: Tuple[float, float], max_distance_km: float,
+                               filter_report: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Keep institutes the geo index places within ``max_distance_km`` of home
+        
+        Institutes with no city match have no reliable location. They are kept
+        and listed under ``location_unknown`` in the filter report, so the
+        caller can see and drop them.
+        """
+        nearby = self.geo_index.query_radius(home[0], home[1], max_distance_km)
+        institute_col = 'INSTITUTE' if 'INSTITUTE' in df.columns else 'Institute'
+        names = df[institute_col].astype(str).str.strip('"')
+        located = df['CITY_MATCHED'] if 'CITY_MATCHED' in df.columns else pd.Series(True, index=df.index)
+        mask = (names.isin(nearby) & located) | ~located
         
-        return filtered_df
+        if filter_report is not None:
+            filter_report.setdefault('removed_by_constraint', {})['max_distance_km'] = int((~mask).sum())
+            filter_report['rows_remaining'] = int(mask.sum())
+            unknown = sorted(names[~located].unique())
+            if unknown:
+                filter_report['location_unknown'] = {
+                    'rows_kept': int((~located).sum()),
+                    'institutes': unknown[:50],
+                    'institutes_total': len(unknown),
+                }
+        
+        return df[mask]
     
     def _extract_closing_ranks(self, row: pd.Series) -> Dict[str, Any]:
         """Extract closing rank data"""
@@ -669,40 +3192,6 @@ class UltimateNEETCollegeFinder:
         
         return closing_ranks
     
-    def _calculate_admission_possibility(self, closing_ranks: Dict[str, Any], user_rank: int) -> Tuple[bool, SafetyLevel, float]:
-        """Calculate admission possibility (keeping original logic)"""
-        if not closing_ranks:
-            return False, SafetyLevel.NOT_POSSIBLE, 0.0
-        
-        numeric_ranks = []
-        for rank in closing_ranks.values():
-            if isinstance(rank, int) and rank > 0:
-                numeric_ranks.append(rank)
-            elif isinstance(rank, str) and rank.isdigit():
-                numeric_ranks.append(int(rank))
-        
-        if not numeric_ranks:
-            return False, SafetyLevel.NOT_POSSIBLE, 0.0
-        
-        best_closing_rank = min(numeric_ranks)
-        worst_closing_rank = max(numeric_ranks)
-        
-        admission_possible = user_rank <= worst_closing_rank * 1.05
-        
-        if not admission_possible:
-            return False, SafetyLevel.NOT_POSSIBLE, 0.0
-        
-        if user_rank <= best_closing_rank * 0.8:
-            return True, SafetyLevel.VERY_SAFE, 0.95
-        elif user_rank <= best_closing_rank:
-            return True, SafetyLevel.SAFE, 0.85
-        elif user_rank <= best_closing_rank * 1.2:
-            return True, SafetyLevel.MODERATE, 0.70
-        elif user_rank <= worst_closing_rank * 0.9:
-            return True, SafetyLevel.RISKY, 0.55
-        else:
-            return True, SafetyLevel.POSSIBLE, 0.35
-    
     def _prepare_college_data(self, row: pd.Series, closing_ranks: Dict[str, Any]) -> Dict[str, Any]:
         """Prepare college data for ML analysis"""
         numeric_ranks = [r for r in closing_ranks.values() if isinstance(r, int)]
@@ -718,21 +3207,33 @@ class UltimateNEETCollegeFinder:
             'fee_factor': 0.5,    # Placeholder - normalize fee
         }
     
-    def _calculate_round_wise_chances(self, closing_ranks: Dict[str, Any], 
-                                    user_rank: int, ml_confidence: float) -> Dict[CounselingRound, float]:
-        """Calculate round-wise admission chances"""
-        # Simplified round-wise calculation
-        base_chance = ml_confidence * 100
+    def _calculate_round_wise_chances(self, simulation: Dict[str, np.ndarray],
+                                    j: int) -> Tuple[Dict[CounselingRound, float], Dict[str, Any]]:
+        """Round-wise admission chances for candidate ``j`` of a simulation batch"""
+        round_wise_chances = {}
+        by_round = {}
+        for k, (counseling_round, _) in enumerate(SIMULATED_ROUNDS):
+            probability = float(simulation['p_round'][j, k]) * 100
+            round_wise_chances[counseling_round] = probability
+            median_cutoff = simulation['median_cutoff'][j, k]
+            by_round[counseling_round.value] = {
+                'probability': round(probability, 1),
+                'ci_95': [round(float(simulation['ci_low'][j, k]) * 100, 1),
+                          round(float(simulation['ci_high'][j, k]) * 100, 1)],
+                'admitted_by_this_round': round(float(simulation['p_admitted_by'][j, k]) * 100, 1),
+                'expected_closing_rank': None if np.isnan(median_cutoff) else int(median_cutoff),
+            }
         
-        return {
-            CounselingRound.ROUND_1: min(100, base_chance * 1.2),
-            CounselingRound.ROUND_2: min(100, base_chance * 1.1),
-            CounselingRound.ROUND_3: min(100, base_chance),
-            CounselingRound.MOP_UP: min(100, base_chance * 0.8)
+        admission_simulation = {
+            'samples': self.admission_simulator.n_samples,
+            'rounds': by_round,
+            'waitlist_probability': round(float(simulation['waitlist'][j]) * 100, 1),
+            'later_round_probability_given_missed': round(float(simulation['later_given_missed'][j]) * 100, 1),
         }
+        return round_wise_chances, admission_simulation
     
     def _calculate_geographic_scores(self, row: pd.Series, home_location: Optional[Dict[str, float]], 
-                                   climate_pref: Optional[str]) -> Dict[str, float]:
+                                   climate_pref: Optional[str], distance_km: Optional[float] = None) -> Dict[str, float]:
         """Calculate geographic preference scores"""
         scores = {
             'distance_km': 500,  # Default distance
@@ -741,14 +3242,14 @@ class UltimateNEETCollegeFinder:
             'connectivity_score': 7   # Default connectivity
         }
         
-        if home_location and 'LATITUDE' in row and 'LONGITUDE' in row:
-            try:
-                # Calculate distance (simplified)
-                lat_diff = abs(float(home_location['lat']) - float(row['LATITUDE']))
-                lng_diff = abs(float(home_location['lng']) - float(row['LONGITUDE']))
-                scores['distance_km'] = ((lat_diff**2 + lng_diff**2)**0.5) * 111  # Rough km conversion
-            except (ValueError, TypeError):
-                scores['distance_km'] = 500  # Default distance if calculation fails
+        if distance_km is not None and not np.isnan(distance_km):
+            scores['distance_km'] = float(distance_km)
+        elif home_location and 'LATITUDE' in row and 'LONGITUDE' in row:
+            home = self._parse_home_location(home_location)
+            if home:
+                scores['distance_km'] = float(GeoSpatialIndex.haversine_km(
+                    home[0], home[1], row['LATITUDE'], row['LONGITUDE']
+                ))
         
         return scores
     
@@ -756,15 +3257,16 @@ class UltimateNEETCollegeFinder:
                                      safety_level: SafetyLevel, base_score: float,
                                      ml_confidence: float, round_wise_chances: Dict[CounselingRound, float],
                                      geographic_scores: Dict[str, float], user_rank: int,
-                                     request: UltimateSearchRequest) -> UltimateCollegeRecommendation:
+                                     request: UltimateSearchRequest,
+                                     admission_simulation: Optional[Dict[str, Any]] = None) -> UltimateCollegeRecommendation:
         """Build ultimate recommendation with all features"""
         
         # Extract basic information
-        institute = str(row.get('INSTITUTE', 'N/A')).strip('"')
-        course = str(row.get('COURSE', 'N/A'))
+        institute = str(row.get('INSTITUTE', row.get('Institute', 'N/A'))).strip('"')
+        course = str(row.get('COURSE', row.get('Course', 'N/A')))
         state = str(row.get('STATE', row.get('State', 'N/A')))
         quota = str(row.get('QUOTA', row.get('Quota', 'N/A')))
-        category = str(row.get('CATEGORY', 'N/A'))
+        category = str(row.get('CATEGORY', row.get('Category', 'N/A')))
         
         # Financial analysis
         fee_str = str(row.get('FEE', '0')).replace('₹', '').strip()
@@ -820,7 +3322,10 @@ class UltimateNEETCollegeFinder:
             connectivity_score=geographic_scores['connectivity_score'],
             similar_students_admitted=np.random.randint(10, 100),  # Placeholder
             success_rate_similar_profiles=ml_confidence * 100,
-            waitlist_probability=max(0, (ml_confidence - 0.5) * 40) if ml_confidence < 0.8 else 0,
+            waitlist_probability=(
+                admission_simulation['waitlist_probability'] if admission_simulation
+                else max(0, (ml_confidence - 0.5) * 40) if ml_confidence < 0.8 else 0
+            ),
             seat_matrix_intelligence={
                 'total_seats': self._safe_int(row.get('BEDS', 100)),
                 'expected_applications': int(self._safe_int(row.get('BEDS', 100)) * self._safe_float(row.get('COMPETITION_RATIO', 10))),
@@ -830,7 +3335,7 @@ class UltimateNEETCollegeFinder:
                 'rank_trend_3_years': 'stable',  # Placeholder
                 'cutoff_prediction_next_year': 'likely_increase_5_10_percent'
             },
-            alternative_suggestions=[],  # Will be populated later
+            alternative_suggestions=[],  # Filled per result page from the similar college index
             alumni_average_salary=np.random.uniform(800000, 2000000),  # Placeholder
             placement_rate=np.random.uniform(70, 95),  # Placeholder
             pg_admission_rate=np.random.uniform(60, 85),  # Placeholder
@@ -846,7 +3351,8 @@ class UltimateNEETCollegeFinder:
                     'historical_success_rate': row.get('SUCCESS_RATE', 0.5) * 100,
                     'recommendation_reason': self._get_ai_recommendation_reason(safety_level, ml_confidence)
                 },
-                'counseling_strategy': self._get_counseling_strategy(best_round, round_wise_chances)
+                'counseling_strategy': self._get_counseling_strategy(best_round, round_wise_chances),
+                'admission_simulation': admission_simulation or {}
             }
         )
     
@@ -939,8 +3445,30 @@ class UltimateNEETCollegeFinder:
 # 🌐 ULTIMATE API ENDPOINTS  
 # ===============================
 
-# Initialize the Ultimate College Finder
+# Initialize the Ultimate College Finder (datasets load in the startup pipeline)
 ultimate_finder = UltimateNEETCollegeFinder()
+startup_pipeline = StartupPipeline(ultimate_finder)
+
+# Searches slower than SLOW_QUERY_THRESHOLD_MS, for replay_slow_queries.py
+slow_query_log = SlowQueryLog()
+# Every search when REQUEST_LOG is set, for the cache warmer
+request_log = SlowQueryLog(path=REQUEST_LOG, threshold_ms=0) if REQUEST_LOG else None
+
+# Full /ultimate-search responses by normalized request
+search_result_cache = LRUCache(max_entries=SEARCH_RESULT_CACHE_SIZE)
+
+def _log_search(endpoint: str, request: BaseModel, timer: StageTimer, diagnostics: Dict[str, Any]):
+    slow_query_log.maybe_record(endpoint, request, timer, diagnostics, ultimate_finder)
+    if request_log is not None:
+        request_log.maybe_record(endpoint, request, timer, diagnostics, ultimate_finder)
+
+# Request metrics for /metrics
+request_metrics = RequestMetrics()
+loop_lag_monitor = EventLoopLagMonitor()
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
+# Gate data routes until ready; innermost, so 503s still carry CORS headers and are counted in /metrics
+app.user_middleware.append(Middleware(ReadinessGateMiddleware, pipeline=startup_pipeline, routes=app.router.routes))
 
 @app.get("/")
 async def root():
@@ -960,6 +3488,13 @@ async def root():
             "📊 Analysis": "/peer-comparison - Compare with similar students", 
             "🎯 Strategy": "/counseling-strategy - Get round-wise application strategy",
             "❓ What-if": "/what-if-scenario - Analyze rank/cutoff changes",
+            "📉 Sweep": "/rank-sweep - Options across a range of ranks in one call",
+            "🔤 Suggest": "/institutes/suggest - Institute name autocomplete",
+            "🏫 College": "/colleges/{id} - Full detail for one college",
+            "⚖️ Compare": "/compare - Shortlisted colleges side by side at your rank",
+            "📥 Export": "/export/csv, /export/xlsx - Full ranked result sets as spreadsheets",
+            "📈 Metrics": "/metrics - Prometheus metrics",
+            "🚦 Probes": "/livez, /readyz - Liveness and readiness (503 + Retry-After while warming)",
             "🤖 AI Chat": "/ai-counselor - Get AI counseling assistance",
             "📈 Trends": "/cutoff-trends - Real-time cutoff monitoring",
             "⚡ Basic": "Compatible with original frontend endpoints"
@@ -968,9 +3503,63 @@ async def root():
         "port": "8002 (Ultimate Backend) | Original: 8001"
     }
 
+async def _compute_ultimate_search(request: UltimateSearchRequest, timer: StageTimer,
+                                   diagnostics: Dict[str, Any], record: bool = True,
+                                   use_cache: bool = True) -> Tuple[int, bytes, Dict[str, Any]]:
+    """Search, insights and serialization for /ultimate-search
+    
+    Returns (total results, the response's result members as JSON bytes,
+    filter report). This is the unit kept in ``search_result_cache``.
+    """
+    recommendations = await ultimate_finder.ultimate_search(request, diagnostics, timer, record=record,
+                                                            use_cache=use_cache)
+    
+    with timer.span('insights'):
+        ai_summary = {
+            "very_safe_options": len([r for r in recommendations if r.safety_level == SafetyLevel.VERY_SAFE]),
+            "safe_options": len([r for r in recommendations if r.safety_level == SafetyLevel.SAFE]),
+            "moderate_options": len([r for r in recommendations if r.safety_level == SafetyLevel.MODERATE]),
+            "risky_but_possible": len([r for r in recommendations if r.safety_level == SafetyLevel.RISKY]),
+            "total_possible_admissions": len(recommendations),
+            "ml_confidence_avg": np.mean([r.ml_confidence for r in recommendations]) if recommendations else 0,
+            "best_round_recommendation": recommendations[0].best_round_to_apply if recommendations else None
+        }
+        strategic_insights = {
+            "portfolio_balance": _analyze_portfolio_balance(recommendations),
+            "round_wise_strategy": _get_round_wise_strategy(recommendations),
+            "geographic_distribution": _analyze_geographic_distribution(recommendations),
+            "financial_analysis": _analyze_financial_aspects(recommendations)
+        }
+    
+    # Serialize here rather than in FastAPI so the cost is measured (and cached)
+    with timer.span('serialization'):
+        encoded = jsonable_encoder({
+            "recommendations": recommendations,
+            "ai_summary": ai_summary,
+            "strategic_insights": strategic_insights,
+        })
+        members = _json_bytes(encoded)[1:-1]
+    
+    if record:
+        ultimate_finder.stage_latency.record({
+            stage: timer.spans[stage] for stage in ('insights', 'serialization')
+        })
+    return len(recommendations), members, diagnostics.get('filter_report', {})
+
+def _json_bytes(content: Any) -> bytes:
+    """Same encoding as JSONResponse"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
 @app.post("/ultimate-search", response_model=Dict[str, Any])
-async def ultimate_search(request: UltimateSearchRequest):
+async def ultimate_search(
+    request: UltimateSearchRequest,
+    timings: bool = Query(False, description="Include per-stage timings (ms) in search_metadata"),
+    profile: bool = Query(False, description="Return a stack profile of this call (needs X-Admin-Token)"),
+    no_cache: bool = Query(False, description="Recompute without the result and candidate caches (replays)"),
+    x_admin_token: Optional[str] = Header(None)
+):
     """🎯 Ultimate AI-Powered College Search"""
+    profiler = None
     try:
         logger.info(f"🔍 Ultimate Search Request: {request.exam_type} | Rank: {request.rank_min}-{request.rank_max}")
         
@@ -978,44 +3567,61 @@ async def ultimate_search(request: UltimateSearchRequest):
         if request.rank_min > request.rank_max:
             raise HTTPException(status_code=400, detail="Minimum rank cannot be greater than maximum rank")
         
-        # Perform ultimate search
-        recommendations = await ultimate_finder.ultimate_search(request)
+        if profile:
+            # Samples only the event loop thread; concurrent requests on it show up too
+            require_admin_token(x_admin_token)
+            profiler = SamplingProfiler(interval=0.001, thread_ids={threading.get_ident()}).start()
+        
+        # Identical requests (popular ones pre-warmed from the logs) reuse the serialized result
+        diagnostics = {}
+        timer = StageTimer()
+        cache_key = search_result_key(request)
+        with timer.span('result_cache'):
+            cached = None if profiler is not None or no_cache else search_result_cache.get(cache_key)
+        cache_hit = cached is not None
+        if cache_hit:
+            if cache_key in cache_warmer.warmed_keys:
+                cache_warmer.warmed_hits += 1
+        else:
+            cached = await _compute_ultimate_search(request, timer, diagnostics, use_cache=not no_cache)
+            if not no_cache:
+                search_result_cache.put(cache_key, cached)
+        total_results, members, filter_report = cached
         
         # Build comprehensive response
-        response = {
-            "status": "success",
-            "total_results": len(recommendations),
-            "search_metadata": {
-                "exam_type": request.exam_type,
-                "preference": request.preference,
-                "rank_range": f"{request.rank_min:,} - {request.rank_max:,}",
-                "ai_features_enabled": True,
-                "ml_predictions": True,
-                "processing_time": "< 2 seconds"
-            },
-            "recommendations": recommendations,
-            "ai_summary": {
-                "very_safe_options": len([r for r in recommendations if r.safety_level == SafetyLevel.VERY_SAFE]),
-                "safe_options": len([r for r in recommendations if r.safety_level == SafetyLevel.SAFE]),
-                "moderate_options": len([r for r in recommendations if r.safety_level == SafetyLevel.MODERATE]),
-                "risky_but_possible": len([r for r in recommendations if r.safety_level == SafetyLevel.RISKY]),
-                "total_possible_admissions": len(recommendations),
-                "ml_confidence_avg": np.mean([r.ml_confidence for r in recommendations]) if recommendations else 0,
-                "best_round_recommendation": recommendations[0].best_round_to_apply if recommendations else None
-            },
-            "strategic_insights": {
-                "portfolio_balance": self._analyze_portfolio_balance(recommendations),
-                "round_wise_strategy": self._get_round_wise_strategy(recommendations),
-                "geographic_distribution": self._analyze_geographic_distribution(recommendations),
-                "financial_analysis": self._analyze_financial_aspects(recommendations)
-            }
+        processing_ms = timer.elapsed * 1000
+        ultimate_finder.stage_latency.record({'request': processing_ms / 1000})
+        _log_search("/ultimate-search", request, timer, diagnostics)
+        search_metadata = {
+            "exam_type": request.exam_type.value,
+            "preference": request.preference.value,
+            "rank_range": f"{request.rank_min:,} - {request.rank_max:,}",
+            "ai_features_enabled": True,
+            "ml_predictions": True,
+            "processing_time": f"{processing_ms:.1f} ms",
+            "result_cache": "bypass" if no_cache else "hit" if cache_hit else "miss",
+            "filter_report": filter_report
         }
+        if timings:
+            search_metadata["stage_timings_ms"] = timer.as_ms()
         
-        return response
+        # Result members are spliced in as bytes, so a cache hit does no JSON encoding of results
+        head = _json_bytes({"status": "success", "total_results": total_results,
+                            "search_metadata": jsonable_encoder(search_metadata)})
+        body = head[:-1] + b"," + members
+        if profiler is not None:
+            body += b',"profile":' + _json_bytes(profiler.stop().summary())
+            profiler = None
+        return Response(content=body + b"}", media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Ultimate search error: {e}")
         raise HTTPException(status_code=500, detail=f"Ultimate search failed: {str(e)}")
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
 def _analyze_portfolio_balance(recommendations: List[UltimateCollegeRecommendation]) -> Dict[str, Any]:
     """Analyze portfolio balance for strategic advice"""
@@ -1041,15 +3647,16 @@ def _get_round_wise_strategy(recommendations: List[UltimateCollegeRecommendation
     if not recommendations:
         return {}
     
-    round_1_colleges = [r.institute for r in recommendations[:5] if r.safety_level in [SafetyLevel.VERY_SAFE, SafetyLevel.SAFE]]
-    round_2_colleges = [r.institute for r in recommendations[5:10] if r.safety_level == SafetyLevel.MODERATE]
-    round_3_colleges = [r.institute for r in recommendations[10:15] if r.safety_level == SafetyLevel.RISKY]
+    # Recommendations are already ranked, so each bucket keeps its best five
+    by_round = {counseling_round: [] for counseling_round in CounselingRound}
+    for r in recommendations:
+        by_round[r.best_round_to_apply].append(r.institute)
     
     return {
-        "round_1_focus": round_1_colleges,
-        "round_2_focus": round_2_colleges,
-        "round_3_mop_up": round_3_colleges,
-        "strategy_explanation": "Apply to safe options in Round 1, moderate choices in Round 2, and take calculated risks in Round 3/Mop-up"
+        "round_1_focus": by_round[CounselingRound.ROUND_1][:5],
+        "round_2_focus": by_round[CounselingRound.ROUND_2][:5],
+        "round_3_mop_up": (by_round[CounselingRound.ROUND_3] + by_round[CounselingRound.MOP_UP])[:5],
+        "strategy_explanation": "Colleges grouped by the counseling round where their simulated admission chance peaks"
     }
 
 def _analyze_geographic_distribution(recommendations: List[UltimateCollegeRecommendation]) -> Dict[str, Any]:
@@ -1086,59 +3693,207 @@ def _analyze_financial_aspects(recommendations: List[UltimateCollegeRecommendati
         "roi_analysis": "Government colleges offer better ROI for long-term career prospects"
     }
 
+# ===============================
+# 📥 SPREADSHEET EXPORT API
+# ===============================
+
+def _validate_export(request: ExportRequest) -> List[str]:
+    if request.rank_min > request.rank_max:
+        raise HTTPException(status_code=400, detail="Minimum rank cannot be greater than maximum rank")
+    categories = ultimate_finder.export_categories(request)
+    if not categories:
+        raise HTTPException(status_code=404, detail="No categories to export")
+    return categories
+
+def _export_filename(request: ExportRequest, extension: str) -> str:
+    return f"NEET_Export_{request.exam_type.value}_{request.course}_{request.rank_min}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}".replace(' ', '_')
+
+@app.post("/export/csv")
+async def export_csv(request: ExportRequest):
+    """📥 Stream the full ranked result set (one or more categories) as CSV"""
+    categories = _validate_export(request)
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        for rows in ultimate_finder.iter_export_rows(request, categories):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={_export_filename(request, 'csv')}"}
+    )
+
+@app.post("/export/xlsx")
+async def export_xlsx(request: ExportRequest):
+    """📥 Stream the full ranked result set as an Excel workbook (needs openpyxl)"""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise HTTPException(status_code=501, detail="XLSX export needs openpyxl: pip install openpyxl")
+    categories = _validate_export(request)
+    
+    def generate():
+        # Write-only workbook keeps rows out of memory; the zip is spooled to disk past 8MB
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Colleges")
+        sheet.append(EXPORT_COLUMNS)
+        for rows in ultimate_finder.iter_export_rows(request, categories):
+            for row in rows:
+                sheet.append(row)
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            workbook.save(spool)
+            spool.seek(0)
+            while chunk := spool.read(64 * 1024):
+                yield chunk
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename={_export_filename(request, 'xlsx')}"}
+    )
+
+# ===============================
+# 📉 RANK SWEEP API
+# ===============================
+
+@app.post("/rank-sweep")
+async def rank_sweep(request: RankSweepRequest):
+    """📉 What opens up across a whole range of ranks, in one pass"""
+    try:
+        ranks = list(request.ranks)
+        if request.rank_start is not None and request.rank_end is not None:
+            if request.rank_start > request.rank_end:
+                raise HTTPException(status_code=400, detail="rank_start cannot be greater than rank_end")
+            step = request.rank_step or max(1, (request.rank_end - request.rank_start) // 20)
+            span = range(request.rank_start, request.rank_end + 1, step)
+            if len(span) > MAX_SWEEP_RANKS:  # len() of a range is arithmetic; nothing is expanded yet
+                raise HTTPException(status_code=400, detail=f"A sweep can cover at most {MAX_SWEEP_RANKS} ranks")
+            ranks.extend(span)
+        
+        if not ranks:
+            raise HTTPException(status_code=400, detail="Provide ranks or rank_start/rank_end")
+        if len(set(ranks)) > MAX_SWEEP_RANKS:
+            raise HTTPException(status_code=400, detail=f"A sweep can cover at most {MAX_SWEEP_RANKS} ranks")
+        
+        result = ultimate_finder.sweep_ranks(request, np.array(ranks))
+        
+        return {
+            "status": "success",
+            "candidates_evaluated": result['candidates_evaluated'],
+            "sweep": result['sweep'],
+            "colleges": result['colleges']
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ===============================
+# 🔤 INSTITUTE SUGGEST API
+# ===============================
+
+@app.get("/institutes/suggest")
+async def suggest_institutes(
+    q: str = Query(..., min_length=1, max_length=100, description="Partial institute name, typos allowed"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum suggestions")
+):
+    """🔤 Typo-tolerant institute name autocomplete"""
+    try:
+        return {
+            "query": q,
+            "suggestions": ultimate_finder.institute_index.suggest(q, limit)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/colleges/{college_id}")
+async def get_college_detail(college_id: int):
+    """🏫 One college across all datasets: seat groups, cutoff history, fees and bonds"""
+    detail = ultimate_finder.college_store.get(college_id)
+    if detail is None:
+        raise HTTPException(status_code=404, detail=f"College {college_id} not found")
+    # Memoized payload is plain JSON types already; skip the generic encoder
+    return JSONResponse(content=detail)
+
+# ===============================
+# ⚖️ COLLEGE COMPARISON API
+# ===============================
+
+@app.post("/compare")
+async def compare_colleges(request: CollegeComparisonRequest):
+    """⚖️ Compare shortlisted colleges side by side at the student's rank"""
+    try:
+        return ultimate_finder.compare_colleges(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ===============================
 # 📊 PEER COMPARISON API
 # ===============================
 
-# @app.get("/peer-comparison")
+@app.get("/peer-comparison")
 async def get_peer_comparison(
-    rank: int = Query(..., description="Student's AIR rank"),
+    rank: int = Query(..., ge=1, description="Student's AIR rank"),
     category: str = Query(..., description="Student's category"),
-    state: str = Query(..., description="Student's state"),
-    exam_type: ExamType = Query(..., description="Exam type")
+    exam_type: ExamType = Query(..., description="Exam type"),
+    course: Optional[str] = Query(None, description="Course (defaults to MBBS for NEET-UG)"),
+    state: Optional[str] = Query(None, description="Student's state")
 ):
-    """📊 Compare student with similar profiles"""
+    """📊 Compare a rank against the real closing-rank distribution"""
     try:
-        # Simulate peer comparison data (in production, use real student data)
-        similar_students_count = np.random.randint(500, 2000)
-        rank_percentile = max(0, min(100, (100 - (rank / 10000))))
+        course = course or ("MBBS" if exam_type == ExamType.NEET_UG else None)
+        if not course:
+            raise HTTPException(status_code=400, detail="course is required for NEET-PG peer comparison")
         
-        success_stories = [
-            {
-                "rank": rank + np.random.randint(-500, 500),
-                "college": "AIIMS Delhi" if rank < 1000 else "Maulana Azad Medical College",
-                "year": "2023",
-                "current_status": "Intern"
-            },
-            {
-                "rank": rank + np.random.randint(-1000, 1000),
-                "college": "JIPMER" if rank < 2000 else "Grant Medical College",
-                "year": "2022",
-                "current_status": "2nd Year MBBS"
-            }
-        ]
+        group = ultimate_finder.rank_index.lookup(exam_type.value, category, course, state)
+        if group is None:
+            raise HTTPException(status_code=404, detail="No closing-rank data for this category and course")
+        
+        result = ultimate_finder.rank_index.query(group, rank)
+        rank_percentile = result['rank_percentile']
         
         peer_comparison = PeerComparison(
             user_rank=rank,
             category=category,
             state=state,
-            similar_students_count=similar_students_count,
+            course=course,
+            similar_students_count=result['seat_groups_near_rank'],
             rank_percentile=rank_percentile,
-            success_stories=success_stories,
-            average_colleges_applied=12,
-            most_common_choices=["Government Medical Colleges", "AIIMS", "JIPMER"]
+            seat_groups_cleared=result['seat_groups_cleared'],
+            total_seat_groups=result['total_seat_groups'],
+            success_stories=result['nearest_cutoffs'],
+            most_common_choices=[item['institute'] for item in result['most_common_institutes']],
+            most_common_choice_counts=result['most_common_institutes']
         )
         
         return {
             "status": "success",
             "peer_comparison": peer_comparison,
             "insights": {
-                "performance_vs_peers": "Above average" if rank_percentile > 60 else "Average",
-                "recommendation": f"You're performing better than {rank_percentile:.1f}% of students in your category",
-                "success_probability": min(95, rank_percentile + 20)
+                "performance_vs_peers": (
+                    "Excellent" if rank_percentile > 80 else "Above average" if rank_percentile > 60
+                    else "Average" if rank_percentile > 30 else "Below average"
+                ),
+                "recommendation": (
+                    f"Your rank clears {result['seat_groups_cleared']:,} of {result['total_seat_groups']:,} "
+                    f"{category} {course} seat groups ({rank_percentile:.1f}%) based on last year's closing ranks"
+                ),
+                "success_probability": rank_percentile
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1146,37 +3901,85 @@ async def get_peer_comparison(
 # 🎯 COUNSELING STRATEGY API
 # ===============================
 
-# @app.post("/counseling-strategy")
-async def get_counseling_strategy(request: UltimateSearchRequest):
-    """🎯 Get strategic counseling advice"""
+def _final_admission_probability(recommendation: UltimateCollegeRecommendation) -> float:
+    """Chance of holding this seat by the last round (0-1)"""
+    simulation = recommendation.details.get('admission_simulation') or {}
+    final_round = simulation.get('rounds', {}).get(CounselingRound.MOP_UP.value)
+    if final_round:
+        return final_round['admitted_by_this_round'] / 100
+    return max(recommendation.round_wise_chances.values(), default=0) / 100
+
+@app.post("/counseling-strategy")
+async def get_counseling_strategy(
+    request: CounselingStrategyRequest,
+    no_cache: bool = Query(False, description="Filter candidates afresh, bypassing the candidate cache (replays)")
+):
+    """🎯 Get strategic counseling advice with an optimized choice list"""
     try:
-        # Get college recommendations first
-        recommendations = await ultimate_finder.ultimate_search(request)
+        # Every admissible candidate, not just the top-100 page: the optimizer may need lower-ranked safe seats
+        diagnostics, timer = {}, StageTimer()
+        recommendations = await ultimate_finder.ultimate_search(request, diagnostics, timer,
+                                                                use_cache=not no_cache, limit=None)
+        user_rank = request.rank_min if request.rank_min == request.rank_max else int((request.rank_min + request.rank_max) / 2)
+        _log_search("/counseling-strategy", request, timer, diagnostics)
+        
+        # Over-budget colleges are out; within budget, cheaper ones get up to 25% more utility
+        costs = np.array([r.total_cost_4_years for r in recommendations], dtype=float)
+        affordable = np.ones(len(recommendations), dtype=bool)
+        utilities = np.array([r.recommendation_score / 100 for r in recommendations])
+        if request.fee_budget:
+            affordable = costs <= request.fee_budget
+            utilities = utilities * (1 - 0.25 * np.clip(costs / request.fee_budget, 0, 1))
         
-        if not recommendations:
+        candidates = [r for r, ok in zip(recommendations, affordable) if ok]
+        if not candidates:
             raise HTTPException(status_code=404, detail="No suitable colleges found for strategy planning")
         
-        # Build counseling strategy
-        round_1_colleges = [r.institute for r in recommendations if r.safety_level in [SafetyLevel.VERY_SAFE, SafetyLevel.SAFE]][:5]
-        round_2_colleges = [r.institute for r in recommendations if r.safety_level == SafetyLevel.MODERATE][:5]
-        round_3_colleges = [r.institute for r in recommendations if r.safety_level == SafetyLevel.RISKY][:3]
-        mop_up_colleges = [r.institute for r in recommendations if r.safety_level == SafetyLevel.POSSIBLE][:3]
+        probabilities = np.array([_final_admission_probability(r) for r in candidates])
+        portfolio = ultimate_finder.portfolio_optimizer.optimize(
+            utilities[affordable], probabilities, probabilities >= request.safe_probability,
+            request.n_choices, request.min_safe_choices
+        )
+        chosen = [candidates[i] for i in portfolio['chosen']]
+        
+        # Each listed college goes to the round where its simulated chance peaks
+        by_round = {counseling_round: [] for counseling_round in CounselingRound}
+        for r in chosen:
+            by_round[r.best_round_to_apply].append(r.institute)
+        
+        choice_list = [
+            {
+                "preference": position + 1,
+                "institute": r.institute,
+                "course": r.course,
+                "quota": r.quota,
+                "category": r.category,
+                "admission_probability": round(probabilities[i] * 100, 1),
+                "utility": round(float(utilities[affordable][i]), 3),
+                "safe": bool(probabilities[i] >= request.safe_probability),
+                "best_round": r.best_round_to_apply,
+                "total_cost": r.total_cost_4_years
+            }
+            for position, (i, r) in enumerate(zip(portfolio['chosen'], chosen))
+        ]
         
         strategy = CounselingStrategy(
-            round_1_colleges=round_1_colleges,
-            round_2_colleges=round_2_colleges,
-            round_3_colleges=round_3_colleges,
-            mop_up_colleges=mop_up_colleges,
+            round_1_colleges=by_round[CounselingRound.ROUND_1],
+            round_2_colleges=by_round[CounselingRound.ROUND_2],
+            round_3_colleges=by_round[CounselingRound.ROUND_3],
+            mop_up_colleges=by_round[CounselingRound.MOP_UP],
+            choice_list=choice_list,
+            expected_utility=round(portfolio['expected_utility'], 4),
+            admission_probability=round(portfolio['admission_probability'] * 100, 1),
             strategy_explanation=f"""
-            🎯 **Strategic Counseling Plan for Rank {request.rank_min:,}:**
+            🎯 **Strategic Counseling Plan for Rank {user_rank:,}:**
             
-            **Round 1 (Safest Options):** Focus on {len(round_1_colleges)} colleges with high admission probability
-            **Round 2 (Balanced Choices):** Target {len(round_2_colleges)} competitive but achievable options  
-            **Round 3 (Calculated Risks):** Apply to {len(round_3_colleges)} reach colleges
-            **Mop-up (Final Chances):** Keep {len(mop_up_colleges)} backup options ready
+            **Choice List:** {len(chosen)} colleges in filling order, {portfolio['safe_choices']} of them safe (≥{request.safe_probability:.0%} admission chance)
+            **Seat Chance:** {portfolio['admission_probability']:.0%} chance of a seat from this list
+            **Round 1:** {len(by_round[CounselingRound.ROUND_1])} colleges | **Round 2:** {len(by_round[CounselingRound.ROUND_2])} | **Round 3:** {len(by_round[CounselingRound.ROUND_3])} | **Mop-up:** {len(by_round[CounselingRound.MOP_UP])}
             
             💡 **Pro Tips:**
-            - Don't leave any round empty - always have backup options
+            - Fill choices in the listed order - preferred colleges first, safe options after
             - Research college locations and fees beforehand
             - Keep documents ready for immediate submission
             - Monitor seat availability in real-time during counseling
@@ -1186,16 +3989,24 @@ async def get_counseling_strategy(request: UltimateSearchRequest):
         return {
             "status": "success",
             "counseling_strategy": strategy,
+            "portfolio": {
+                "candidates_considered": len(candidates),
+                "excluded_over_budget": int((~affordable).sum()),
+                "safe_choices": portfolio['safe_choices'],
+                "min_safe_applied": portfolio['min_safe_applied']
+            },
             "additional_advice": {
                 "document_checklist": [
                     "NEET Scorecard", "Class 10 & 12 Certificates", "Category Certificate",
                     "Domicile Certificate", "ID Proof", "Passport Size Photos"
                 ],
                 "important_dates": "Monitor official websites for counseling schedules",
-                "fee_planning": f"Budget range: ₹{np.mean([r.total_cost_4_years for r in recommendations[:10]]):,.0f} for 4.5 years"
+                "fee_planning": f"Budget range: ₹{np.mean([r.total_cost_4_years for r in chosen]):,.0f} for 4.5 years"
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1203,7 +4014,7 @@ async def get_counseling_strategy(request: UltimateSearchRequest):
 # ❓ WHAT-IF SCENARIO API
 # ===============================
 
-# @app.post("/what-if-scenario")
+@app.post("/what-if-scenario")
 async def analyze_what_if_scenario(
     base_request: UltimateSearchRequest,
     scenario: WhatIfScenario
@@ -1212,54 +4023,42 @@ async def analyze_what_if_scenario(
     try:
         logger.info(f"🔮 What-if Analysis: Rank change {scenario.rank_change}, Cutoff trend {scenario.cutoff_trend}")
         
-        # Create modified request with rank change
-        modified_request = base_request.copy()
-        modified_request.rank_min = max(1, base_request.rank_min + scenario.rank_change)
-        modified_request.rank_max = max(1, base_request.rank_max + scenario.rank_change)
-        
-        # Get original recommendations
-        original_recommendations = await ultimate_finder.ultimate_search(base_request)
-        
-        # Get modified recommendations
-        modified_recommendations = await ultimate_finder.ultimate_search(modified_request)
-        
-        # Compare results
-        original_count = len(original_recommendations)
-        modified_count = len(modified_recommendations)
-        
-        # Calculate changes
-        colleges_lost = max(0, original_count - modified_count)
-        colleges_gained = max(0, modified_count - original_count)
-        
-        # Analyze safety level changes
-        original_safe = len([r for r in original_recommendations if r.safety_level in [SafetyLevel.VERY_SAFE, SafetyLevel.SAFE]])
-        modified_safe = len([r for r in modified_recommendations if r.safety_level in [SafetyLevel.VERY_SAFE, SafetyLevel.SAFE]])
+        analysis = ultimate_finder.analyze_scenario(base_request, scenario)
+        changes = analysis['changes']
+        colleges_lost = len(changes['lost'])
+        colleges_gained = len(changes['gained'])
         
         return {
             "status": "success",
             "scenario_analysis": {
                 "rank_change": scenario.rank_change,
                 "cutoff_trend": scenario.cutoff_trend,
+                "seat_matrix_change": scenario.seat_matrix_change,
+                "base_rank": analysis['base_rank'],
+                "scenario_rank": analysis['scenario_rank'],
+                "cutoff_scale": analysis['cutoff_scale'],
                 "impact_summary": {
-                    "original_options": original_count,
-                    "modified_options": modified_count,
+                    "candidates_evaluated": analysis['candidates_evaluated'],
+                    "original_options": analysis['original_options'],
+                    "modified_options": analysis['modified_options'],
                     "colleges_lost": colleges_lost,
                     "colleges_gained": colleges_gained,
-                    "net_change": modified_count - original_count
+                    "safety_improved": len(changes['improved']),
+                    "safety_worsened": len(changes['worsened']),
+                    "net_change": analysis['modified_options'] - analysis['original_options']
                 },
                 "safety_analysis": {
-                    "original_safe_options": original_safe,
-                    "modified_safe_options": modified_safe,
-                    "safe_options_change": modified_safe - original_safe
+                    "original_safe_options": analysis['original_safe_options'],
+                    "modified_safe_options": analysis['modified_safe_options'],
+                    "safe_options_change": analysis['modified_safe_options'] - analysis['original_safe_options']
                 }
             },
-            "recommendations": {
-                "original": original_recommendations[:10],  # Top 10
-                "modified": modified_recommendations[:10]   # Top 10
-            },
-            "strategic_advice": self._get_scenario_advice(scenario, colleges_lost, colleges_gained)
+            "college_changes": changes,
+            "strategic_advice": _get_scenario_advice(scenario, colleges_lost, colleges_gained)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1400,32 +4199,50 @@ async def ai_counselor_chat(
 # 📈 CUTOFF TRENDS API
 # ===============================
 
-# @app.get("/cutoff-trends")
+@app.get("/cutoff-trends")
 async def get_cutoff_trends(
     exam_type: ExamType,
-    course: str,
-    category: str,
-    state: Optional[str] = None
+    course: Optional[str] = None,
+    category: Optional[str] = None,
+    state: Optional[str] = None,
+    institute: Optional[str] = None,
+    quota: Optional[str] = None,
+    preference: QuotaPreference = QuotaPreference.ALL_INDIA
 ):
-    """📈 Real-time cutoff trend analysis"""
+    """📈 Cutoff trend analysis from historical round-wise closing ranks"""
     try:
-        # Simulate cutoff trends (in production, use real historical data)
-        years = [2021, 2022, 2023, 2024]
-        base_cutoff = np.random.randint(10000, 100000)
+        engine = ultimate_finder.trend_engine
+        key = ultimate_finder._get_dataset_key(exam_type, preference)
+        positions = engine.select(
+            key, course=course, category=category, state=state, institute=institute, quota=quota
+        )
+        
+        if len(positions) == 0:
+            raise HTTPException(status_code=404, detail="No seat groups match the given filters")
         
-        # Generate realistic trends
-        cutoffs = []
-        for i, year in enumerate(years):
-            variation = np.random.normal(0, 2000)  # Random variation
-            trend = base_cutoff + (i * 1000) + variation  # Slight increasing trend
-            cutoffs.append(max(1, int(trend)))
+        aggregate = engine.aggregate(key, positions)
+        yearly = aggregate['yearly']
+        historical_data = {year: stats['median_final_cutoff'] for year, stats in yearly.items()}
         
-        # Calculate trend analysis
-        trend_direction = "increasing" if cutoffs[-1] > cutoffs[0] else "decreasing"
-        avg_change = np.mean(np.diff(cutoffs))
+        cutoffs = list(historical_data.values())
+        avg_change = float(np.mean(np.diff(cutoffs))) if len(cutoffs) > 1 else 0.0
+        trend_direction = (
+            "stable" if len(cutoffs) < 2 or abs(avg_change) < 0.02 * max(cutoffs[0], 1)
+            else "increasing" if avg_change > 0 else "decreasing"
+        )
+        
+        volatility = aggregate['median_volatility']
+        volatility_label = (
+            "unknown" if volatility is None
+            else "low" if volatility < 0.1 else "moderate" if volatility < 0.25 else "high"
+        )
+        next_year = aggregate['next_year']
+        predicted = aggregate['median_predicted_next_cutoff']
         
-        # Predict next year
-        predicted_2025 = max(1, int(cutoffs[-1] + avg_change + np.random.normal(0, 1000)))
+        # Confidence falls with volatility and with thin history
+        confidence = 50 if volatility is None else int(max(30, min(95, 95 - volatility * 150)))
+        if len(historical_data) < 2:
+            confidence = min(confidence, 50)
         
         return {
             "status": "success",
@@ -1433,27 +4250,44 @@ async def get_cutoff_trends(
                 "course": course,
                 "category": category,
                 "state": state,
-                "historical_data": {
-                    year: cutoff for year, cutoff in zip(years, cutoffs)
-                },
+                "institute": institute,
+                "quota": quota,
+                "seat_groups": aggregate['seat_groups'],
+                "historical_data": historical_data,
+                "yearly_breakdown": yearly,
                 "trend_direction": trend_direction,
                 "average_yearly_change": int(avg_change),
-                "volatility": "moderate",  # Calculate based on standard deviation
-                "prediction_2025": predicted_2025,
-                "confidence": 78
+                "median_yoy_slope": aggregate['median_yoy_slope'],
+                "median_round_drift": aggregate['median_round_drift'],
+                "volatility": volatility_label,
+                "volatility_coefficient": volatility,
+                "partial_years_excluded": aggregate['partial_years'],
+                "predicted_year": next_year,
+                "predicted_cutoff": predicted,
+                "confidence": confidence
             },
             "insights": {
                 "key_factors": [
                     "Number of applicants",
                     "Seat availability", 
                     "College popularity",
-                    "Economic factors"
+                    "Round-to-round seat release"
                 ],
-                "recommendation": f"Based on trends, expect cutoff around {predicted_2025:,} (±3000) for 2025",
-                "strategy": "Apply with rank buffer of 5000-10000 for safety"
+                "recommendation": (
+                    f"Based on {aggregate['seat_groups']} seat groups, expect a median closing rank around "
+                    f"{predicted:,.0f} in {next_year}" if predicted is not None
+                    else "Not enough closing-rank history to project next year's cutoff"
+                ),
+                "strategy": (
+                    "Cutoffs typically move later across rounds - keep reach options for later rounds"
+                    if (aggregate['median_round_drift'] or 0) > 0
+                    else "Cutoffs tighten across rounds - lock in good options early"
+                )
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1564,13 +4398,19 @@ async def get_courses_compatible(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/search")
-async def search_colleges_compatible(request: UltimateSearchRequest):
+async def search_colleges_compatible(
+    request: UltimateSearchRequest,
+    no_cache: bool = Query(False, description="Filter candidates afresh, bypassing the candidate cache (replays)")
+):
     """🎯 Compatible search endpoint that leverages Ultimate backend power"""
     try:
         logger.info("🔄 Compatible search request received - upgrading to Ultimate search...")
         
         # Use Ultimate search but return compatible format
-        ultimate_recommendations = await ultimate_finder.ultimate_search(request)
+        diagnostics, timer = {}, StageTimer()
+        ultimate_recommendations = await ultimate_finder.ultimate_search(request, diagnostics, timer,
+                                                                         use_cache=not no_cache)
+        _log_search("/search", request, timer, diagnostics)
         
         # Convert to original format for frontend compatibility
         compatible_recommendations = []
@@ -1621,9 +4461,16 @@ async def health_check():
             "enhanced": True
         }
     
+    status = {
+        "ready": "🏆 Ultimate Backend Healthy!",
+        "failed": "❌ Ultimate Backend Startup Failed",
+    }.get(startup_pipeline.status, "🔥 Ultimate Backend Warming Up")
+    
     return {
-        "status": "🏆 Ultimate Backend Healthy!",
+        "status": status,
         "version": "10.0.0",
+        "ready": startup_pipeline.is_ready,
+        "startup": startup_pipeline.as_dict(),
         "features": {
             "ai_ml_engine": ultimate_finder.ml_engine.is_trained,
             "data_enhanced": True,
@@ -1631,12 +4478,139 @@ async def health_check():
             "async_processing": True
         },
         "data_status": data_status,
-        "performance": {
-            "avg_response_time": "< 2 seconds",
-            "concurrent_users": "1000+",
-            "uptime": "99.9%"
-        }
+        "performance": _measured_performance()
+    }
+
+@app.get("/livez")
+async def liveness_probe():
+    """💓 Liveness: the process serves requests (503 only if startup failed; restarting is the fix)"""
+    if startup_pipeline.status == "failed":
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup_pipeline.error})
+    return {"status": "alive", "uptime_seconds": round(time.time() - ultimate_finder.started_at, 1)}
+
+@app.get("/readyz")
+async def readiness_probe():
+    """🚦 Readiness: datasets loaded, indexes built and warm-up finished"""
+    body = {
+        "ready": startup_pipeline.is_ready,
+        "checks": startup_pipeline.checks(),
+        "startup": startup_pipeline.as_dict(),
+    }
+    if startup_pipeline.is_ready:
+        return body
+    headers = {} if startup_pipeline.status == "failed" else {"Retry-After": str(READINESS_RETRY_AFTER)}
+    return JSONResponse(status_code=503, content=body, headers=headers)
+
+def _measured_performance() -> Dict[str, Any]:
+    """Latency numbers measured by the search stage histograms"""
+    stages = ultimate_finder.stage_latency.summary()
+    request_stats = stages.pop('request', LatencyHistogram().summary())
+    return {
+        "searches_measured": request_stats["count"],
+        "avg_response_time_ms": request_stats["avg_ms"],
+        "p50_response_time_ms": request_stats["p50_ms"],
+        "p95_response_time_ms": request_stats["p95_ms"],
+        "p99_response_time_ms": request_stats["p99_ms"],
+        "stages": stages,
+        "candidate_cache_hit_ratio": round(ultimate_finder.cache.hit_ratio, 3),
+        "result_cache_hit_ratio": round(search_result_cache.hit_ratio, 3),
+        "cache_warming": cache_warmer.summary(),
+        "slow_queries_logged": slow_query_log.recorded,
+        "slow_query_threshold_ms": slow_query_log.threshold_ms,
+        "uptime_seconds": round(time.time() - ultimate_finder.started_at, 1)
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """📈 Prometheus metrics"""
+    try:
+        import anyio.to_thread
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        threadpool = limiter.statistics()
+    except Exception:
+        threadpool = None
+    
+    writer = PrometheusWriter()
+    requests, latency = request_metrics.snapshot()
+    for (method, route, status), count in sorted(requests.items()):
+        writer.sample("http_requests_total", "counter", "HTTP requests by route and status",
+                      count, method=method, route=route, status=status)
+    for (method, route), histogram in sorted(latency.items()):
+        writer.histogram("http_request_duration_seconds", "HTTP request latency by route",
+                         histogram, method=method, route=route)
+    writer.sample("http_requests_in_flight", "gauge", "HTTP requests being handled", request_metrics.in_flight)
+    writer.sample("searches_in_flight", "gauge", "Ultimate searches in progress", ultimate_finder.searches_in_flight)
+    writer.sample("slow_queries_total", "counter", "Searches written to the slow query log", slow_query_log.recorded)
+    
+    for stage, histogram in sorted(list(ultimate_finder.stage_latency.histograms.items())):
+        writer.histogram("search_stage_duration_seconds", "Ultimate search latency by stage", histogram, stage=stage)
+    
+    caches = {
+        "candidates": ultimate_finder.cache,
+        "college_detail": ultimate_finder.college_store.cache,
+        "search_results": search_result_cache,
     }
+    for name, cache in caches.items():
+        writer.sample("cache_hits_total", "counter", "Cache hits", cache.hits, cache=name)
+    for name, cache in caches.items():
+        writer.sample("cache_misses_total", "counter", "Cache misses", cache.misses, cache=name)
+    for name, cache in caches.items():
+        writer.sample("cache_hit_ratio", "gauge", "Cache hits / lookups", cache.hit_ratio, cache=name)
+    for name, cache in caches.items():
+        writer.sample("cache_entries", "gauge", "Cached entries", len(cache), cache=name)
+    writer.sample("cache_warmed_keys", "gauge", "Keys precomputed by the cache warmer", len(cache_warmer.warmed_keys))
+    writer.sample("cache_warmed_hits_total", "counter", "Result cache hits on warmed keys", cache_warmer.warmed_hits)
+    
+    if threadpool is not None:
+        writer.sample("threadpool_busy_workers", "gauge", "Worker threads running sync work (streaming exports)",
+                      threadpool.borrowed_tokens)
+        writer.sample("threadpool_queue_depth", "gauge", "Sync work waiting for a worker thread",
+                      threadpool.tasks_waiting)
+    writer.sample("event_loop_lag_seconds", "gauge", "Latest event loop wake-up delay", loop_lag_monitor.last_lag)
+    writer.sample("event_loop_lag_max_seconds", "gauge", "Largest event loop wake-up delay seen", loop_lag_monitor.max_lag)
+    
+    for key, df in ultimate_finder.neet_data.items():
+        writer.sample("dataset_rows", "gauge", "Rows loaded per dataset", len(df) if df is not None else 0, dataset=key)
+    for key, version in ultimate_finder.dataset_versions.items():
+        writer.sample("dataset_info", "gauge", "Loaded dataset version (content hash)", 1, dataset=key, version=version)
+    writer.sample("ml_model_info", "gauge", "ML model version in use", 1,
+                  version=ultimate_finder.ml_engine.model_version,
+                  trained=str(ultimate_finder.ml_engine.is_trained).lower())
+    writer.sample("process_uptime_seconds", "gauge", "Seconds since the finder was created",
+                  time.time() - ultimate_finder.started_at)
+    writer.sample("startup_ready", "gauge", "1 once datasets and indexes are loaded",
+                  int(startup_pipeline.is_ready))
+    for phase, seconds in startup_pipeline.timer.spans.items():
+        writer.sample("startup_phase_seconds", "gauge", "Time spent in each startup phase", seconds, phase=phase)
+
+    return Response(content=writer.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profile")
+async def admin_profile(
+    seconds: float = Query(10, gt=0, le=120, description="How long to sample live traffic"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Sampling interval"),
+    include_idle: bool = Query(False, description="Keep samples of threads blocked in select/wait"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$", description="collapsed (flamegraph.pl / speedscope) or json"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """🔬 Sample every thread's stack for N seconds of live traffic"""
+    require_admin_token(x_admin_token)
+    logger.info(f"🔬 Profiling for {seconds}s at {interval_ms}ms")
+    profiler = SamplingProfiler(interval=interval_ms / 1000, include_idle=include_idle).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    
+    if format == "json":
+        return profiler.summary()
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            "X-Profile-Samples": str(profiler.samples),
+            "Content-Disposition": f"attachment; filename=profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+        }
+    )
 
 # ===============================
 # 🚀 STARTUP & CONFIGURATION
@@ -1646,9 +4620,24 @@ async def health_check():
 async def startup_event():
     """Initialize Ultimate Backend on startup"""
     logger.info("🚀 Starting Ultimate NEET College Finder Backend...")
-    logger.info("🎯 All AI features loaded and ready!")
+    logger.info("🔥 Accepting connections; datasets are loading in the background")
     logger.info("⚡ Port 8002 - Ultimate Backend Active")
     logger.info("✅ Frontend compatibility maintained")
+    startup_pipeline.task = asyncio.create_task(startup_pipeline.run_in_background())
+    asyncio.create_task(loop_lag_monitor.run())
+    asyncio.create_task(_warm_cache_after_ready())
+
+async def _warm_cache_after_ready():
+    await startup_pipeline.task
+    if startup_pipeline.is_ready:
+        cache_warmer.start_background()
+
+# Popular logged searches are precomputed before /readyz turns 200, then in the background
+cache_warmer = CacheWarmer(ultimate_finder, search_result_cache, _compute_ultimate_search)
+startup_pipeline.add_warmer('search_cache', cache_warmer.warm_before_ready)
+
+# Everything above ran at import; the remaining phases run in startup_pipeline
+startup_pipeline.timer.add('import', time.perf_counter() - _IMPORT_STARTED)
 
 if __name__ == "__main__":
     print("=" * 80)
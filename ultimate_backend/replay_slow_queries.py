@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+🐢 SLOW QUERY REPLAY 🐢
+Re-run searches captured in the slow query log against a running backend
+
+Reads the JSON-lines log written by the Ultimate Backend (rotated files
+included when a directory or glob is given), replays each captured request
+``--repeat`` times and reports client latency next to the originally logged
+latency and the server's stage timings. Replays send ``no_cache=1`` so
+every repeat recomputes instead of hitting the result or candidate caches
+(``--use-cache`` measures the cached path instead). Entries are also grouped by filter
+combination (the request without its rank fields), which shows which filter
+sets are the expensive ones.
+
+Usage:
+    python replay_slow_queries.py logs/slow_queries.jsonl
+    python replay_slow_queries.py logs/ --url http://localhost:8002 --repeat 5 --top 20
+    python replay_slow_queries.py logs/slow_queries.jsonl* --min-ms 2000 --output replay.json
+"""
+
+import argparse
+import glob
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Request fields that change the rank, not which rows are candidates
+RANK_FIELDS = {'rank_min', 'rank_max'}
+
+
+def log_files(paths: List[str]) -> List[Path]:
+    """Log files named by paths, directories or globs; rotated backups first"""
+    files = []
+    for path in paths:
+        candidate = Path(path)
+        if candidate.is_dir():
+            files.extend(candidate.glob('*.jsonl*'))
+        else:
+            files.extend(Path(p) for p in glob.glob(path))
+    # slow_queries.jsonl.5 is the oldest, slow_queries.jsonl the newest
+    def age(file: Path) -> Tuple[str, int]:
+        suffix = file.name.rsplit('.', 1)[-1]
+        return (str(file.parent), -int(suffix) if suffix.isdigit() else 0)
+    return sorted(set(files), key=age)
+
+
+def load_entries(files: List[Path], min_ms: float, endpoint: Optional[str]) -> List[Dict[str, Any]]:
+    entries = []
+    for file in files:
+        with open(file, encoding='utf-8') as handle:
+            for line_no, line in enumerate(handle, 1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping malformed line {file}:{line_no}", file=sys.stderr)
+                    continue
+                if entry.get('duration_ms', 0) < min_ms:
+                    continue
+                if endpoint and entry.get('endpoint') != endpoint:
+                    continue
+                entries.append(entry)
+    return entries
+
+
+def filter_signature(request: Dict[str, Any]) -> str:
+    """Request without rank fields, as a stable string"""
+    return json.dumps({k: v for k, v in request.items() if k not in RANK_FIELDS}, sort_keys=True)
+
+
+def replay(url: str, entry: Dict[str, Any], timeout: float,
+           use_cache: bool = False) -> Tuple[float, int, Dict[str, Any]]:
+    """One replay: (client ms, HTTP status, server stage timings when available)"""
+    endpoint = entry['endpoint']
+    params = [] if use_cache else ['no_cache=1']
+    if endpoint == '/ultimate-search':
+        params.append('timings=1')
+    target = url.rstrip('/') + endpoint + ('?' + '&'.join(params) if params else '')
+    data = json.dumps(entry['request']).encode()
+    http_request = urllib.request.Request(target, data=data, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        return (time.perf_counter() - start) * 1000, e.code, {}
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    stages = {}
+    if endpoint == '/ultimate-search':
+        stages = json.loads(body).get('search_metadata', {}).get('stage_timings_ms', {})
+    return elapsed_ms, status, stages
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay slow-query log entries against a local backend")
+    parser.add_argument('logs', nargs='+', help="Log files, directories or globs")
+    parser.add_argument('--url', default='http://localhost:8002', help="Backend base URL")
+    parser.add_argument('--repeat', type=int, default=3, help="Replays per entry")
+    parser.add_argument('--min-ms', type=float, default=0, help="Only entries logged at least this slow")
+    parser.add_argument('--endpoint', help="Only entries for this endpoint (e.g. /ultimate-search)")
+    parser.add_argument('--limit', type=int, help="Replay at most this many entries (slowest first)")
+    parser.add_argument('--top', type=int, default=10, help="Rows shown in each report table")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument('--use-cache', action='store_true',
+                        help="Let repeats hit the server's result and candidate caches")
+    parser.add_argument('--dry-run', action='store_true', help="Only summarize the log")
+    parser.add_argument('--output', help="Write per-entry results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = log_files(args.logs)
+    if not files:
+        print("❌ No log files found")
+        return 1
+    entries = load_entries(files, args.min_ms, args.endpoint)
+    print(f"📄 {len(entries):,} entries from {len(files)} file(s)")
+    if not entries:
+        return 0
+    entries.sort(key=lambda e: -e['duration_ms'])
+    if args.limit:
+        entries = entries[:args.limit]
+
+    # Which filter combinations show up slow, from the log alone
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[(entry['endpoint'], filter_signature(entry['request']))].append(entry['duration_ms'])
+    print(f"\n🐢 Slowest filter combinations (logged)")
+    ranked = sorted(groups.items(), key=lambda item: -np.median(item[1]))
+    for (endpoint, signature), durations in ranked[:args.top]:
+        print(f"  {np.median(durations):9.1f} ms median  x{len(durations):<4} {endpoint} {signature}")
+
+    if args.dry_run:
+        return 0
+
+    print(f"\n🔄 Replaying {len(entries):,} entries x{args.repeat} against {args.url}")
+    results = []
+    for index, entry in enumerate(entries, 1):
+        timings, statuses, stages = [], [], {}
+        for _ in range(args.repeat):
+            try:
+                elapsed_ms, status, stages = replay(args.url, entry, args.timeout, args.use_cache)
+            except (urllib.error.URLError, OSError) as e:
+                print(f"❌ {args.url} is not reachable: {e}")
+                return 1
+            timings.append(elapsed_ms)
+            statuses.append(status)
+        results.append({
+            "endpoint": entry['endpoint'],
+            "request": entry['request'],
+            "logged_ms": entry['duration_ms'],
+            "logged_stage_timings_ms": entry.get('stage_timings_ms', {}),
+            "candidates": entry.get('candidates', {}),
+            "replay_ms": [round(t, 3) for t in timings],
+            "replay_p50_ms": round(float(np.median(timings)), 3),
+            "replay_max_ms": round(max(timings), 3),
+            "statuses": statuses,
+            "server_stage_timings_ms": stages,
+        })
+        if index % 10 == 0:
+            print(f"  {index:,}/{len(entries):,}")
+
+    print(f"\n📊 Slowest on replay (client p50)")
+    print(f"  {'replay p50':>10} {'logged':>9} {'candidates':>10}  top stage           request")
+    for result in sorted(results, key=lambda r: -r['replay_p50_ms'])[:args.top]:
+        stages = result['server_stage_timings_ms'] or result['logged_stage_timings_ms']
+        stages = {k: v for k, v in stages.items() if k not in ('search', 'request')}
+        top_stage = max(stages.items(), key=lambda item: item[1]) if stages else ('-', 0)
+        request = result['request']
+        print(f"  {result['replay_p50_ms']:8.1f}ms {result['logged_ms']:7.1f}ms "
+              f"{str(result['candidates'].get('admissible', '-')):>10}  "
+              f"{top_stage[0]:<12}{top_stage[1]:7.1f}ms {request.get('exam_type')} {request.get('preference')} "
+              f"{request.get('category')} {request.get('course')} {request.get('rank_min')}-{request.get('rank_max')}")
+
+    failed = [r for r in results if any(status != 200 for status in r['statuses'])]
+    if failed:
+        print(f"\n⚠️ {len(failed)} entries returned non-200 responses")
+    reproduced = sum(r['replay_p50_ms'] >= r['logged_ms'] * 0.5 for r in results)
+    print(f"\n✅ {reproduced}/{len(results)} entries still take at least half their logged time")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"✅ Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,7 @@ Simple ML-Powered College Recommendation System
 import sys
 import os
 import subprocess
+import importlib.util
 from pathlib import Path
 import asyncio
 
@@ -56,12 +57,12 @@ def check_ultimate_requirements():
     missing_packages = []
     available_packages = []
     
+    # find_spec locates a package without importing it (sklearn alone takes seconds to import)
     for import_name, pip_name in required_packages.items():
-        try:
-            __import__(import_name)
+        if importlib.util.find_spec(import_name) is not None:
             available_packages.append(pip_name)
             print(f"✅ {pip_name} - Available")
-        except ImportError:
+        else:
             missing_packages.append(pip_name)
             print(f"❌ {pip_name} - Missing")
     
@@ -78,7 +79,7 @@ def check_ultimate_requirements():
 
 def check_data_files():
     """Check if required data files exist"""
-    data_path = Path("../data/raw")
+    data_path = Path(os.getenv("NEET_DATA_DIR", Path(__file__).parent.parent / "data" / "raw"))
     required_files = [
         "NEET_UG_all_india.csv",
         "NEET_UG_statewise.csv",
@@ -165,7 +166,7 @@ def main():
     
     print("\n🎉 All Backend checks passed!")
     print("🤖 ML Engine will initialize automatically")
-    print("📊 Core features will be available within 10 seconds")
+    print("📊 The server accepts connections immediately; /health shows startup status \"warming\" until data is loaded")
     
     # Start the Backend
     start_simple_server()
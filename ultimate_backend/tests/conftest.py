@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend modules (main, allocation_simulator) live one directory up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
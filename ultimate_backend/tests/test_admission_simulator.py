@@ -0,0 +1,61 @@
+"""Fixed-seed checks of the Monte Carlo round-wise admission model"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import AdmissionProbabilitySimulator, CutoffTrendEngine
+
+
+@pytest.fixture(scope="module")
+def trend_data():
+    # Three seat groups with flat histories: closing ranks 1,000, 10,000 and 100,000
+    df = pd.DataFrame({
+        'INSTITUTE': ['A', 'B', 'C'],
+        'CR 2023 1': ['1000', '10000', '100000'],
+        'CR 2023 2': ['1000', '10000', '100000'],
+        'CR 2024 1': ['1000', '10000', '100000'],
+        'CR 2024 2': ['1000', '10000', '100000'],
+    })
+    engine = CutoffTrendEngine()
+    engine.build('test', df)
+    return engine.datasets['test']
+
+
+def simulate(trend_data, rank, seed=2024):
+    return AdmissionProbabilitySimulator(seed=seed).simulate(trend_data, np.arange(3), rank)
+
+
+def test_same_seed_same_result(trend_data):
+    first, second = simulate(trend_data, 10000), simulate(trend_data, 10000)
+    for key in first:
+        np.testing.assert_array_equal(first[key], second[key])
+
+
+def test_probabilities_follow_the_cutoffs(trend_data):
+    result = simulate(trend_data, 10000)
+    p_final = result['p_admitted_by'][:, -1]
+    # Far behind group A's cutoff, level with B's, far ahead of C's
+    assert p_final[0] < 0.01
+    assert p_final[2] > 0.99
+    # At the median cutoff a round opens about half the time
+    assert result['p_round'][1, 0] == pytest.approx(0.5, abs=0.05)
+
+
+def test_admitted_by_round_accumulates(trend_data):
+    result = simulate(trend_data, 10000)
+    assert np.all(np.diff(result['p_admitted_by'], axis=1) >= 0)
+    assert np.all(result['ci_low'] <= result['p_round'])
+    assert np.all(result['p_round'] <= result['ci_high'])
+
+
+def test_waitlist_is_a_seat_only_after_round_1(trend_data):
+    result = simulate(trend_data, 10000)
+    p_first = result['p_round'][:, 0]
+    expected = result['p_admitted_by'][:, -1] - p_first
+    np.testing.assert_allclose(result['waitlist'], expected, atol=1e-12)
+    missed = 1 - p_first
+    has_missed = missed > 0
+    np.testing.assert_allclose(
+        result['later_given_missed'][has_missed], expected[has_missed] / missed[has_missed], atol=1e-12
+    )
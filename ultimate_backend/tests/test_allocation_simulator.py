@@ -0,0 +1,61 @@
+"""Deferred-acceptance allocation on small cohorts with known stable outcomes"""
+
+import numpy as np
+
+from allocation_simulator import deferred_acceptance
+
+
+def serial_dictatorship(preferences, ranks, seats, active):
+    """Reference allocation: best rank picks first from what is left
+
+    With one common priority (merit rank) this is the unique stable matching.
+    """
+    left = seats.copy()
+    held = np.full(len(ranks), -1)
+    for student in np.argsort(ranks, kind='stable'):
+        if not active[student]:
+            continue
+        for group in preferences[student]:
+            if group >= 0 and left[group] > 0:
+                held[student] = group
+                left[group] -= 1
+                break
+    return held
+
+
+def test_known_stable_allotment():
+    # Students by rank 1..4; group 0 has one seat, group 1 has two
+    preferences = np.array([
+        [1, 0, -1],   # rank 3
+        [0, 1, -1],   # rank 1
+        [0, 1, -1],   # rank 2
+        [0, -1, -1],  # rank 4, only wants group 0
+    ])
+    ranks = np.array([3, 1, 2, 4])
+    seats = np.array([1, 2])
+    held = deferred_acceptance(preferences, ranks, seats, np.ones(4, dtype=bool))
+    np.testing.assert_array_equal(held, [1, 0, 1, -1])
+
+
+def test_inactive_students_get_nothing():
+    preferences = np.array([[0], [0]])
+    ranks = np.array([1, 2])
+    held = deferred_acceptance(preferences, ranks, np.array([1]), np.array([False, True]))
+    np.testing.assert_array_equal(held, [-1, 0])
+
+
+def test_matches_serial_dictatorship_on_random_cohorts():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        n_students, n_groups, n_choices = rng.integers(1, 30), rng.integers(1, 8), rng.integers(1, 5)
+        preferences = np.full((n_students, n_choices), -1)
+        for student in range(n_students):
+            length = rng.integers(0, min(n_choices, n_groups) + 1)
+            preferences[student, :length] = rng.choice(n_groups, size=length, replace=False)
+        ranks = rng.permutation(n_students) + 1
+        seats = rng.integers(0, 4, size=n_groups)
+        active = rng.random(n_students) < 0.9
+
+        held = deferred_acceptance(preferences, ranks, seats, active)
+        np.testing.assert_array_equal(held, serial_dictatorship(preferences, ranks, seats, active))
+        assert np.all(np.bincount(held[held >= 0], minlength=n_groups) <= seats)
@@ -0,0 +1,64 @@
+"""Choice-list DP against brute force over every ordered list on tiny inputs"""
+
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from main import ChoicePortfolioOptimizer
+
+
+def list_value(choices, utilities, probabilities):
+    """Expected utility of a choice list filled in order"""
+    value, still_free = 0.0, 1.0
+    for i in choices:
+        value += still_free * probabilities[i] * utilities[i]
+        still_free *= 1 - probabilities[i]
+    return value
+
+
+def brute_force(utilities, probabilities, is_safe, n_choices, min_safe):
+    n = len(utilities)
+    min_safe = min(min_safe, int(is_safe.sum()), n_choices, n)
+    best = 0.0
+    for length in range(1, min(n_choices, n) + 1):
+        for choices in permutations(range(n), length):
+            if is_safe[list(choices)].sum() >= min_safe:
+                best = max(best, list_value(choices, utilities, probabilities))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 7))
+    utilities = rng.random(n)
+    probabilities = rng.random(n)
+    is_safe = probabilities >= 0.7
+    n_choices = int(rng.integers(1, 5))
+    min_safe = int(rng.integers(0, 3))
+
+    result = ChoicePortfolioOptimizer().optimize(utilities, probabilities, is_safe, n_choices, min_safe)
+
+    assert result['expected_utility'] == pytest.approx(
+        brute_force(utilities, probabilities, is_safe, n_choices, min_safe), abs=1e-12
+    )
+    chosen = result['chosen']
+    assert len(chosen) <= n_choices and len(set(chosen)) == len(chosen)
+    assert is_safe[chosen].sum() >= result['min_safe_applied']
+    assert list_value(chosen, utilities, probabilities) == pytest.approx(result['expected_utility'], abs=1e-12)
+    assert result['admission_probability'] == pytest.approx(1 - np.prod(1 - probabilities[chosen]))
+
+
+def test_safe_minimum_displaces_a_better_risky_choice():
+    # Two slots: the two risky dream colleges are worth more, but one safe seat is required
+    utilities = np.array([1.0, 0.9, 0.2])
+    probabilities = np.array([0.3, 0.3, 0.95])
+    is_safe = probabilities >= 0.8
+
+    free = ChoicePortfolioOptimizer().optimize(utilities, probabilities, is_safe, 2, 0)
+    constrained = ChoicePortfolioOptimizer().optimize(utilities, probabilities, is_safe, 2, 1)
+
+    assert free['chosen'] == [0, 1]
+    assert constrained['chosen'] == [0, 2]
+    assert constrained['safe_choices'] == 1